@@ -4,17 +4,21 @@ Agent de trading autonome avec alertes Pushover et validation LLM
 """
 
 import ccxt
-import pandas as pd
-import ta
+import ccxt.async_support as ccxt_async
+import asyncio
 import time
-import json
-import requests
 import os
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from mistralai import Mistral
 import config
 from paper_trading import PaperTradingManager
+from market_data import CandleCache, candles_to_dataframe
+from indicators import calculate_indicators, calculate_indicators_batch, StreamingIndicators
+from cache import LRUCache, TTLCache
+from signal_pipeline import Gate, SignalPipeline
+import llm_validation
+from notifications import NotificationQueue, format_closed_digest
+from agent_state import AgentState
 
 # Fichier pour stocker l'état des signaux
 # Utilise /app/data dans Docker, sinon ./data
@@ -23,20 +27,59 @@ DATA_DIR = "/app/data" if os.path.exists("/app/data") else "data"
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 STATE_FILE = os.path.join(DATA_DIR, "signals_state.json")
+LLM_CACHE_FILE = os.path.join(DATA_DIR, "llm_validation_cache.json")
+NOTIFICATION_OUTBOX_FILE = os.path.join(DATA_DIR, "notifications_outbox.json")
+
+# Ordre par défaut des filtres: vérifications locales d'abord, appel LLM (coûteux) en dernier
+DEFAULT_SIGNAL_GATES = ['already_active', 'confidence', 'trading_hours', 'cooldown', 'open_position', 'capacity', 'llm']
 
 class TradingAgent:
     def __init__(self):
         self.exchange = ccxt.binance()
-        self.mistral_client = Mistral(api_key=config.MISTRAL_API_KEY)
-        self.active_signals = self.load_state()
+        # Cache des bougies: seules les bougies nouvelles sont téléchargées à chaque scan
+        self.candle_cache = CandleCache(self.exchange, limit=200)
+        # Exchange asynchrone pour récupérer tous les symboles en parallèle
+        self.async_exchange = ccxt_async.binance({'enableRateLimit': True})
+        self.event_loop = asyncio.new_event_loop()
+        self.fetch_concurrency = getattr(config, 'FETCH_CONCURRENCY', 5)
+        # Moteur d'indicateurs: "streaming" (incrémental), "batch" (NumPy multi-symboles)
+        # ou "full" (recalcul complet via ta)
+        self.indicator_engine = getattr(config, 'INDICATOR_ENGINE', 'streaming')
+        self.streaming_indicators = StreamingIndicators()
+        # Analyses mémorisées par (symbole, timeframe, dernière bougie clôturée, bougie en cours)
+        self.analysis_cache = LRUCache(getattr(config, 'ANALYSIS_CACHE_SIZE', 256))
+        # Validations LLM mémorisées pour les signaux quasi identiques
+        self.llm_cache = None
+        if getattr(config, 'LLM_CACHE_ENABLED', True):
+            self.llm_cache = TTLCache(
+                maxsize=getattr(config, 'LLM_CACHE_MAX_SIZE', 500),
+                ttl=getattr(config, 'LLM_CACHE_TTL_MINUTES', 60) * 60,
+                path=LLM_CACHE_FILE
+            )
+        self.mistral_client = llm_validation.create_client(config)
+        self.llm_timeout = getattr(config, 'LLM_TIMEOUT_SECONDS', 20)
+        self.llm_concurrency = getattr(config, 'LLM_CONCURRENCY', 4)
+        self.llm_batch_mode = getattr(config, 'LLM_BATCH_MODE', False)
+        self.llm_batch_timeout = getattr(config, 'LLM_BATCH_TIMEOUT_SECONDS', 45)
+        # Notifications envoyées en arrière-plan
+        self.notifier = NotificationQueue(
+            config.PUSHOVER_APP_TOKEN,
+            config.PUSHOVER_USER_KEY,
+            NOTIFICATION_OUTBOX_FILE,
+            maxsize=getattr(config, 'NOTIFICATION_QUEUE_SIZE', 100),
+            max_attempts=getattr(config, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+        )
+        # Signaux envoyés, cooldowns et positions virtuelles (écrits au plus une fois par scan)
+        self.state = AgentState(STATE_FILE)
+        self.active_signals = self.state.active_signals
         self.paris_tz = ZoneInfo("Europe/Paris")
 
         # Période de refroidissement après fermeture de position (en heures)
         self.cooldown_period_hours = getattr(config, 'COOLDOWN_PERIOD_HOURS', 1)
-        self.recently_closed_positions = {}  # {symbol: datetime}
+        self.recently_closed_positions = self.state.recently_closed_positions  # {symbol: datetime}
 
         # Suivi des positions virtuelles (pour éviter les doublons même en mode notification)
-        self.virtual_positions = {}  # {symbol: {'type': signal_type, 'opened_at': datetime}}
+        self.virtual_positions = self.state.virtual_positions  # {symbol: {'type': signal_type, 'opened_at': datetime}}
 
         # Initialiser le paper trading si activé
         paper_trading_enabled = getattr(config, 'PAPER_TRADING_ENABLED', False)
@@ -46,6 +89,9 @@ class TradingAgent:
         else:
             self.paper_trading = None
 
+        # Pipeline de décision des signaux
+        self.signal_pipeline = self.build_signal_pipeline()
+
     def now(self):
         """Retourne l'heure actuelle avec le fuseau horaire de Paris"""
         return datetime.now(self.paris_tz)
@@ -66,6 +112,7 @@ class TradingAgent:
         else:
             # Période de refroidissement terminée, supprimer de la liste
             del self.recently_closed_positions[symbol]
+            self.state.mark_dirty()
             return False
 
     def has_open_position(self, symbol):
@@ -76,18 +123,9 @@ class TradingAgent:
             # En mode notification, vérifier les positions virtuelles
             return symbol in self.virtual_positions
 
-    def load_state(self):
-        """Charge l'état des signaux actifs depuis le fichier"""
-        try:
-            with open(STATE_FILE, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
-
     def save_state(self):
-        """Sauvegarde l'état des signaux actifs"""
-        with open(STATE_FILE, 'w') as f:
-            json.dump(self.active_signals, f, indent=2)
+        """Écrit l'état de l'agent s'il a changé (fin de scan, arrêt)"""
+        self.state.flush()
 
     def is_trading_hours(self):
         """Vérifie si on est dans les horaires de trading autorisés"""
@@ -108,44 +146,40 @@ class TradingAgent:
 
         return True
 
-    def get_ohlcv_data(self, symbol, timeframe=config.TIMEFRAME, limit=200):
-        """Récupère les données OHLCV depuis Binance"""
-        ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        return df
+    def fetch_all_candles(self, symbols, timeframe=config.TIMEFRAME):
+        """Récupère les bougies de tous les symboles en parallèle (une seule attente réseau par scan)"""
+        return self.event_loop.run_until_complete(
+            self.candle_cache.get_all_candles_async(
+                self.async_exchange, symbols, timeframe, concurrency=self.fetch_concurrency
+            )
+        )
+
+    def close(self):
+        """Ferme les connexions de l'exchange asynchrone et vide la file de notifications"""
+        self.event_loop.run_until_complete(self.async_exchange.close())
+        self.event_loop.close()
+        self.notifier.close()
+        self.save_state()
+        # Instantané complet de l'historique pour repartir d'un journal vide
+        if self.paper_trading:
+            self.paper_trading.save_state()
 
     def calculate_indicators(self, df):
         """Calcule tous les indicateurs techniques"""
-        # Moyennes mobiles
-        df['MA_9'] = ta.trend.sma_indicator(df['close'], window=9)
-        df['MA_21'] = ta.trend.sma_indicator(df['close'], window=21)
-        df['MA_50'] = ta.trend.sma_indicator(df['close'], window=50)
-        df['EMA_12'] = ta.trend.ema_indicator(df['close'], window=12)
-        df['EMA_50'] = ta.trend.ema_indicator(df['close'], window=50)
-
-        # RSI
-        df['RSI'] = ta.momentum.rsi(df['close'], window=14)
-
-        # MACD
-        macd = ta.trend.MACD(df['close'])
-        df['MACD'] = macd.macd()
-        df['MACD_Signal'] = macd.macd_signal()
-        df['MACD_Hist'] = macd.macd_diff()
-
-        # Bollinger Bands
-        bollinger = ta.volatility.BollingerBands(df['close'])
-        df['BB_High'] = bollinger.bollinger_hband()
-        df['BB_Low'] = bollinger.bollinger_lband()
-        df['BB_Mid'] = bollinger.bollinger_mavg()
-
-        # ATR pour volatilité
-        df['ATR'] = ta.volatility.average_true_range(df['high'], df['low'], df['close'], window=14)
+        return calculate_indicators(df)
 
-        # Volume
-        df['Volume_MA'] = df['volume'].rolling(window=20).mean()
+    def analyze_symbol(self, symbol, candles, timeframe=config.TIMEFRAME, batch=None):
+        """Calcule les indicateurs et l'analyse d'un symbole selon le moteur configuré"""
+        if batch is not None:
+            last, prev = batch.rows(symbol)
+            return analyze_rows(last, prev, symbol)
 
-        return df
+        if self.indicator_engine == 'streaming':
+            last, prev = self.streaming_indicators.rows(symbol, timeframe, candles)
+            return analyze_rows(last, prev, symbol)
+
+        df = self.calculate_indicators(candles_to_dataframe(candles))
+        return analyze_crypto(df, symbol)
 
     def analyze_crypto(self, df, symbol):
         """Analyse une crypto et génère un rapport complet"""
@@ -252,8 +286,8 @@ class TradingAgent:
         atr = analysis['atr']
 
         # Calcul dynamique des TP/SL basés sur l'ATR
-        atr_multiplier_tp = 2.5
-        atr_multiplier_sl = 1.5
+        atr_multiplier_tp = getattr(config, 'ATR_MULTIPLIER_TP', 2.5)
+        atr_multiplier_sl = getattr(config, 'ATR_MULTIPLIER_SL', 1.5)
         fixed_tp_enabled = getattr(config, 'PAPER_TRADING_FIXED_TP', True)
         fixed_tp_percent = getattr(config, 'PAPER_TRADING_FIXED_TP_PERCENT', 3.0) / 100
 
@@ -313,96 +347,99 @@ class TradingAgent:
         # Format: https://www.bitget.site/fr/futures/usdt/BTCUSDT
         return f"https://www.bitget.site/fr/futures/usdt/{clean_symbol}"
 
-    def validate_signal_with_llm(self, analysis, signal):
-        """Valide le signal avec Mistral AI"""
-        prompt = f"""Tu es un expert en trading de cryptomonnaies. Analyse ce signal de trading et donne ton avis.
-
-CRYPTOMONNAIE: {analysis['symbol']}
-PRIX ACTUEL: ${analysis['price']:.4f}
-TENDANCE: {analysis['trend']}
-
-INDICATEURS TECHNIQUES:
-- RSI: {analysis['rsi']:.1f}
-- MACD: {analysis['macd']:.4f} | Signal: {analysis['macd_signal']:.4f}
-- MA21: ${analysis['ma_21']:.4f}
-- MA50: ${analysis['ma_50']:.4f}
-- EMA12: ${analysis['ema_12']:.4f}
-- EMA50: ${analysis['ema_50']:.4f}
-- Croisement EMA: {'EMA12 > EMA50 (Haussier)' if analysis['ema_12'] > analysis['ema_50'] else 'EMA12 < EMA50 (Baissier)'}
-- Bollinger Bands: ${analysis['bb_low']:.4f} - ${analysis['bb_high']:.4f}
-- Volume: {analysis['volume']:.0f} (Moyenne: {analysis['volume_ma']:.0f})
-
-SIGNAUX DÉTECTÉS:
-{chr(10).join(['- ' + s for s in analysis['signals']])}
-
-SIGNAL PROPOSÉ:
-- Type: {signal['type']}
-- Entrée: ${signal['entry']:.4f}
-- Take Profit: ${signal['tp']:.4f} ({((signal['tp']-signal['entry'])/signal['entry']*100):.2f}%)
-- Stop Loss: ${signal['sl']:.4f} ({((signal['sl']-signal['entry'])/signal['entry']*100):.2f}%)
-- Risk/Reward: 1:{signal['risk_reward']:.2f}
-- Score de confiance: {signal['confidence']}/100
-
-Analyse ce signal et réponds en format JSON avec cette structure:
-{{
-  "valid": true/false,
-  "confidence_adjusted": 0-100,
-  "analysis": "ton analyse détaillée en 2-3 phrases",
-  "recommendation": "STRONG_BUY/BUY/HOLD/SELL/STRONG_SELL"
-}}
-
-Sois critique et objectif. Ne valide que les signaux vraiment solides."""
+    def llm_cache_key(self, analysis, signal):
+        """Clé de cache: symbole, type de signal et indicateurs quantifiés"""
+        rsi_bucket_size = getattr(config, 'LLM_CACHE_RSI_BUCKET', 5)
+        rsi_bucket = int(analysis['rsi'] // rsi_bucket_size) * rsi_bucket_size
+        macd_sign = '+' if analysis['macd'] > analysis['macd_signal'] else '-'
+        ema_cross = 'up' if analysis['ema_12'] > analysis['ema_50'] else 'down'
+        return f"{analysis['symbol']}|{signal['type']}|rsi{rsi_bucket}|macd{macd_sign}|ema_{ema_cross}|score{analysis['score']}"
 
+    def validate_signal_with_llm(self, analysis, signal):
+        """Valide le signal avec Mistral AI (réponse réutilisée si un signal quasi identique a déjà été validé)"""
+        if self.llm_cache is None:
+            return self.request_llm_validation(analysis, signal)
+
+        key = self.llm_cache_key(analysis, signal)
+        cached = self.llm_cache.get(key)
+        if cached is not None:
+            print(f"♻️  {analysis['symbol']}: Validation LLM en cache ({key})")
+            return cached
+
+        result = self.request_llm_validation(analysis, signal)
+        # Les erreurs (API, parsing) ne sont pas mises en cache
+        if not result.get('error'):
+            self.llm_cache.put(key, result)
+        return result
+
+    def request_llm_validation(self, analysis, signal):
+        """Appelle Mistral AI pour valider le signal"""
         try:
             response = self.mistral_client.chat.complete(
-                model="mistral-large-latest",
-                messages=[{"role": "user", "content": prompt}],
+                model=llm_validation.MODEL,
+                messages=[{"role": "user", "content": llm_validation.build_prompt(analysis, signal)}],
                 temperature=0.3,
                 max_tokens=500
             )
+            return llm_validation.parse_response(response.choices[0].message.content)
 
-            content = response.choices[0].message.content
-
-            # S'assurer que content est bien une string
-            if content is None:
-                return {"valid": False, "analysis": "Réponse LLM vide"}
+        except Exception as e:
+            print(f"Erreur validation LLM: {e}")
+            return llm_validation.error_result(f"Erreur: {str(e)}")
+
+    def validate_signals_with_llm(self, candidates):
+        """Valide tous les candidats d'un scan: en parallèle avec échéance, ou en un seul prompt groupé
+
+        Les validations en cache sont réutilisées; le résultat est stocké dans candidate['llm_validation'].
+        """
+        pending = []
+        for candidate in candidates:
+            analysis, signal = candidate['analysis'], candidate['signal']
+            cached = self.llm_cache.get(self.llm_cache_key(analysis, signal)) if self.llm_cache is not None else None
+            if cached is not None:
+                print(f"♻️  {candidate['symbol']}: Validation LLM en cache")
+                candidate['llm_validation'] = cached
+            else:
+                pending.append(candidate)
 
-            content_str = str(content)
+        if not pending:
+            return
 
-            # Extraire le JSON de la réponse
-            import re
-            json_match = re.search(r'\{.*\}', content_str, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-                return result
-            else:
-                return {"valid": False, "analysis": "Erreur de parsing de la réponse LLM"}
+        items = [(c['analysis'], c['signal']) for c in pending]
+        if self.llm_batch_mode and len(items) > 1:
+            print(f"🤖 Validation LLM groupée de {len(items)} signaux...")
+            coroutine = llm_validation.validate_batch_async(self.mistral_client, items, self.llm_batch_timeout)
+        else:
+            print(f"🤖 Validation LLM de {len(items)} signal(s) en parallèle...")
+            coroutine = llm_validation.validate_all_async(
+                self.mistral_client, items, self.llm_timeout, concurrency=self.llm_concurrency
+            )
+        results = self.event_loop.run_until_complete(coroutine)
 
-        except Exception as e:
-            print(f"Erreur validation LLM: {e}")
-            return {"valid": False, "analysis": f"Erreur: {str(e)}"}
+        for candidate, result in zip(pending, results):
+            candidate['llm_validation'] = result
+            # Les erreurs (API, parsing, délai dépassé) ne sont pas mises en cache
+            if self.llm_cache is not None and not result.get('error'):
+                self.llm_cache.put(self.llm_cache_key(candidate['analysis'], candidate['signal']), result)
 
     def send_pushover_notification(self, title, message, priority=1):
-        """Envoie une notification via Pushover"""
-        try:
-            response = requests.post("https://api.pushover.net/1/messages.json", data={
-                "token": config.PUSHOVER_APP_TOKEN,
-                "user": config.PUSHOVER_USER_KEY,
-                "title": title,
-                "message": message,
-                "priority": priority,
-                "sound": "cosmic"
-            })
-
-            if response.status_code == 200:
-                print(f"✓ Notification envoyée: {title}")
-                return True
-            else:
-                print(f"✗ Erreur Pushover: {response.text}")
-                return False
-        except Exception as e:
-            print(f"✗ Erreur lors de l'envoi de la notification: {e}")
-            return False
+        """Dépose une notification Pushover dans la file d'envoi (n'attend jamais le réseau)"""
+        return self.notifier.send(title, message, priority=priority)
+
+    def notify_closed_positions(self, positions):
+        """Notifie les positions fermées pendant le scan (un résumé unique si plusieurs)"""
+        if not positions:
+            return
+        if len(positions) == 1 or not getattr(config, 'NOTIFICATION_DIGEST', True):
+            for position in positions:
+                message = self.paper_trading.format_position_message(position, "CLOSED")
+                title = f"{'🟢' if position['pnl_usdt'] > 0 else '🔴'} Position fermée - {position['symbol']}"
+                self.send_pushover_notification(title, message, priority=1)
+            return
+
+        total_pnl = sum(p['pnl_usdt'] for p in positions)
+        title = f"{'🟢' if total_pnl > 0 else '🔴'} {len(positions)} positions fermées"
+        self.send_pushover_notification(title, format_closed_digest(positions), priority=1)
 
     def is_signal_already_active(self, symbol, signal_type):
         """Vérifie si un signal est déjà actif pour éviter les doublons"""
@@ -418,7 +455,7 @@ Sois critique et objectif. Ne valide que les signaux vraiment solides."""
             else:
                 # Signal trop vieux, on peut en envoyer un nouveau
                 del self.active_signals[signal_key]
-                self.save_state()
+                self.state.mark_dirty()
 
         return False
 
@@ -426,7 +463,7 @@ Sois critique et objectif. Ne valide que les signaux vraiment solides."""
         """Marque un signal comme envoyé"""
         signal_key = f"{symbol}_{signal_type}"
         self.active_signals[signal_key] = self.now().isoformat()
-        self.save_state()
+        self.state.mark_dirty()
 
     def mark_virtual_position_opened(self, symbol, signal_type):
         """Marque une position virtuelle comme ouverte (pour le mode notification)"""
@@ -434,11 +471,13 @@ Sois critique et objectif. Ne valide que les signaux vraiment solides."""
             'type': signal_type,
             'opened_at': self.now()
         }
+        self.state.mark_dirty()
 
     def mark_virtual_position_closed(self, symbol):
         """Marque une position virtuelle comme fermée"""
         if symbol in self.virtual_positions:
             del self.virtual_positions[symbol]
+            self.state.mark_dirty()
 
     def cleanup_old_virtual_positions(self):
         """Nettoie les positions virtuelles trop anciennes (plus de 24h)"""
@@ -456,9 +495,179 @@ Sois critique et objectif. Ne valide que les signaux vraiment solides."""
         
         for symbol in symbols_to_remove:
             del self.virtual_positions[symbol]
+            self.state.mark_dirty()
+
+    def build_signal_pipeline(self):
+        """Construit le pipeline de décision dans l'ordre configuré (gates locales d'abord, LLM en dernier)"""
+        available = {
+            'already_active': Gate('already_active', self.gate_not_already_active),
+            'confidence': Gate('confidence', self.gate_confidence),
+            'trading_hours': Gate('trading_hours', self.gate_trading_hours),
+            'cooldown': Gate('cooldown', self.gate_cooldown),
+            'open_position': Gate('open_position', self.gate_no_open_position),
+            'capacity': Gate('capacity', self.gate_capacity),
+            'llm': Gate('llm', self.gate_llm, cost='llm', prefetch=self.validate_signals_with_llm),
+        }
+        gates = []
+        for name in getattr(config, 'SIGNAL_GATES', DEFAULT_SIGNAL_GATES):
+            if name in available:
+                gates.append(available[name])
+            else:
+                print(f"⚠️  Gate inconnue ignorée: {name}")
+        return SignalPipeline(gates)
+
+    def gate_not_already_active(self, candidate):
+        """Gate: signal pas déjà envoyé récemment"""
+        symbol, signal = candidate['symbol'], candidate['signal']
+        if self.is_signal_already_active(symbol, signal['type']):
+            print(f"⏭️  {symbol}: Signal {signal['type']} déjà actif, ignoré")
+            return False
+        return True
+
+    def gate_confidence(self, candidate):
+        """Gate: filtre haute confiance si activé"""
+        symbol, signal = candidate['symbol'], candidate['signal']
+        if config.NOTIFY_ON_HIGH_CONFIDENCE_ONLY and signal['confidence'] < 75:
+            print(f"⚠️  {symbol}: Signal {signal['type']} détecté mais confiance trop faible ({signal['confidence']}/100)")
+            return False
+        return True
+
+    def gate_trading_hours(self, candidate):
+        """Gate: horaires de trading"""
+        if not self.is_trading_hours():
+            print(f"⏰ {candidate['symbol']}: Signal {candidate['signal']['type']} hors horaires de trading (Lun-Ven 9h-20h)")
+            return False
+        return True
+
+    def gate_cooldown(self, candidate):
+        """Gate: paire hors période de refroidissement"""
+        return not self.is_symbol_in_cooldown(candidate['symbol'])
+
+    def gate_no_open_position(self, candidate):
+        """Gate: aucune position déjà ouverte sur la paire"""
+        symbol = candidate['symbol']
+        if self.has_open_position(symbol):
+            print(f"❌ {symbol}: Position déjà ouverte sur cette paire, impossible d'en ouvrir une nouvelle")
+            return False
+        return True
+
+    def gate_capacity(self, candidate):
+        """Gate: capacité du paper trading (positions max, balance)"""
+        if not self.paper_trading:
+            return True
+        can_open, reason = self.paper_trading.can_open_position()
+        if not can_open:
+            print(f"⚠️  {candidate['symbol']}: Impossible d'ouvrir position paper trading - {reason}")
+            return False
+        return True
+
+    def limit_to_capacity(self, candidates):
+        """Garde les meilleurs candidats (confiance, score) dans la limite des positions disponibles
+
+        La gate capacity est évaluée symbole par symbole pendant le scan, alors que les
+        positions ne s'ouvrent qu'après la validation LLM: sans cette limite, chaque
+        candidat en surnombre coûterait un appel LLM avant d'être refusé à l'ouverture.
+        """
+        capacity = next((gate for gate in self.signal_pipeline.gates if gate.name == 'capacity'), None)
+        if not self.paper_trading or capacity is None:
+            return candidates
+
+        slots = self.paper_trading.available_slots()
+        if len(candidates) <= slots:
+            return candidates
+
+        ranked = sorted(
+            candidates,
+            key=lambda c: (c['signal']['confidence'], c['analysis']['score']),
+            reverse=True
+        )
+        for candidate in ranked[slots:]:
+            print(f"⚠️  {candidate['symbol']}: Signal écarté, {slots} position(s) disponible(s) pour {len(candidates)} candidats")
+            candidate['rejected_by'] = capacity.name
+            capacity.rejected += 1
+        return ranked[:slots]
+
+    def gate_llm(self, candidate):
+        """Gate: validation du signal par le LLM"""
+        symbol, signal = candidate['symbol'], candidate['signal']
+        # Normalement déjà validé en parallèle par le prefetch de fin de scan
+        if 'llm_validation' not in candidate:
+            print(f"🤖 Validation LLM du signal {signal['type']} pour {symbol}...")
+            candidate['llm_validation'] = self.validate_signal_with_llm(candidate['analysis'], signal)
+        validation = candidate['llm_validation']
+
+        if not validation.get('valid', False):
+            print(f"❌ {symbol}: Signal {signal['type']} rejeté par le LLM")
+            print(f"   Raison: {validation.get('analysis', 'N/A')}")
+            return False
+        return True
+
+    def execute_signal(self, candidate):
+        """Ouvre la position paper trading ou envoie l'alerte d'un signal accepté par le pipeline"""
+        symbol = candidate['symbol']
+        signal = candidate['signal']
+        analysis = candidate['analysis']
+        llm_validation = candidate.get('llm_validation', {})
+
+        # Ouvrir une position paper trading si activé
+        if self.paper_trading:
+            position, msg = self.paper_trading.open_position(signal, analysis)
+            if position:
+                print(f"📊 {symbol}: Position paper trading ouverte - ${position['size_usdt']:.2f}")
+                # Envoyer notification de position ouverte
+                pt_message = self.paper_trading.format_position_message(position, "OPENED")
+                pt_title = f"📊 PAPER - {signal['type']} {symbol}"
+                self.send_pushover_notification(pt_title, pt_message, priority=1)
+                self.mark_signal_as_sent(symbol, signal['type'])
+                print(f"✅ {symbol}: Position ouverte et alerte envoyée!")
+            else:
+                print(f"⚠️  {symbol}: Impossible d'ouvrir position paper trading - {msg}")
+                print(f"   Notification non envoyée car position non ouverte")
+            return
+
+        # Signal validé, envoi de l'alerte (paper trading désactivé)
+        bitget_url = self.generate_bitget_url(symbol)
+        message = f"""
+{signal['type']} sur {symbol}
+
+Prix: ${signal['entry']:.4f}
+TP: ${signal['tp']:.4f} ({((signal['tp']-signal['entry'])/signal['entry']*100):.2f}%)
+SL: ${signal['sl']:.4f} ({((signal['sl']-signal['entry'])/signal['entry']*100):.2f}%)
+
+Risk/Reward: 1:{signal['risk_reward']:.2f}
+Confiance: {signal['confidence']}/100
+LLM: {llm_validation.get('recommendation', 'N/A')}
+
+Analyse LLM:
+{llm_validation.get('analysis', 'N/A')}
+
+Tendance: {analysis['trend']}
+RSI: {analysis['rsi']:.1f}
+
+🔗 Lien Bitget: {bitget_url}
+"""
+
+        title = f"🚀 {signal['type']} {symbol}"
+
+        if self.send_pushover_notification(title, message, priority=1):
+            self.mark_signal_as_sent(symbol, signal['type'])
+            self.mark_virtual_position_opened(symbol, signal['type'])
+            print(f"✅ {symbol}: Alerte {signal['type']} envoyée!")
+
+    def analysis_cache_key(self, symbol, candles):
+        """Clé du cache d'analyses: dernière bougie clôturée et valeurs de la bougie en cours
+
+        L'analyse lit aussi la bougie encore ouverte: elle n'est réutilisée que si cette
+        bougie n'a pas changé depuis le scan précédent.
+        """
+        return (symbol, config.TIMEFRAME, candles[-2][0], tuple(candles[-1]))
 
     def analyze_and_alert(self):
-        """Analyse toutes les cryptos et envoie des alertes si nécessaire"""
+        """Analyse toutes les cryptos et envoie des alertes si nécessaire
+
+        Une analyse en cache n'est reprise que pour des bougies identiques (bougie en
+        cours comprise); le signal et les gates sont réévalués à chaque scan.
+        """
         print(f"\n{'='*70}")
         print(f"🔍 Scan du marché - {self.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
@@ -480,127 +689,107 @@ Sois critique et objectif. Ne valide que les signaux vraiment solides."""
 
         print(f"{'='*70}\n")
 
-        for symbol in config.SYMBOLS:
-            try:
-                # Récupération et analyse
-                df = self.get_ohlcv_data(symbol)
-                df = self.calculate_indicators(df)
-                analysis = analyze_crypto(df, symbol)
-
-                # Mettre à jour les positions paper trading existantes
-                if self.paper_trading:
-                    current_price = analysis['price']
-                    closed_count = self.paper_trading.update_positions(symbol, current_price)
-
-                    # Si des positions ont été fermées, envoyer une notification
-                    if closed_count > 0:
-                        for position in self.paper_trading.closed_positions[-closed_count:]:
-                            if position['symbol'] == symbol:
-                                message = self.paper_trading.format_position_message(position, "CLOSED")
-                                title = f"{'🟢' if position['pnl_usdt'] > 0 else '🔴'} Position fermée - {symbol}"
-                                self.send_pushover_notification(title, message, priority=1)
-                                # Ajouter à la liste des positions récemment fermées pour la période de refroidissement
-                                self.recently_closed_positions[symbol] = self.now()
-                                # Supprimer aussi de la liste des positions virtuelles si elle existe
-                                self.mark_virtual_position_closed(symbol)
-                                print(f"⏳ Période de refroidissement démarrée pour {symbol} ({self.cooldown_period_hours}h)")
-
-                signal = self.generate_trading_signal(analysis)
-
-                if signal:
-                    # Vérifier si on a déjà envoyé ce signal récemment
-                    if self.is_signal_already_active(symbol, signal['type']):
-                        print(f"⏭️  {symbol}: Signal {signal['type']} déjà actif, ignoré")
-                        continue
-
-                    # Filtre haute confiance si activé
-                    if config.NOTIFY_ON_HIGH_CONFIDENCE_ONLY and signal['confidence'] < 75:
-                        print(f"⚠️  {symbol}: Signal {signal['type']} détecté mais confiance trop faible ({signal['confidence']}/100)")
-                        continue
-
-                    # Validation par le LLM
-                    print(f"🤖 Validation LLM du signal {signal['type']} pour {symbol}...")
-                    llm_validation = self.validate_signal_with_llm(analysis, signal)
-
-                    if llm_validation.get('valid', False):
-                        # Générer l'URL Bitget
-                        bitget_url = self.generate_bitget_url(symbol)
-
-                        # Vérifier les horaires de trading avant d'envoyer
-                        if not self.is_trading_hours():
-                            print(f"⏰ {symbol}: Signal {signal['type']} validé mais hors horaires de trading (Lun-Ven 9h-20h)")
-                            continue
-
-                        # Vérifier la période de refroidissement pour cette paire
-                        if self.is_symbol_in_cooldown(symbol):
-                            continue
-
-                        # Vérifier si une position est déjà ouverte sur cette paire
-                        if self.has_open_position(symbol):
-                            print(f"❌ {symbol}: Position déjà ouverte sur cette paire, impossible d'en ouvrir une nouvelle")
-                            continue
-
-                        # Ouvrir une position paper trading si activé
-                        position_opened = False
-                        if self.paper_trading:
-                            position, msg = self.paper_trading.open_position(signal, analysis)
-                            if position:
-                                print(f"📊 {symbol}: Position paper trading ouverte - ${position['size_usdt']:.2f}")
-                                # Envoyer notification de position ouverte
-                                pt_message = self.paper_trading.format_position_message(position, "OPENED")
-                                pt_title = f"📊 PAPER - {signal['type']} {symbol}"
-                                self.send_pushover_notification(pt_title, pt_message, priority=1)
-                                self.mark_signal_as_sent(symbol, signal['type'])
-                                print(f"✅ {symbol}: Position ouverte et alerte envoyée!")
-                                position_opened = True
-                            else:
-                                print(f"⚠️  {symbol}: Impossible d'ouvrir position paper trading - {msg}")
-                                print(f"   Notification non envoyée car position non ouverte")
-
-                        # Signal validé, envoi de l'alerte (seulement si paper trading désactivé)
-                        if not self.paper_trading and not position_opened:
-                            # Vérifier si une position est déjà ouverte sur cette paire (même en mode notification)
-                            # En mode notification, nous devons aussi éviter les doublons
-                            if self.is_signal_already_active(symbol, signal['type']):
-                                print(f"⏭️  {symbol}: Signal {signal['type']} déjà actif, ignoré")
-                                continue
-
-                            message = f"""
-{signal['type']} sur {symbol}
+        # Récupération des données de tous les symboles en parallèle
+        candles_by_symbol = self.fetch_all_candles(config.SYMBOLS)
+
+        # Bougies fines (1m) des paires avec position ouverte, pour détecter les mèches entre deux scans
+        intrabar_candles = {}
+        if self.paper_trading and getattr(config, 'PAPER_TRADING_INTRABAR', True):
+            symbols_with_positions = sorted(self.paper_trading.positions_by_symbol)
+            if symbols_with_positions:
+                intrabar_timeframe = getattr(config, 'PAPER_TRADING_INTRABAR_TIMEFRAME', '1m')
+                intrabar_candles = self.fetch_all_candles(symbols_with_positions, timeframe=intrabar_timeframe)
+
+        # Analyses déjà calculées sur exactement les mêmes bougies (bougie en cours inchangée)
+        cached_analyses = {}
+        for symbol, candles in candles_by_symbol.items():
+            if isinstance(candles, Exception) or len(candles) < 2:
+                continue
+            analysis = self.analysis_cache.get(self.analysis_cache_key(symbol, candles))
+            if analysis is not None:
+                cached_analyses[symbol] = analysis
+
+        # En mode batch, les indicateurs des symboles à analyser sont calculés en une passe
+        batch = None
+        if self.indicator_engine == 'batch':
+            batch = calculate_indicators_batch({
+                symbol: candles for symbol, candles in candles_by_symbol.items()
+                if not isinstance(candles, Exception) and symbol not in cached_analyses
+            })
 
-Prix: ${signal['entry']:.4f}
-TP: ${signal['tp']:.4f} ({((signal['tp']-signal['entry'])/signal['entry']*100):.2f}%)
-SL: ${signal['sl']:.4f} ({((signal['sl']-signal['entry'])/signal['entry']*100):.2f}%)
+        # Mise à jour de toutes les positions paper trading en une passe (une seule écriture)
+        if self.paper_trading:
+            # Prix courant (bougie en cours), toujours à jour même si l'analyse est en cache
+            prices = {
+                symbol: candles[-1][4] for symbol, candles in candles_by_symbol.items()
+                if not isinstance(candles, Exception) and candles
+            }
+            fine_candles = {
+                symbol: candles for symbol, candles in intrabar_candles.items()
+                if not isinstance(candles, Exception) and candles
+            }
+            closed_this_scan = self.paper_trading.update_all(prices, fine_candles)
 
-Risk/Reward: 1:{signal['risk_reward']:.2f}
-Confiance: {signal['confidence']}/100
-LLM: {llm_validation.get('recommendation', 'N/A')}
+            for position in closed_this_scan:
+                symbol = position['symbol']
+                # Ajouter à la liste des positions récemment fermées pour la période de refroidissement
+                self.recently_closed_positions[symbol] = self.now()
+                self.state.mark_dirty()
+                # Supprimer aussi de la liste des positions virtuelles si elle existe
+                self.mark_virtual_position_closed(symbol)
+                print(f"⏳ Période de refroidissement démarrée pour {symbol} ({self.cooldown_period_hours}h)")
 
-Analyse LLM:
-{llm_validation.get('analysis', 'N/A')}
+            # Positions fermées: notifiées ensemble (résumé si plusieurs)
+            self.notify_closed_positions(closed_this_scan)
 
-Tendance: {analysis['trend']}
-RSI: {analysis['rsi']:.1f}
+        # Candidats ayant passé les gates locales, validés ensemble après la boucle
+        candidates = []
 
-🔗 Lien Bitget: {bitget_url}
-"""
+        for symbol in config.SYMBOLS:
+            try:
+                # Analyse
+                candles = candles_by_symbol[symbol]
+                if isinstance(candles, Exception):
+                    raise candles
+                analysis = cached_analyses.get(symbol)
+                if analysis is None:
+                    analysis = self.analyze_symbol(symbol, candles, batch=batch)
+                    self.analysis_cache.put(self.analysis_cache_key(symbol, candles), analysis)
+                else:
+                    print(f"♻️  {symbol}: Analyse en cache (bougies inchangées)")
 
-                            title = f"🚀 {signal['type']} {symbol}"
+                # Signal et gates réévalués à chaque scan: un rejet passager (capacité,
+                # cooldown, échéance LLM) peut être levé avant la bougie suivante
+                signal = self.generate_trading_signal(analysis)
 
-                            if self.send_pushover_notification(title, message, priority=1):
-                                self.mark_signal_as_sent(symbol, signal['type'])
-                                self.mark_virtual_position_opened(symbol, signal['type'])
-                                print(f"✅ {symbol}: Alerte {signal['type']} envoyée!")
-                    else:
-                        print(f"❌ {symbol}: Signal {signal['type']} rejeté par le LLM")
-                        print(f"   Raison: {llm_validation.get('analysis', 'N/A')}")
+                if signal:
+                    candidate = {'symbol': symbol, 'signal': signal, 'analysis': analysis}
+                    if self.signal_pipeline.run_local(candidate):
+                        candidates.append(candidate)
                 else:
                     print(f"⏸️  {symbol}: Pas de signal (Score: {analysis['score']}/100)")
 
             except Exception as e:
                 print(f"❌ Erreur pour {symbol}: {e}")
 
+        # Étape différée: validation LLM (parallèle ou groupée) puis exécution des signaux retenus
+        candidates = self.limit_to_capacity(candidates)
+        for candidate in self.signal_pipeline.run_deferred(candidates):
+            try:
+                self.execute_signal(candidate)
+            except Exception as e:
+                print(f"❌ Erreur pour {candidate['symbol']}: {e}")
+
+        # Une seule écriture de l'état de l'agent par scan
+        self.save_state()
+
+        cache_stats = self.analysis_cache.stats()
         print(f"\n{'='*70}")
+        print(f"♻️  Cache d'analyses: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.1f}%)")
+        self.signal_pipeline.print_stats()
+        if self.llm_cache is not None:
+            llm_stats = self.llm_cache.stats()
+            print(f"♻️  Cache LLM: {llm_stats['hits']} hits / {llm_stats['misses']} misses ({llm_stats['hit_rate']:.1f}%) - {llm_stats['size']} entrées")
         print(f"⏰ Prochain scan dans {config.CHECK_INTERVAL // 60} minutes")
         print(f"{'='*70}\n")
 
@@ -634,11 +823,14 @@ RSI: {analysis['rsi']:.1f}
                 "L'agent de trading a été arrêté.",
                 priority=0
             )
+            self.close()
 
 def analyze_crypto(df, symbol):
     """Fonction standalone pour l'analyse (utilisée par l'agent)"""
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
+    return analyze_rows(df.iloc[-1], df.iloc[-2], symbol)
+
+def analyze_rows(last, prev, symbol):
+    """Analyse à partir des indicateurs de la dernière bougie et de la précédente"""
     price = last['close']
 
     trend = "NEUTRE"
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+État d'exécution de l'agent conservé entre deux redémarrages
+
+Signaux déjà envoyés, périodes de refroidissement et positions virtuelles
+(mode notification) sont regroupés dans un seul fichier. Les modifications
+marquent l'état comme modifié; l'écriture (atomique) n'a lieu qu'au flush,
+au plus une fois par scan.
+"""
+
+import json
+import os
+from datetime import datetime
+from persistence import atomic_write_json
+
+
+class AgentState:
+    """Signaux actifs, cooldowns et positions virtuelles de l'agent"""
+
+    def __init__(self, path):
+        self.path = path
+        self.active_signals = {}  # {"SYMBOL_TYPE": iso datetime}
+        self.recently_closed_positions = {}  # {symbol: datetime}
+        self.virtual_positions = {}  # {symbol: {'type': signal_type, 'opened_at': datetime}}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        """Charge l'état; l'ancien format (dict des signaux actifs seul) est repris tel quel"""
+        try:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if not isinstance(data.get('active_signals'), dict):
+                self.active_signals = data
+                self.dirty = True
+                return
+            self.active_signals = data['active_signals']
+            self.recently_closed_positions = {
+                symbol: datetime.fromisoformat(closed_at)
+                for symbol, closed_at in data.get('cooldowns', {}).items()
+            }
+            self.virtual_positions = {
+                symbol: {'type': position['type'], 'opened_at': datetime.fromisoformat(position['opened_at'])}
+                for symbol, position in data.get('virtual_positions', {}).items()
+            }
+        except Exception as e:
+            print(f"✗ Erreur lors du chargement de l'état de l'agent: {e}")
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def flush(self):
+        """Écrit l'état s'il a changé depuis la dernière écriture"""
+        if not self.dirty:
+            return
+        try:
+            atomic_write_json(self.path, {
+                'active_signals': self.active_signals,
+                'cooldowns': {
+                    symbol: closed_at.isoformat()
+                    for symbol, closed_at in self.recently_closed_positions.items()
+                },
+                'virtual_positions': {
+                    symbol: {'type': position['type'], 'opened_at': position['opened_at'].isoformat()}
+                    for symbol, position in self.virtual_positions.items()
+                }
+            }, indent=2)
+            self.dirty = False
+        except Exception as e:
+            print(f"Erreur lors de la sauvegarde de l'état de l'agent: {e}")
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Backtest vectorisé de la stratégie sur un historique OHLCV
+
+Les indicateurs sont calculés une seule fois sur tout l'historique, le score
+d'analyze_crypto et les conditions LONG/SHORT de generate_trading_signal sont
+évalués en séries booléennes sur toutes les bougies. Seules les bougies avec
+signal sont parcourues; la sortie de chaque position est recherchée de façon
+vectorisée avec les règles de PaperTradingManager.update_positions
+(liquidation, trailing stop, TP fixe).
+
+La validation LLM n'est pas simulée: tous les signaux qui passent les filtres
+sont considérés comme validés.
+"""
+
+import argparse
+import heapq
+import itertools
+import os
+import time
+import numpy as np
+import pandas as pd
+import config
+from indicators import calculate_indicators
+from market_data import OHLCV_COLUMNS, candles_to_dataframe
+
+DATA_DIR = "/app/data" if os.path.exists("/app/data") else "data"
+HISTORY_DIR = os.path.join(DATA_DIR, "history")
+
+# Même fenêtre anti-doublon que TradingAgent.is_signal_already_active (4 heures)
+SIGNAL_DEDUP_MS = 4 * 3600 * 1000
+
+
+def default_params():
+    """Paramètres de la stratégie lus depuis config (mêmes valeurs par défaut que l'agent)"""
+    return {
+        'min_confidence_score': config.MIN_CONFIDENCE_SCORE,
+        'min_risk_reward': config.MIN_RISK_REWARD,
+        'high_confidence_only': getattr(config, 'NOTIFY_ON_HIGH_CONFIDENCE_ONLY', False),
+        'atr_multiplier_tp': getattr(config, 'ATR_MULTIPLIER_TP', 2.5),
+        'atr_multiplier_sl': getattr(config, 'ATR_MULTIPLIER_SL', 1.5),
+        'fixed_tp': getattr(config, 'PAPER_TRADING_FIXED_TP', True),
+        'fixed_tp_percent': getattr(config, 'PAPER_TRADING_FIXED_TP_PERCENT', 3.0),
+        'trailing_stop': getattr(config, 'PAPER_TRADING_TRAILING_STOP', False),
+        'trailing_stop_percent': getattr(config, 'PAPER_TRADING_TRAILING_STOP_PERCENT', 1.5),
+        'leverage': getattr(config, 'PAPER_TRADING_LEVERAGE', 1),
+        'simulate_liquidation': getattr(config, 'PAPER_TRADING_SIMULATE_LIQUIDATION', True),
+        'liquidation_threshold': getattr(config, 'PAPER_TRADING_LIQUIDATION_THRESHOLD', 0.8),
+        'initial_balance': getattr(config, 'PAPER_TRADING_INITIAL_BALANCE', 1000),
+        'position_size_percent': getattr(config, 'PAPER_TRADING_POSITION_SIZE_PERCENT', 2),
+        'max_positions': getattr(config, 'PAPER_TRADING_MAX_POSITIONS', 3),
+        'cooldown_hours': getattr(config, 'COOLDOWN_PERIOD_HOURS', 1),
+        'trading_hours_enabled': getattr(config, 'TRADING_HOURS_ENABLED', False),
+        'trading_hours_start': getattr(config, 'TRADING_HOURS_START', 0),
+        'trading_hours_end': getattr(config, 'TRADING_HOURS_END', 24),
+        'trading_days': getattr(config, 'TRADING_ENABLED_DAYS', [0, 1, 2, 3, 4, 5, 6]),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Historique
+# ---------------------------------------------------------------------------
+
+def fetch_history(exchange, symbol, timeframe, days):
+    """Télécharge l'historique OHLCV par pages de 1000 bougies (bougie en cours exclue)"""
+    step = exchange.parse_timeframe(timeframe) * 1000
+    since = exchange.milliseconds() - days * 86400 * 1000
+    candles = []
+    while True:
+        page = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=1000)
+        if not page:
+            break
+        candles.extend(page)
+        since = page[-1][0] + step
+        if len(page) < 1000:
+            break
+    return candles[:-1]
+
+
+def load_history(exchange, symbol, timeframe, days, refresh=False):
+    """Charge l'historique depuis le cache CSV local ou le télécharge"""
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    path = os.path.join(HISTORY_DIR, f"{symbol.replace('/', '')}_{timeframe}.csv")
+    since = (time.time() - days * 86400) * 1000
+
+    if os.path.exists(path) and not refresh:
+        cached = pd.read_csv(path)
+        if len(cached) and cached['timestamp'].iloc[0] <= since + exchange.parse_timeframe(timeframe) * 1000:
+            candles = cached[cached['timestamp'] >= since].values.tolist()
+            return candles_to_dataframe(candles)
+
+    print(f"⬇️  Téléchargement de l'historique {symbol} {timeframe} ({days} jours)...")
+    candles = fetch_history(exchange, symbol, timeframe, days)
+    pd.DataFrame(candles, columns=OHLCV_COLUMNS).to_csv(path, index=False)
+    return candles_to_dataframe(candles)
+
+
+# ---------------------------------------------------------------------------
+# Séries vectorisées
+# ---------------------------------------------------------------------------
+
+def _shift(values):
+    shifted = np.empty_like(values)
+    shifted[0] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def compute_scores(data):
+    """Score d'analyze_crypto calculé sur toutes les bougies à la fois"""
+    price = data['close']
+    rsi = data['rsi']
+    macd, macd_signal = data['macd'], data['macd_signal']
+    prev_macd, prev_signal = _shift(macd), _shift(macd_signal)
+
+    score = np.select([(rsi >= 30) & (rsi <= 70), (rsi < 30) | (rsi > 70)], [20, 30], 0)
+    score += 15  # MACD au-dessus ou en-dessous du signal
+    macd_cross = ((prev_macd <= prev_signal) & (macd > macd_signal)) | ((prev_macd >= prev_signal) & (macd < macd_signal))
+    score += np.where(macd_cross, 25, 10)
+    score += np.where((price <= data['bb_low']) | (price >= data['bb_high']), 20, 10)
+    ma_trend = ((price > data['ma_9']) & (data['ma_9'] > data['ma_21'])) | ((price < data['ma_9']) & (data['ma_9'] < data['ma_21']))
+    score += np.where(ma_trend, 15, 5)
+    score += np.where(data['volume'] > data['volume_ma'] * 1.5, 15, 5)
+
+    return np.minimum(score, 100)
+
+
+def prepare_symbol(df):
+    """Calcule une fois les indicateurs et le score sur tout l'historique d'un symbole"""
+    df = calculate_indicators(df.copy())
+    local_time = df['timestamp'].dt.tz_localize('UTC').dt.tz_convert('Europe/Paris')
+
+    data = {
+        'timestamp': df['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64),
+        'hour': local_time.dt.hour.to_numpy(),
+        'weekday': local_time.dt.weekday.to_numpy(),
+    }
+    columns = {
+        'high': 'high', 'low': 'low', 'close': 'close', 'volume': 'volume',
+        'ma_9': 'MA_9', 'ma_21': 'MA_21', 'ema_12': 'EMA_12', 'ema_50': 'EMA_50',
+        'rsi': 'RSI', 'macd': 'MACD', 'macd_signal': 'MACD_Signal',
+        'bb_low': 'BB_Low', 'bb_high': 'BB_High', 'atr': 'ATR', 'volume_ma': 'Volume_MA',
+    }
+    for name, column in columns.items():
+        data[name] = df[column].to_numpy(dtype=float)
+    data['score'] = compute_scores(data)
+    return data
+
+
+def compute_signals(data, params):
+    """Conditions LONG/SHORT de generate_trading_signal sur toutes les bougies
+
+    Retourne (side, tp, sl): side vaut 1 (LONG), -1 (SHORT) ou 0 (pas de signal).
+    """
+    price = data['close']
+    atr = data['atr']
+    score_ok = data['score'] >= params['min_confidence_score']
+
+    long_count = (
+        (data['rsi'] < 40).astype(int) + (price > data['ma_21']) +
+        (data['macd'] > data['macd_signal']) + score_ok
+    )
+    short_count = (
+        (data['rsi'] > 60).astype(int) + (price < data['ma_21']) +
+        (data['macd'] < data['macd_signal']) + score_ok
+    )
+    is_long = (data['ema_12'] > data['ema_50']) & (long_count >= 3)
+    is_short = ~is_long & (data['ema_12'] < data['ema_50']) & (short_count >= 3)
+    side = np.where(is_long, 1, np.where(is_short, -1, 0))
+
+    fixed_tp_percent = params['fixed_tp_percent'] / 100
+    if params['fixed_tp']:
+        tp = price * (1 + side * fixed_tp_percent)
+    else:
+        tp = price + side * atr * params['atr_multiplier_tp']
+    sl = price - side * atr * params['atr_multiplier_sl']
+
+    # Ratio Risk/Reward (un SL égal à l'entrée ne produit pas de signal)
+    risk = np.abs(sl - price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_reward = np.where(risk > 0, np.abs(tp - price) / risk, 0)
+    side = np.where(risk_reward >= params['min_risk_reward'], side, 0)
+
+    if params['high_confidence_only']:
+        side = np.where(data['score'] >= 75, side, 0)
+
+    if params['trading_hours_enabled']:
+        in_hours = (
+            np.isin(data['weekday'], params['trading_days']) &
+            (data['hour'] >= params['trading_hours_start']) &
+            (data['hour'] < params['trading_hours_end'])
+        )
+        side = np.where(in_hours, side, 0)
+
+    return side, tp, sl
+
+
+def find_exit(close, start, side, entry, tp, sl, liquidation_price, params):
+    """Recherche vectorisée de la sortie d'une position ouverte à la bougie `start`
+
+    Reproduit update_positions: liquidation d'abord, puis mise à jour du trailing
+    stop, puis TP et SL sur le prix de clôture de chaque bougie.
+    Retourne (index, prix de sortie, raison).
+    """
+    trailing_percent = params['trailing_stop_percent'] / 100 if params['trailing_stop'] else None
+    extreme = entry  # highest_price (LONG) / lowest_price (SHORT)
+    position = start + 1
+    chunk = 256
+
+    while position < len(close):
+        end = min(len(close), position + chunk)
+        prices = close[position:end]
+
+        if side == 1:
+            stops = np.full(len(prices), sl)
+            if trailing_percent is not None:
+                highest = np.maximum.accumulate(np.maximum(prices, extreme))
+                stops = np.where(highest > entry, np.maximum(sl, highest * (1 - trailing_percent)), sl)
+                extreme = highest[-1]
+            liquidated = prices <= liquidation_price if liquidation_price else np.zeros(len(prices), dtype=bool)
+            tp_hit = prices >= tp
+            sl_hit = prices <= stops
+        else:
+            stops = np.full(len(prices), sl)
+            if trailing_percent is not None:
+                lowest = np.minimum.accumulate(np.minimum(prices, extreme))
+                stops = np.where(lowest < entry, np.minimum(sl, lowest * (1 + trailing_percent)), sl)
+                extreme = lowest[-1]
+            liquidated = prices >= liquidation_price if liquidation_price else np.zeros(len(prices), dtype=bool)
+            tp_hit = prices <= tp
+            sl_hit = prices >= stops
+
+        hit = liquidated | tp_hit | sl_hit
+        if hit.any():
+            i = int(np.argmax(hit))
+            if liquidated[i]:
+                return position + i, liquidation_price, 'LIQUIDATED'
+            if tp_hit[i]:
+                return position + i, prices[i], 'TP_HIT'
+            return position + i, prices[i], 'SL_HIT'
+
+        position = end
+        chunk *= 2
+
+    return len(close) - 1, close[-1], 'END_OF_DATA'
+
+
+# ---------------------------------------------------------------------------
+# Simulation du portefeuille
+# ---------------------------------------------------------------------------
+
+def run_backtest(prepared, params=None):
+    """Simule la stratégie sur les historiques préparés {symbol: data}
+
+    Mêmes règles que l'agent en paper trading: une position par paire, nombre max
+    de positions, période de refroidissement, anti-doublon de 4h par signal,
+    taille de position en % de la balance libre, levier et liquidation.
+    """
+    params = {**default_params(), **(params or {})}
+    symbols = list(prepared)
+    leverage = params['leverage']
+    cooldown_ms = params['cooldown_hours'] * 3600 * 1000
+
+    # Bougies avec signal, tous symboles confondus, triées chronologiquement
+    signals = {}
+    candidate_ts, candidate_symbol, candidate_index = [], [], []
+    for s, symbol in enumerate(symbols):
+        side, tp, sl = compute_signals(prepared[symbol], params)
+        signals[symbol] = (side, tp, sl)
+        indices = np.flatnonzero(side)
+        candidate_ts.append(prepared[symbol]['timestamp'][indices])
+        candidate_symbol.append(np.full(len(indices), s))
+        candidate_index.append(indices)
+
+    if symbols:
+        candidate_ts = np.concatenate(candidate_ts)
+        order = np.argsort(candidate_ts, kind='stable')
+        candidate_ts = candidate_ts[order]
+        candidate_symbol = np.concatenate(candidate_symbol)[order]
+        candidate_index = np.concatenate(candidate_index)[order]
+
+    balance = params['initial_balance']
+    open_heap = []  # (exit_ts, seq, trade)
+    sequence = itertools.count()
+    busy_until = {}  # {symbol: timestamp de sortie + refroidissement}
+    last_signal = {}  # {(symbol, type): timestamp}
+    trades = []
+    equity_curve = [balance]
+    open_margin = 0.0
+
+    def close_trade(trade):
+        nonlocal balance, open_margin
+        if trade['close_reason'] != 'LIQUIDATED':
+            balance += trade['margin_usdt'] + trade['pnl_usdt']
+        open_margin -= trade['margin_usdt']
+        trades.append(trade)
+        equity_curve.append(balance + open_margin)
+
+    for ts, s, i in zip(candidate_ts, candidate_symbol, candidate_index):
+        while open_heap and open_heap[0][0] <= ts:
+            close_trade(heapq.heappop(open_heap)[2])
+
+        symbol = symbols[s]
+        if ts < busy_until.get(symbol, 0):
+            continue
+        side, tp_values, sl_values = signals[symbol]
+        signal_type = 'LONG' if side[i] == 1 else 'SHORT'
+        if ts - last_signal.get((symbol, signal_type), -SIGNAL_DEDUP_MS) < SIGNAL_DEDUP_MS:
+            continue
+        if len(open_heap) >= params['max_positions'] or balance <= 0:
+            continue
+
+        data = prepared[symbol]
+        entry = data['close'][i]
+        tp, sl = tp_values[i], sl_values[i]
+
+        margin = balance * (params['position_size_percent'] / 100)
+        size_crypto = margin * leverage / entry
+        liquidation_price = None
+        if params['simulate_liquidation'] and leverage > 1:
+            liquidation_price = entry * (1 - side[i] * params['liquidation_threshold'] / leverage)
+
+        exit_index, exit_price, reason = find_exit(
+            data['close'], i, side[i], entry, tp, sl, liquidation_price, params
+        )
+        if reason == 'LIQUIDATED':
+            pnl = -margin
+        else:
+            pnl = side[i] * (exit_price - entry) * size_crypto
+
+        balance -= margin
+        open_margin += margin
+        last_signal[(symbol, signal_type)] = ts
+        exit_ts = data['timestamp'][exit_index]
+        busy_until[symbol] = exit_ts + cooldown_ms
+
+        trade = {
+            'symbol': symbol,
+            'type': signal_type,
+            'entry_price': entry,
+            'exit_price': exit_price,
+            'opened_at': int(ts),
+            'closed_at': int(exit_ts),
+            'margin_usdt': margin,
+            'size_usdt': margin * leverage,
+            'leverage': leverage,
+            'pnl_usdt': pnl,
+            'pnl_percent_on_margin': (pnl / margin) * 100 if margin > 0 else 0,
+            'close_reason': reason,
+            'duration_hours': (exit_ts - ts) / 3600000,
+        }
+        heapq.heappush(open_heap, (exit_ts, next(sequence), trade))
+
+    while open_heap:
+        close_trade(heapq.heappop(open_heap)[2])
+
+    return summarize(trades, equity_curve, params)
+
+
+def summarize(trades, equity_curve, params):
+    """Statistiques de performance d'un backtest"""
+    initial_balance = params['initial_balance']
+    pnls = np.array([t['pnl_usdt'] for t in trades], dtype=float)
+    wins = pnls[pnls > 0]
+    losses = pnls[pnls <= 0]
+
+    equity = np.array(equity_curve, dtype=float)
+    peaks = np.maximum.accumulate(equity)
+    drawdowns = np.where(peaks > 0, (peaks - equity) / peaks, 0)
+
+    final_balance = equity[-1]
+    return {
+        'total_trades': len(trades),
+        'wins': len(wins),
+        'losses': len(losses),
+        'win_rate': (len(wins) / len(trades)) * 100 if trades else 0,
+        'total_pnl': float(pnls.sum()),
+        'final_balance': float(final_balance),
+        'roi': float((final_balance - initial_balance) / initial_balance) * 100,
+        'max_drawdown': float(drawdowns.max()) * 100,
+        'profit_factor': float(wins.sum() / -losses.sum()) if losses.sum() < 0 else float('inf') if len(wins) else 0,
+        'trades': trades,
+    }
+
+
+def print_results(results):
+    """Affiche le résumé d'un backtest"""
+    print("\n" + "="*80)
+    print("📈 RÉSULTATS DU BACKTEST")
+    print("="*80)
+    print(f"Total trades:      {results['total_trades']}")
+    print(f"Gagnants:          {results['wins']} ({results['win_rate']:.1f}%)")
+    print(f"Perdants:          {results['losses']}")
+    print(f"P&L total:         ${results['total_pnl']:+.2f}")
+    print(f"Balance finale:    ${results['final_balance']:.2f}")
+    print(f"ROI:               {results['roi']:+.2f}%")
+    print(f"Drawdown max:      {results['max_drawdown']:.2f}%")
+    print(f"Profit factor:     {results['profit_factor']:.2f}")
+
+    reasons = {}
+    for trade in results['trades']:
+        reasons[trade['close_reason']] = reasons.get(trade['close_reason'], 0) + 1
+    for reason, count in sorted(reasons.items()):
+        print(f"  {reason:<12} {count}")
+    print("="*80 + "\n")
+
+
+def load_prepared(symbols, timeframe, days, refresh=False):
+    """Charge et prépare l'historique de plusieurs symboles"""
+    import ccxt
+    exchange = ccxt.binance({'enableRateLimit': True})
+    return {symbol: prepare_symbol(load_history(exchange, symbol, timeframe, days, refresh)) for symbol in symbols}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest vectorisé de la stratégie")
+    parser.add_argument('--symbols', nargs='+', default=config.SYMBOLS)
+    parser.add_argument('--timeframe', default=config.TIMEFRAME)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--refresh', action='store_true', help="Re-télécharger l'historique")
+    args = parser.parse_args()
+
+    start = time.time()
+    prepared = load_prepared(args.symbols, args.timeframe, args.days, args.refresh)
+    prepared_time = time.time() - start
+
+    start = time.time()
+    results = run_backtest(prepared)
+    print_results(results)
+    print(f"⏱️  Préparation: {prepared_time:.2f}s | Simulation: {time.time() - start:.2f}s")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Caches utilisés par l'agent (LRU avec compteurs de hits/misses, TTL, persistance JSON)
+"""
+
+import json
+import time
+from collections import OrderedDict
+from persistence import atomic_write_json
+
+
+class LRUCache:
+    """Cache borné avec éviction LRU et statistiques d'utilisation"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Retourne la valeur associée à la clé (et la marque comme récemment utilisée)"""
+        if key in self.data:
+            self.data.move_to_end(key)
+            self.hits += 1
+            return self.data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Ajoute ou remplace une valeur, en évinçant la plus ancienne si le cache est plein"""
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def stats(self):
+        """Statistiques d'utilisation du cache"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total) * 100 if total else 0
+        }
+
+
+class TTLCache(LRUCache):
+    """Cache LRU dont les entrées expirent après `ttl` secondes, persisté en JSON si `path` est fourni
+
+    Les clés doivent être des chaînes et les valeurs sérialisables en JSON.
+    """
+
+    def __init__(self, maxsize=256, ttl=3600, path=None):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.path = path
+        if path:
+            self.load()
+
+    def get(self, key, default=None):
+        entry = self.data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self.data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.data[key]
+        self.misses += 1
+        return default
+
+    def __contains__(self, key):
+        # Sans effet sur les statistiques ni sur l'ordre LRU, comme LRUCache.__contains__
+        entry = self.data.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def put(self, key, value):
+        super().put(key, (time.time() + self.ttl, value))
+        if self.path:
+            self.save()
+
+    def load(self):
+        """Charge les entrées non expirées depuis le fichier"""
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"✗ Erreur lors du chargement du cache {self.path}: {e}")
+            return
+
+        now = time.time()
+        for key, expires_at, value in entries:
+            if expires_at > now:
+                self.data[key] = (expires_at, value)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def save(self):
+        """Sauvegarde le cache (écriture dans un fichier temporaire puis renommage)"""
+        try:
+            atomic_write_json(self.path, [[key, expires_at, value] for key, (expires_at, value) in self.data.items()])
+        except Exception as e:
+            print(f"Erreur lors de la sauvegarde du cache {self.path}: {e}")
@@ -5,14 +5,33 @@
 # Obtenez vos clés sur https://pushover.net/
 PUSHOVER_USER_KEY = "votre_user_key_ici"
 PUSHOVER_APP_TOKEN = "votre_app_token_ici"
+NOTIFICATION_QUEUE_SIZE = 100  # Taille max de la file d'envoi (au-delà, message conservé sur disque)
+NOTIFICATION_MAX_ATTEMPTS = 5  # Tentatives d'envoi avec délai exponentiel (1s, 2s, 4s...)
+NOTIFICATION_DIGEST = True  # Regrouper les positions fermées d'un même scan en une seule notification
 
 # Mistral API - Pour la validation des signaux
 # Obtenez votre clé sur https://console.mistral.ai/
 MISTRAL_API_KEY = "votre_api_key_mistral_ici"
 
+# Cache des validations LLM (évite de redemander l'avis du LLM pour un signal quasi identique)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_TTL_MINUTES = 60  # Durée de validité d'une validation en cache
+LLM_CACHE_MAX_SIZE = 500  # Nombre max de validations conservées
+LLM_CACHE_RSI_BUCKET = 5  # Largeur des tranches de RSI pour considérer deux signaux identiques
+
+# Validation LLM des signaux d'un scan (en fin de scan, après les filtres locaux)
+LLM_TIMEOUT_SECONDS = 20  # Échéance par appel: au-delà, le signal est rejeté (non mis en cache)
+LLM_CONCURRENCY = 4  # Nombre max d'appels Mistral simultanés
+LLM_BATCH_MODE = False  # True: un seul prompt pour tous les signaux du scan, un verdict JSON par symbole
+LLM_BATCH_TIMEOUT_SECONDS = 45  # Échéance du prompt groupé
+# MISTRAL_SERVER_URL = "http://localhost:8080"  # Serveur compatible Mistral (ex: stub local pour les tests)
+
 # Configuration de l'analyse
 TIMEFRAME = "15m"  # Timeframe pour le day trading (1m, 5m, 15m, 30m, 1h, 4h, 1d)
 CHECK_INTERVAL = 900  # Intervalle entre chaque analyse en secondes (900s = 15 min)
+INDICATOR_ENGINE = "streaming"  # "streaming" (incrémental O(1)), "batch" (NumPy, tous les symboles en une passe) ou "full" (ta)
+ANALYSIS_CACHE_SIZE = 256  # Nombre max d'analyses mémorisées (symbole, timeframe, dernière bougie clôturée, bougie en cours)
+FETCH_CONCURRENCY = 5  # Nombre max de requêtes OHLCV simultanées (rate limit Binance respecté par ccxt)
 
 # Cryptomonnaies à surveiller
 SYMBOLS = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT', 'ADA/USDT']
@@ -20,10 +39,16 @@ SYMBOLS = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT', 'ADA/USDT']
 # Paramètres de trading
 MIN_CONFIDENCE_SCORE = 65  # Score minimum pour générer un signal (0-100)
 MIN_RISK_REWARD = 1.5  # Ratio Risk/Reward minimum acceptable
+ATR_MULTIPLIER_TP = 2.5  # Take Profit = entrée ± ATR x multiplicateur (si TP fixe désactivé)
+ATR_MULTIPLIER_SL = 1.5  # Stop Loss = entrée ∓ ATR x multiplicateur
 
 # Options de notification
 NOTIFY_ON_HIGH_CONFIDENCE_ONLY = True  # N'envoyer que les signaux haute confiance (score >= 75)
 
+# Pipeline de décision: filtres appliqués dans cet ordre à chaque signal (le premier rejet arrête le pipeline)
+# Garder 'llm' en dernier pour ne payer l'appel Mistral que pour les signaux réellement exploitables
+SIGNAL_GATES = ['already_active', 'confidence', 'trading_hours', 'cooldown', 'open_position', 'capacity', 'llm']
+
 # Horaires de trading (heures locales)
 TRADING_HOURS_ENABLED = True  # Activer/désactiver les restrictions d'horaires
 TRADING_HOURS_START = 9   # Début des notifications à 9h
@@ -39,6 +64,13 @@ PAPER_TRADING_INITIAL_BALANCE = 1000  # Capital de départ en USDT
 PAPER_TRADING_POSITION_SIZE_PERCENT = 2  # % du capital par trade (2%)
 PAPER_TRADING_MAX_POSITIONS = 3  # Nombre max de positions simultanées
 PAPER_TRADING_TRACK_FILE = "data/paper_trading_history.json"  # Fichier d'historique
+PAPER_TRADING_SNAPSHOT_EVERY = 100  # Événements journalisés entre deux sauvegardes complètes de l'historique
+PAPER_TRADING_STORAGE = "json"  # "json" (fichier + journal) ou "sqlite" (base indexée, historique importé au 1er démarrage)
+PAPER_TRADING_DB_FILE = "data/paper_trading.db"  # Base utilisée si PAPER_TRADING_STORAGE = "sqlite"
+PAPER_TRADING_ARCHIVE_AFTER_DAYS = 30  # Trades fermés plus anciens déplacés vers l'archive compressée (0 = désactivé, stockage JSON)
+PAPER_TRADING_ARCHIVE_DIR = "data/archive"  # Segments mensuels compressés + index des trades archivés
+PAPER_TRADING_INTRABAR = True  # Vérifier TP/SL/liquidation sur les plus hauts/bas des bougies depuis le dernier scan
+PAPER_TRADING_INTRABAR_TIMEFRAME = "1m"  # Bougies utilisées pour la vérification intra-bougie
 
 # Effet de levier (Futures)
 PAPER_TRADING_LEVERAGE = 5  # Effet de levier (1 = pas de levier, 5 = 5x)
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Indicateurs techniques: calcul complet (ta), moteur incrémental par symbole et noyau NumPy multi-symboles
+"""
+
+import math
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import ta
+
+NAN = float('nan')
+
+
+def calculate_indicators(df):
+    """Calcule tous les indicateurs techniques sur un DataFrame OHLCV complet"""
+    # Moyennes mobiles
+    df['MA_9'] = ta.trend.sma_indicator(df['close'], window=9)
+    df['MA_21'] = ta.trend.sma_indicator(df['close'], window=21)
+    df['MA_50'] = ta.trend.sma_indicator(df['close'], window=50)
+    df['EMA_12'] = ta.trend.ema_indicator(df['close'], window=12)
+    df['EMA_50'] = ta.trend.ema_indicator(df['close'], window=50)
+
+    # RSI
+    df['RSI'] = ta.momentum.rsi(df['close'], window=14)
+
+    # MACD
+    macd = ta.trend.MACD(df['close'])
+    df['MACD'] = macd.macd()
+    df['MACD_Signal'] = macd.macd_signal()
+    df['MACD_Hist'] = macd.macd_diff()
+
+    # Bollinger Bands
+    bollinger = ta.volatility.BollingerBands(df['close'])
+    df['BB_High'] = bollinger.bollinger_hband()
+    df['BB_Low'] = bollinger.bollinger_lband()
+    df['BB_Mid'] = bollinger.bollinger_mavg()
+
+    # ATR pour volatilité
+    df['ATR'] = ta.volatility.average_true_range(df['high'], df['low'], df['close'], window=14)
+
+    # Volume
+    df['Volume_MA'] = df['volume'].rolling(window=20).mean()
+
+    return df
+
+
+# ---------------------------------------------------------------------------
+# Moteur incrémental
+#
+# Chaque indicateur expose step(x, commit): avec commit=False la valeur est
+# calculée pour une bougie encore ouverte sans modifier l'état, avec
+# commit=True la bougie (clôturée) est intégrée à l'état. Les deux cas sont
+# en O(1). Les formules reproduisent celles de la librairie ta.
+# ---------------------------------------------------------------------------
+
+class RollingWindow:
+    """Moyenne et écart-type (ddof=0) glissants par sommes courantes"""
+
+    # Recalcul périodique des sommes pour éviter la dérive des flottants
+    RESUM_EVERY = 1000
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.pushes = 0
+
+    def _sums(self, x):
+        total = self.total + x
+        total_sq = self.total_sq + x * x
+        count = len(self.values) + 1
+        if count > self.window:
+            oldest = self.values[0]
+            total -= oldest
+            total_sq -= oldest * oldest
+            count = self.window
+        return total, total_sq, count
+
+    def step(self, x, commit=False):
+        """Retourne (moyenne, écart-type) incluant x"""
+        total, total_sq, count = self._sums(x)
+
+        if commit:
+            self.values.append(x)
+            if len(self.values) > self.window:
+                self.values.popleft()
+            self.total, self.total_sq = total, total_sq
+            self.pushes += 1
+            if self.pushes % self.RESUM_EVERY == 0:
+                self.total = math.fsum(self.values)
+                self.total_sq = math.fsum(v * v for v in self.values)
+
+        if count < self.window:
+            return NAN, NAN
+        mean = total / count
+        variance = max(total_sq / count - mean * mean, 0.0)
+        return mean, math.sqrt(variance)
+
+
+class Ema:
+    """Moyenne mobile exponentielle (équivalent pandas ewm(adjust=False))"""
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = None
+        self.count = 0
+
+    @classmethod
+    def from_span(cls, span):
+        return cls(2 / (span + 1), span)
+
+    def step(self, x, commit=False):
+        if x != x:  # NaN: la série n'a pas encore démarré
+            return NAN
+
+        if self.value is None:
+            value = x
+        else:
+            value = self.alpha * x + (1 - self.alpha) * self.value
+        count = self.count + 1
+
+        if commit:
+            self.value = value
+            self.count = count
+
+        return value if count >= self.min_periods else NAN
+
+
+class Rsi:
+    """RSI avec lissage de Wilder (alpha = 1/window)"""
+
+    def __init__(self, window=14):
+        self.ema_up = Ema(1 / window, window)
+        self.ema_down = Ema(1 / window, window)
+        self.prev_close = None
+
+    def step(self, close, commit=False):
+        diff = 0.0 if self.prev_close is None else close - self.prev_close
+        up = self.ema_up.step(diff if diff > 0 else 0.0, commit)
+        down = self.ema_down.step(-diff if diff < 0 else 0.0, commit)
+
+        if commit:
+            self.prev_close = close
+
+        if down != down:
+            return NAN
+        if down == 0:
+            return 100.0
+        return 100 - (100 / (1 + up / down))
+
+
+class Atr:
+    """Average True Range avec lissage de Wilder (valeurs à 0 pendant le warm-up, comme ta)"""
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_close = None
+        self.count = 0
+        self.warmup_sum = 0.0
+        self.value = 0.0
+
+    def step(self, high, low, close, commit=False):
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+        count = self.count + 1
+        warmup_sum = self.warmup_sum
+        if count < self.window:
+            warmup_sum += true_range
+            value = 0.0
+        elif count == self.window:
+            value = (warmup_sum + true_range) / self.window
+        else:
+            value = (self.value * (self.window - 1) + true_range) / self.window
+
+        if commit:
+            self.prev_close = close
+            self.count = count
+            self.warmup_sum = warmup_sum
+            self.value = value
+
+        return value
+
+
+class IndicatorEngine:
+    """État incrémental de tous les indicateurs d'un symbole
+
+    Produit les mêmes colonnes que calculate_indicators, bougie par bougie.
+    """
+
+    def __init__(self):
+        self.ma_9 = RollingWindow(9)
+        self.ma_21 = RollingWindow(21)
+        self.ma_50 = RollingWindow(50)
+        self.bollinger = RollingWindow(20)
+        self.volume_ma = RollingWindow(20)
+        self.ema_12 = Ema.from_span(12)
+        self.ema_50 = Ema.from_span(50)
+        self.macd_fast = Ema.from_span(12)
+        self.macd_slow = Ema.from_span(26)
+        self.macd_signal = Ema.from_span(9)
+        self.rsi = Rsi(14)
+        self.atr = Atr(14)
+        self.last_timestamp = None
+        self.last_row = None
+
+    def _step(self, candle, commit):
+        timestamp, open_, high, low, close, volume = candle[:6]
+
+        bb_mid, bb_std = self.bollinger.step(close, commit)
+        macd = self.macd_fast.step(close, commit) - self.macd_slow.step(close, commit)
+        macd_signal = self.macd_signal.step(macd, commit)
+
+        return {
+            'timestamp': timestamp,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume,
+            'MA_9': self.ma_9.step(close, commit)[0],
+            'MA_21': self.ma_21.step(close, commit)[0],
+            'MA_50': self.ma_50.step(close, commit)[0],
+            'EMA_12': self.ema_12.step(close, commit),
+            'EMA_50': self.ema_50.step(close, commit),
+            'RSI': self.rsi.step(close, commit),
+            'MACD': macd,
+            'MACD_Signal': macd_signal,
+            'MACD_Hist': macd - macd_signal,
+            'BB_High': bb_mid + 2 * bb_std,
+            'BB_Low': bb_mid - 2 * bb_std,
+            'BB_Mid': bb_mid,
+            'ATR': self.atr.step(high, low, close, commit),
+            'Volume_MA': self.volume_ma.step(volume, commit)[0],
+        }
+
+    def update(self, candle):
+        """Intègre une bougie clôturée et retourne ses indicateurs"""
+        row = self._step(candle, commit=True)
+        self.last_timestamp = candle[0]
+        self.last_row = row
+        return row
+
+    def preview(self, candle):
+        """Indicateurs d'une bougie encore ouverte, sans modifier l'état"""
+        return self._step(candle, commit=False)
+
+
+class StreamingIndicators:
+    """Moteurs incrémentaux par (symbole, timeframe), alimentés par le cache de bougies"""
+
+    def __init__(self):
+        self.engines = {}
+
+    def rows(self, symbol, timeframe, candles):
+        """Retourne (last, prev): indicateurs de la bougie en cours et de la dernière bougie clôturée
+
+        Seules les bougies clôturées depuis le dernier appel sont intégrées. Si l'historique
+        ne prolonge plus l'état (trou, rechargement), le moteur est reconstruit.
+
+        L'état couvre tout l'historique vu depuis la construction du moteur, pas seulement
+        les bougies du buffer glissant: les indicateurs récursifs (EMA, MACD, RSI et ATR de
+        Wilder) diffèrent donc légèrement de ta recalculé sur le même buffer (moteur "full",
+        backtest), qui repart de la première bougie du buffer. L'écart est le poids résiduel
+        de ce point de départ, (1 - alpha) ^ longueur du buffer: de l'ordre de 1e-4 du prix
+        pour l'EMA 50 avec 200 bougies, négligeable pour les autres; les moyennes glissantes
+        sont identiques.
+        """
+        closed, current = candles[:-1], candles[-1]
+        if not closed:
+            raise ValueError(f"Pas assez de bougies pour {symbol}")
+
+        key = (symbol, timeframe)
+        engine = self.engines.get(key)
+        new_candles = None
+
+        if engine is not None:
+            i = len(closed) - 1
+            while i >= 0 and closed[i][0] > engine.last_timestamp:
+                i -= 1
+            if i >= 0 and closed[i][0] == engine.last_timestamp:
+                new_candles = closed[i + 1:]
+
+        if new_candles is None:
+            engine = IndicatorEngine()
+            self.engines[key] = engine
+            new_candles = closed
+
+        for candle in new_candles:
+            engine.update(candle)
+
+        return engine.preview(current), engine.last_row
+
+
+# ---------------------------------------------------------------------------
+# Noyau vectorisé multi-symboles
+#
+# Les séries de N symboles sont empilées dans des tableaux 2-D (N x T),
+# alignées à droite (la dernière colonne est la bougie la plus récente) et
+# complétées à gauche par des NaN si l'historique est plus court. Chaque
+# indicateur est calculé pour tous les symboles à la fois.
+# ---------------------------------------------------------------------------
+
+def _rolling_mean_std(values, window):
+    """Moyenne et écart-type (ddof=0) glissants sur l'axe du temps"""
+    n, t = values.shape
+    mean = np.full((n, t), np.nan)
+    std = np.full((n, t), np.nan)
+    if t >= window:
+        windows = sliding_window_view(values, window, axis=1)
+        mean[:, window - 1:] = windows.mean(axis=-1)
+        std[:, window - 1:] = windows.std(axis=-1)
+    return mean, std
+
+
+def _ema_batch(values, alpha, min_periods):
+    """EMA (ewm adjust=False) démarrant à la première valeur non-NaN de chaque ligne"""
+    n, t = values.shape
+    out = np.full((n, t), np.nan)
+    state = np.full(n, np.nan)
+    count = np.zeros(n)
+    for j in range(t):
+        x = values[:, j]
+        valid = ~np.isnan(x)
+        state = np.where(valid, np.where(np.isnan(state), x, alpha * x + (1 - alpha) * state), state)
+        count += valid
+        out[:, j] = np.where(valid & (count >= min_periods), state, np.nan)
+    return out
+
+
+def _rsi_batch(close, window=14):
+    diff = np.empty_like(close)
+    diff[:, 0] = np.nan
+    diff[:, 1:] = close[:, 1:] - close[:, :-1]
+    missing = np.isnan(close)
+    up = np.where(missing, np.nan, np.where(diff > 0, diff, 0.0))
+    down = np.where(missing, np.nan, np.where(diff < 0, -diff, 0.0))
+    ema_up = _ema_batch(up, 1 / window, window)
+    ema_down = _ema_batch(down, 1 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ema_down == 0, 100.0, 100 - (100 / (1 + ema_up / ema_down)))
+
+
+def _atr_batch(high, low, close, window=14):
+    prev_close = np.empty_like(close)
+    prev_close[:, 0] = np.nan
+    prev_close[:, 1:] = close[:, :-1]
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+    n, t = close.shape
+    out = np.full((n, t), np.nan)
+    count = np.zeros(n)
+    warmup_sum = np.zeros(n)
+    atr = np.zeros(n)
+    for j in range(t):
+        tr = true_range[:, j]
+        valid = ~np.isnan(tr)
+        count += valid
+        warmup_sum = np.where(valid & (count <= window), warmup_sum + tr, warmup_sum)
+        atr = np.where(valid & (count == window), warmup_sum / window, atr)
+        atr = np.where(valid & (count > window), (atr * (window - 1) + tr) / window, atr)
+        out[:, j] = np.where(valid, np.where(count < window, 0.0, atr), np.nan)
+    return out
+
+
+def stack_candles(candles_by_symbol):
+    """Empile les bougies de plusieurs symboles en tableaux 2-D alignés à droite"""
+    symbols = list(candles_by_symbol)
+    length = max((len(c) for c in candles_by_symbol.values()), default=0)
+    data = np.full((len(symbols), length, 6), np.nan)
+    for i, symbol in enumerate(symbols):
+        candles = candles_by_symbol[symbol]
+        if len(candles):
+            data[i, length - len(candles):, :] = np.asarray(candles, dtype=float)[:, :6]
+    return symbols, {
+        'timestamp': data[:, :, 0],
+        'open': data[:, :, 1],
+        'high': data[:, :, 2],
+        'low': data[:, :, 3],
+        'close': data[:, :, 4],
+        'volume': data[:, :, 5],
+    }
+
+
+class BatchIndicators:
+    """Indicateurs de N symboles stockés en tableaux 2-D (symboles x bougies)"""
+
+    def __init__(self, symbols, columns):
+        self.symbols = symbols
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.columns = columns
+
+    def row(self, symbol, position=-1):
+        """Valeurs de tous les indicateurs pour une bougie d'un symbole"""
+        i = self.index[symbol]
+        return {name: float(values[i, position]) for name, values in self.columns.items()}
+
+    def rows(self, symbol):
+        """Retourne (last, prev) au format attendu par analyze_rows"""
+        return self.row(symbol, -1), self.row(symbol, -2)
+
+
+def calculate_indicators_batch(candles_by_symbol):
+    """Calcule tous les indicateurs pour tous les symboles en passes vectorisées"""
+    symbols, columns = stack_candles(candles_by_symbol)
+    close = columns['close']
+
+    columns['MA_9'] = _rolling_mean_std(close, 9)[0]
+    columns['MA_21'] = _rolling_mean_std(close, 21)[0]
+    columns['MA_50'] = _rolling_mean_std(close, 50)[0]
+
+    ema_12 = _ema_batch(close, 2 / 13, 12)
+    columns['EMA_12'] = ema_12
+    columns['EMA_50'] = _ema_batch(close, 2 / 51, 50)
+
+    columns['RSI'] = _rsi_batch(close, 14)
+
+    macd = ema_12 - _ema_batch(close, 2 / 27, 26)
+    macd_signal = _ema_batch(macd, 2 / 10, 9)
+    columns['MACD'] = macd
+    columns['MACD_Signal'] = macd_signal
+    columns['MACD_Hist'] = macd - macd_signal
+
+    bb_mid, bb_std = _rolling_mean_std(close, 20)
+    columns['BB_High'] = bb_mid + 2 * bb_std
+    columns['BB_Low'] = bb_mid - 2 * bb_std
+    columns['BB_Mid'] = bb_mid
+
+    columns['ATR'] = _atr_batch(columns['high'], columns['low'], close, 14)
+    columns['Volume_MA'] = _rolling_mean_std(columns['volume'], 20)[0]
+
+    return BatchIndicators(symbols, columns)
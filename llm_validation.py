@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Validation des signaux par Mistral AI
+
+Construction des prompts, lecture des réponses JSON et étape asynchrone qui
+valide tous les candidats d'un scan en parallèle (une échéance par appel), ou
+en un seul prompt groupé qui retourne un verdict par symbole.
+"""
+
+import asyncio
+import json
+import re
+from mistralai import Mistral
+
+MODEL = "mistral-large-latest"
+
+
+def create_client(config):
+    """Client Mistral; MISTRAL_SERVER_URL permet de pointer vers un serveur local compatible (tests)"""
+    return Mistral(api_key=config.MISTRAL_API_KEY, server_url=getattr(config, 'MISTRAL_SERVER_URL', None))
+
+
+def build_prompt(analysis, signal):
+    """Prompt de validation d'un signal"""
+    return f"""Tu es un expert en trading de cryptomonnaies. Analyse ce signal de trading et donne ton avis.
+
+{describe_signal(analysis, signal)}
+
+Analyse ce signal et réponds en format JSON avec cette structure:
+{{
+  "valid": true/false,
+  "confidence_adjusted": 0-100,
+  "analysis": "ton analyse détaillée en 2-3 phrases",
+  "recommendation": "STRONG_BUY/BUY/HOLD/SELL/STRONG_SELL"
+}}
+
+Sois critique et objectif. Ne valide que les signaux vraiment solides."""
+
+
+def build_batch_prompt(items):
+    """Prompt unique pour valider plusieurs signaux (items: liste de (analysis, signal))"""
+    blocks = [f"=== SIGNAL {i + 1} ===\n{describe_signal(analysis, signal)}" for i, (analysis, signal) in enumerate(items)]
+    return f"""Tu es un expert en trading de cryptomonnaies. Analyse chacun de ces {len(items)} signaux de trading indépendamment et donne ton avis.
+
+{chr(10).join(blocks)}
+
+Réponds en format JSON avec un verdict par signal, identifié par sa cryptomonnaie:
+{{
+  "verdicts": [
+    {{
+      "symbol": "BTC/USDT",
+      "valid": true/false,
+      "confidence_adjusted": 0-100,
+      "analysis": "ton analyse détaillée en 2-3 phrases",
+      "recommendation": "STRONG_BUY/BUY/HOLD/SELL/STRONG_SELL"
+    }}
+  ]
+}}
+
+Sois critique et objectif. Ne valide que les signaux vraiment solides."""
+
+
+def describe_signal(analysis, signal):
+    """Description d'un signal et de ses indicateurs pour le prompt"""
+    return f"""CRYPTOMONNAIE: {analysis['symbol']}
+PRIX ACTUEL: ${analysis['price']:.4f}
+TENDANCE: {analysis['trend']}
+
+INDICATEURS TECHNIQUES:
+- RSI: {analysis['rsi']:.1f}
+- MACD: {analysis['macd']:.4f} | Signal: {analysis['macd_signal']:.4f}
+- MA21: ${analysis['ma_21']:.4f}
+- MA50: ${analysis['ma_50']:.4f}
+- EMA12: ${analysis['ema_12']:.4f}
+- EMA50: ${analysis['ema_50']:.4f}
+- Croisement EMA: {'EMA12 > EMA50 (Haussier)' if analysis['ema_12'] > analysis['ema_50'] else 'EMA12 < EMA50 (Baissier)'}
+- Bollinger Bands: ${analysis['bb_low']:.4f} - ${analysis['bb_high']:.4f}
+- Volume: {analysis['volume']:.0f} (Moyenne: {analysis['volume_ma']:.0f})
+
+SIGNAUX DÉTECTÉS:
+{chr(10).join(['- ' + s for s in analysis['signals']])}
+
+SIGNAL PROPOSÉ:
+- Type: {signal['type']}
+- Entrée: ${signal['entry']:.4f}
+- Take Profit: ${signal['tp']:.4f} ({((signal['tp']-signal['entry'])/signal['entry']*100):.2f}%)
+- Stop Loss: ${signal['sl']:.4f} ({((signal['sl']-signal['entry'])/signal['entry']*100):.2f}%)
+- Risk/Reward: 1:{signal['risk_reward']:.2f}
+- Score de confiance: {signal['confidence']}/100"""
+
+
+def error_result(message):
+    """Résultat d'une validation en échec (jamais mis en cache)"""
+    return {"valid": False, "analysis": message, "error": True}
+
+
+def extract_json(content):
+    """Extrait le premier objet JSON d'une réponse LLM (None si absent ou invalide)"""
+    if content is None:
+        return None
+    json_match = re.search(r'\{.*\}', str(content), re.DOTALL)
+    if not json_match:
+        return None
+    try:
+        return json.loads(json_match.group())
+    except json.JSONDecodeError:
+        return None
+
+
+def parse_response(content):
+    """Lit la réponse d'une validation unitaire"""
+    if content is None:
+        return error_result("Réponse LLM vide")
+    result = extract_json(content)
+    if not isinstance(result, dict):
+        return error_result("Erreur de parsing de la réponse LLM")
+    return result
+
+
+def parse_batch_response(content, symbols):
+    """Lit la réponse groupée: un résultat par symbole, dans l'ordre de `symbols`"""
+    parsed = extract_json(content)
+    verdicts = parsed.get('verdicts') if isinstance(parsed, dict) else None
+    if not isinstance(verdicts, list):
+        return [error_result("Erreur de parsing de la réponse LLM groupée") for _ in symbols]
+
+    by_symbol = {v.get('symbol'): v for v in verdicts if isinstance(v, dict)}
+    results = []
+    for symbol in symbols:
+        verdict = by_symbol.get(symbol)
+        if verdict is None:
+            results.append(error_result(f"Pas de verdict pour {symbol} dans la réponse groupée"))
+        else:
+            results.append({k: v for k, v in verdict.items() if k != 'symbol'})
+    return results
+
+
+async def complete_async(client, prompt, timeout, max_tokens=500):
+    """Appel Mistral asynchrone borné par une échéance (secondes)"""
+    response = await asyncio.wait_for(
+        client.chat.complete_async(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=max_tokens
+        ),
+        timeout=timeout
+    )
+    return response.choices[0].message.content
+
+
+async def validate_async(client, analysis, signal, timeout, semaphore):
+    """Valide un signal; un dépassement d'échéance ou une erreur donne un rejet non mis en cache"""
+    async with semaphore:
+        try:
+            content = await complete_async(client, build_prompt(analysis, signal), timeout)
+        except asyncio.TimeoutError:
+            print(f"⌛ {analysis['symbol']}: Validation LLM abandonnée après {timeout}s")
+            return error_result(f"Délai de validation dépassé ({timeout}s)")
+        except Exception as e:
+            print(f"Erreur validation LLM: {e}")
+            return error_result(f"Erreur: {str(e)}")
+    return parse_response(content)
+
+
+async def validate_all_async(client, items, timeout, concurrency=4):
+    """Valide tous les signaux (liste de (analysis, signal)) en parallèle, résultats dans le même ordre"""
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*[
+        validate_async(client, analysis, signal, timeout, semaphore)
+        for analysis, signal in items
+    ])
+
+
+async def validate_batch_async(client, items, timeout):
+    """Valide tous les signaux en un seul prompt, résultats dans le même ordre"""
+    symbols = [analysis['symbol'] for analysis, _ in items]
+    try:
+        # Réponse plus longue: environ un paragraphe par signal
+        content = await complete_async(client, build_batch_prompt(items), timeout, max_tokens=300 * len(items) + 200)
+    except asyncio.TimeoutError:
+        print(f"⌛ Validation LLM groupée abandonnée après {timeout}s")
+        return [error_result(f"Délai de validation dépassé ({timeout}s)") for _ in symbols]
+    except Exception as e:
+        print(f"Erreur validation LLM groupée: {e}")
+        return [error_result(f"Erreur: {str(e)}") for _ in symbols]
+    return parse_batch_response(content, symbols)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Lecture de la fin du log du bot à coût constant
+
+tail_lines lit le fichier par blocs depuis la fin jusqu'à trouver assez de
+lignes. read_since ne renvoie que les lignes ajoutées depuis une position
+(octets); un changement d'inode (rotation) ou une taille inférieure à la
+position (troncature) fait repartir de la fin du nouveau fichier.
+
+Seules les lignes complètes sont renvoyées: la position retournée suit le
+dernier saut de ligne, une ligne en cours d'écriture sera lue au prochain appel.
+"""
+
+import os
+
+BLOCK_SIZE = 8192
+
+
+def _tail(f, size, n):
+    """(lignes, position de fin) des `n` dernières lignes complètes d'un fichier ouvert"""
+    end = size
+    position = size
+    data = b''
+    # Ignorer une dernière ligne incomplète
+    while position > 0:
+        read_size = min(BLOCK_SIZE, position)
+        position -= read_size
+        f.seek(position)
+        data = f.read(read_size) + data
+        newline = data.rfind(b'\n')
+        if newline != -1:
+            end = position + newline + 1
+            data = data[:newline + 1]
+            break
+    else:
+        return [], 0
+
+    # Remonter jusqu'à n + 1 sauts de ligne (début de la n-ième ligne avant la fin)
+    while data.count(b'\n') <= n and position > 0:
+        read_size = min(BLOCK_SIZE, position)
+        position -= read_size
+        f.seek(position)
+        data = f.read(read_size) + data
+
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    return lines[-n:] if n > 0 else [], end
+
+
+def tail_lines(path, n=100, end=None, inode=None):
+    """Les `n` dernières lignes du fichier; retourne {'lines', 'offset', 'inode'}
+
+    end (position d'un read_since précédent) arrête la lecture à cette position
+    si le fichier est toujours le même (inode) et n'a pas été tronqué.
+    """
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            if end is not None and (inode is None or st.st_ino == inode) and end <= size:
+                size = end
+            lines, offset = _tail(f, size, n)
+            return {'lines': lines, 'offset': offset, 'inode': st.st_ino}
+    except FileNotFoundError:
+        return {'lines': [], 'offset': 0, 'inode': None}
+
+
+def read_since(path, offset, inode=None, max_lines=100, max_bytes=1024 * 1024):
+    """Lignes ajoutées depuis `offset`; retourne {'lines', 'offset', 'inode', 'reset'}
+
+    reset vaut True si le fichier a été remplacé (inode différent), tronqué, ou
+    si le retard dépasse max_bytes: les lignes sont alors les `max_lines`
+    dernières du fichier actuel.
+    """
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if (inode is not None and st.st_ino != inode) or st.st_size < offset or st.st_size - offset > max_bytes:
+                lines, end = _tail(f, st.st_size, max_lines)
+                return {'lines': lines, 'offset': end, 'inode': st.st_ino, 'reset': True}
+
+            f.seek(offset)
+            chunk = f.read(st.st_size - offset)
+            end = chunk.rfind(b'\n') + 1
+            lines = chunk[:end].decode('utf-8', errors='replace').splitlines()
+            return {'lines': lines, 'offset': offset + end, 'inode': st.st_ino, 'reset': False}
+    except FileNotFoundError:
+        return {'lines': [], 'offset': 0, 'inode': None, 'reset': offset > 0}
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Cache incrémental des bougies OHLCV (ring buffer par symbole et timeframe)
+"""
+
+import asyncio
+from collections import deque
+import pandas as pd
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def candles_to_dataframe(candles):
+    """Convertit une liste de bougies [timestamp, open, high, low, close, volume] en DataFrame"""
+    df = pd.DataFrame(candles, columns=OHLCV_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+
+class CandleCache:
+    def __init__(self, exchange, limit=200):
+        self.exchange = exchange
+        self.limit = limit
+        # {(symbol, timeframe): deque([timestamp, open, high, low, close, volume])}
+        self.buffers = {}
+
+    def timeframe_ms(self, timeframe):
+        """Durée d'une bougie en millisecondes"""
+        return self.exchange.parse_timeframe(timeframe) * 1000
+
+    def since(self, symbol, timeframe):
+        """Timestamp de la dernière bougie stockée (None si rechargement complet nécessaire)"""
+        buffer = self.buffers.get((symbol, timeframe))
+        if not buffer:
+            return None
+        return buffer[-1][0]
+
+    def store(self, symbol, timeframe, ohlcv):
+        """Remplace entièrement le buffer d'un symbole"""
+        self.buffers[(symbol, timeframe)] = deque((list(candle) for candle in ohlcv), maxlen=self.limit)
+
+    def merge(self, symbol, timeframe, ohlcv, now=None):
+        """Fusionne les bougies récupérées depuis `since` dans le buffer
+
+        La dernière bougie stockée (encore ouverte) est remplacée par sa version à jour.
+        Retourne False si un trou est détecté: le buffer doit alors être rechargé.
+        Une page pleine (`limit` bougies) ou une dernière bougie antérieure à
+        now (ms) moins une bougie compte comme un trou: après une longue
+        interruption, la page part de `since` et s'arrête avant le présent.
+        """
+        buffer = self.buffers.get((symbol, timeframe))
+        if not buffer or len(ohlcv) >= self.limit:
+            return False
+
+        step = self.timeframe_ms(timeframe)
+        for candle in ohlcv:
+            last_timestamp = buffer[-1][0]
+            timestamp = candle[0]
+            if timestamp == last_timestamp:
+                buffer[-1] = list(candle)
+            elif timestamp > last_timestamp:
+                if timestamp - last_timestamp > step:
+                    return False
+                buffer.append(list(candle))
+            # Bougies plus anciennes que le buffer: ignorées
+
+        return now is None or buffer[-1][0] >= now - step
+
+    async def get_candles_async(self, exchange, symbol, timeframe, semaphore):
+        """Récupère les bougies d'un symbole en ne téléchargeant que les nouvelles (exchange ccxt.async_support)"""
+        async with semaphore:
+            since = self.since(symbol, timeframe)
+            if since is not None:
+                ohlcv = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=self.limit)
+                if self.merge(symbol, timeframe, ohlcv, exchange.milliseconds()):
+                    return list(self.buffers[(symbol, timeframe)])
+                print(f"⚠️  {symbol}: Trou détecté dans les bougies {timeframe}, rechargement complet")
+
+            ohlcv = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=self.limit)
+            self.store(symbol, timeframe, ohlcv)
+            return list(self.buffers[(symbol, timeframe)])
+
+    async def get_all_candles_async(self, exchange, symbols, timeframe, concurrency=5):
+        """Récupère les bougies de tous les symboles en parallèle
+
+        Le nombre de requêtes simultanées est limité par `concurrency`; le rate limit
+        de l'exchange reste appliqué par ccxt (enableRateLimit).
+        Retourne {symbol: bougies} ou {symbol: exception} en cas d'erreur sur un symbole.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        results = await asyncio.gather(
+            *(self.get_candles_async(exchange, symbol, timeframe, semaphore) for symbol in symbols),
+            return_exceptions=True
+        )
+        return dict(zip(symbols, results))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Envoi des notifications Pushover en arrière-plan
+
+La boucle de trading dépose les messages dans une file bornée et n'attend
+jamais Pushover. Un thread dédié les envoie avec une session HTTP réutilisée
+et réessaie avec un délai exponentiel. Les messages non encore délivrés sont
+conservés sur disque (outbox) et renvoyés au redémarrage.
+"""
+
+import json
+import queue
+import threading
+import time
+import uuid
+import requests
+from requests.adapters import HTTPAdapter
+from persistence import atomic_write_json
+
+PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
+
+# Marqueur d'arrêt du thread d'envoi
+_STOP = object()
+
+
+class NotificationQueue:
+    """File de notifications Pushover traitée par un thread d'arrière-plan"""
+
+    def __init__(self, app_token, user_key, outbox_path, maxsize=100, max_attempts=5,
+                 backoff_base=2, backoff_max=60, request_timeout=10):
+        self.app_token = app_token
+        self.user_key = user_key
+        self.outbox_path = outbox_path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_timeout = request_timeout
+
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.pending = {}  # {id: message} messages acceptés mais pas encore délivrés
+        self.sent = 0
+        self.failed = 0
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        # Messages restés dans l'outbox lors de l'arrêt précédent
+        for message in self.load_outbox():
+            self.pending[message['id']] = message
+            self._enqueue(message)
+
+        self.thread = threading.Thread(target=self._worker, name="pushover-notifications", daemon=True)
+        self.thread.start()
+
+    def send(self, title, message, priority=1, sound="cosmic"):
+        """Dépose un message (non bloquant); retourne True s'il est accepté"""
+        notification = {
+            'id': uuid.uuid4().hex,
+            'title': title,
+            'message': message,
+            'priority': priority,
+            'sound': sound,
+            'created_at': time.time()
+        }
+        with self.lock:
+            self.pending[notification['id']] = notification
+            self.save_outbox()
+        self._enqueue(notification)
+        return True
+
+    def _enqueue(self, notification):
+        try:
+            self.queue.put_nowait(notification)
+        except queue.Full:
+            # Le message reste dans l'outbox et sera renvoyé au prochain démarrage
+            print(f"⚠️  File de notifications pleine, message conservé pour plus tard: {notification['title']}")
+
+    def _worker(self):
+        while True:
+            notification = self.queue.get()
+            try:
+                if notification is _STOP:
+                    return
+                if self.deliver(notification):
+                    self.sent += 1
+                    with self.lock:
+                        self.pending.pop(notification['id'], None)
+                        self.save_outbox()
+                else:
+                    self.failed += 1
+            finally:
+                self.queue.task_done()
+
+    def deliver(self, notification):
+        """Envoie un message avec réessais; retourne True si délivré ou définitivement rejeté"""
+        for attempt in range(self.max_attempts):
+            try:
+                response = self.session.post(PUSHOVER_URL, data={
+                    "token": self.app_token,
+                    "user": self.user_key,
+                    "title": notification['title'],
+                    "message": notification['message'],
+                    "priority": notification['priority'],
+                    "sound": notification['sound']
+                }, timeout=self.request_timeout)
+
+                if response.status_code == 200:
+                    print(f"✓ Notification envoyée: {notification['title']}")
+                    return True
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    # Requête invalide (token, message trop long...): inutile de réessayer
+                    print(f"✗ Erreur Pushover (abandon): {response.text}")
+                    return True
+                print(f"✗ Erreur Pushover ({response.status_code}), tentative {attempt + 1}/{self.max_attempts}")
+            except requests.RequestException as e:
+                print(f"✗ Erreur lors de l'envoi de la notification (tentative {attempt + 1}/{self.max_attempts}): {e}")
+
+            if attempt + 1 < self.max_attempts:
+                time.sleep(min(self.backoff_max, self.backoff_base ** attempt))
+
+        print(f"✗ Notification non délivrée, conservée dans l'outbox: {notification['title']}")
+        return False
+
+    def load_outbox(self):
+        """Charge les messages non délivrés lors de l'exécution précédente"""
+        try:
+            with open(self.outbox_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            print(f"Erreur lors du chargement de l'outbox {self.outbox_path}: {e}")
+            return []
+
+    def save_outbox(self):
+        """Sauvegarde les messages en attente (appelé avec self.lock)"""
+        try:
+            atomic_write_json(self.outbox_path, list(self.pending.values()))
+        except Exception as e:
+            print(f"Erreur lors de la sauvegarde de l'outbox {self.outbox_path}: {e}")
+
+    def close(self, timeout=30):
+        """Laisse le thread vider la file (au plus `timeout` secondes) puis l'arrête"""
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+        self.session.close()
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'pending': len(self.pending),
+            'sent': self.sent,
+            'failed': self.failed
+        }
+
+
+def format_closed_digest(positions):
+    """Résumé en un seul message des positions fermées pendant un scan"""
+    total_pnl = sum(p['pnl_usdt'] for p in positions)
+    lines = []
+    for p in positions:
+        emoji = "💀" if p.get('close_reason') == 'LIQUIDATED' else ("🟢" if p['pnl_usdt'] > 0 else "🔴")
+        lines.append(f"{emoji} {p['type']} {p['symbol']}: ${p['pnl_usdt']:.2f} ({p['pnl_percent']:+.2f}%) - {p['close_reason']}")
+
+    return f"""
+📊 PAPER TRADING - {len(positions)} positions fermées
+
+{chr(10).join(lines)}
+
+P&L total: ${total_pnl:.2f}
+"""
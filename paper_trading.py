@@ -5,9 +5,117 @@ Gestionnaire de Paper Trading (Mode simulation)
 
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import chain
 from zoneinfo import ZoneInfo
+import numpy as np
 import config
+from persistence import Journal, atomic_write_json
+from sqlite_storage import ClosedTradesView, SQLiteStorage, SQLiteTradeSource
+from trade_archive import TradeArchive
+from trade_records import TradeAggregates, TradeRecord
+
+
+def find_intrabar_exit(position, candles, trailing_stop_percent=None):
+    """Résout le premier niveau touché (SL, liquidation, TP) dans l'ordre chronologique des bougies
+
+    Les bougies [timestamp, open, high, low, close, ...] sont vérifiées de façon vectorisée
+    via leurs plus hauts/plus bas. Le trailing stop d'une bougie est calculé avec les extrêmes
+    des bougies précédentes. Si le TP et le SL sont touchés dans la même bougie, l'ordre réel
+    est inconnu: le SL est retenu (hypothèse prudente), sauf si la bougie ouvre déjà au-delà du TP.
+
+    Retourne (index, prix de sortie, raison, extrême) où index/prix/raison valent None si
+    aucun niveau n'est touché, et extrême est le plus haut (LONG) ou le plus bas (SHORT) atteint.
+    """
+    data = np.asarray(candles, dtype=float)
+    opens, highs, lows = data[:, 1], data[:, 2], data[:, 3]
+    entry = position['entry_price']
+    sl = position['sl']
+    tp = position['tp']
+    liquidation_price = position.get('liquidation_price')
+
+    if position['type'] == 'LONG':
+        start = position.get('highest_price', entry)
+        running = np.maximum.accumulate(np.maximum(highs, start))
+        previous = np.concatenate(([start], running[:-1]))
+        stops = np.full(len(data), sl)
+        if trailing_stop_percent is not None:
+            stops = np.where(previous > entry, np.maximum(sl, previous * (1 - trailing_stop_percent)), sl)
+        adverse = np.maximum(stops, liquidation_price) if liquidation_price else stops
+        adverse_hit = lows <= adverse
+        tp_hit = highs >= tp
+        tp_gap = opens >= tp
+    else:  # SHORT
+        start = position.get('lowest_price', entry)
+        running = np.minimum.accumulate(np.minimum(lows, start))
+        previous = np.concatenate(([start], running[:-1]))
+        stops = np.full(len(data), sl)
+        if trailing_stop_percent is not None:
+            stops = np.where(previous < entry, np.minimum(sl, previous * (1 + trailing_stop_percent)), sl)
+        adverse = np.minimum(stops, liquidation_price) if liquidation_price else stops
+        adverse_hit = highs >= adverse
+        tp_hit = lows <= tp
+        tp_gap = opens <= tp
+
+    hit = adverse_hit | tp_hit
+    if not hit.any():
+        return None, None, None, running[-1]
+
+    i = int(np.argmax(hit))
+    if tp_hit[i] and (not adverse_hit[i] or tp_gap[i]):
+        # Ouverture au-delà du TP: exécution au prix d'ouverture
+        return i, opens[i] if tp_gap[i] else tp, 'TP_HIT', running[i]
+
+    # Ouverture au-delà du stop (gap): exécution au prix d'ouverture
+    if position['type'] == 'LONG':
+        fill = min(opens[i], adverse[i])
+        liquidated = liquidation_price and fill <= liquidation_price
+    else:
+        fill = max(opens[i], adverse[i])
+        liquidated = liquidation_price and fill >= liquidation_price
+
+    if liquidated:
+        return i, liquidation_price, 'LIQUIDATED', previous[i]
+    return i, fill, 'SL_HIT', previous[i]
+
+
+def state_files():
+    """Fichiers dont dépend l'état chargé par PaperTradingManager (pour détecter ses changements)"""
+    if getattr(config, 'PAPER_TRADING_STORAGE', 'json') == 'sqlite':
+        db_file = getattr(config, 'PAPER_TRADING_DB_FILE', 'data/paper_trading.db')
+        return [db_file, db_file + '-wal']
+
+    track_file = getattr(config, 'PAPER_TRADING_TRACK_FILE', 'paper_trading_history.json')
+    archive_dir = getattr(config, 'PAPER_TRADING_ARCHIVE_DIR', os.path.join(os.path.dirname(track_file), 'archive'))
+    return [
+        'data/paper_trading_data.json',
+        track_file,
+        os.path.splitext(track_file)[0] + '.journal.jsonl',
+        os.path.join(archive_dir, 'index.json')
+    ]
+
+
+class JsonTradeSource:
+    """Trades fermés lus à la demande par rang (0 = plus ancien): archive puis trades récents"""
+
+    def __init__(self, archive, hot):
+        self.archive = archive
+        self.archived = archive.count
+        self.hot = hot
+
+    def entries(self, start):
+        """(rang, trade) à partir du rang `start`; les segments précédents ne sont pas décompressés"""
+        hot = (dict(p) for p in self.hot[max(0, start - self.archived):])
+        if start < self.archived:
+            hot = chain(self.archive.iter_trades_from(start), hot)
+        return enumerate(hot, start)
+
+    def read(self, locations):
+        """Trades aux rangs donnés, dans cet ordre"""
+        archived = [rank for rank in locations if rank < self.archived]
+        archived = iter(self.archive.read_ranks(archived) if archived else ())
+        return [next(archived) if rank < self.archived else dict(self.hot[rank - self.archived]) for rank in locations]
+
 
 class PaperTradingManager:
     def __init__(self):
@@ -19,13 +127,95 @@ class PaperTradingManager:
         self.open_positions = []
         self.closed_positions = []
         self.paris_tz = ZoneInfo("Europe/Paris")
+        # Journal des événements depuis le dernier instantané (track_file)
+        self.journal = Journal(os.path.splitext(self.track_file)[0] + '.journal.jsonl')
+        self.journal_seq = 0
+        self.events_since_snapshot = 0
+        self.snapshot_every = getattr(config, 'PAPER_TRADING_SNAPSHOT_EVERY', 100)
+        # Archive froide des trades anciens (historique JSON)
+        self.archive_after_days = getattr(config, 'PAPER_TRADING_ARCHIVE_AFTER_DAYS', 30)
+        self.archive = TradeArchive(getattr(
+            config, 'PAPER_TRADING_ARCHIVE_DIR', os.path.join(os.path.dirname(self.track_file), 'archive')
+        ))
+        # Stockage SQLite optionnel (sinon instantané JSON + journal)
+        self.storage = None
+        if getattr(config, 'PAPER_TRADING_STORAGE', 'json') == 'sqlite':
+            self.storage = SQLiteStorage(getattr(config, 'PAPER_TRADING_DB_FILE', 'data/paper_trading.db'))
         self.load_state()
 
     def now(self):
         """Retourne l'heure actuelle avec le fuseau horaire de Paris"""
         return datetime.now(self.paris_tz)
 
+    @property
+    def open_positions(self):
+        """Positions ouvertes (liste, format JSON/API)"""
+        return self._open_positions
+
+    @open_positions.setter
+    def open_positions(self, positions):
+        # Toute réaffectation reconstruit l'index par symbole
+        self._open_positions = list(positions)
+        self.positions_by_symbol = {}
+        for position in self._open_positions:
+            self.positions_by_symbol.setdefault(position['symbol'], []).append(position)
+
+    def _add_open_position(self, position):
+        self._open_positions.append(position)
+        self.positions_by_symbol.setdefault(position['symbol'], []).append(position)
+
+    def _remove_open_positions(self, positions):
+        """Retire des positions de la liste et de l'index (une seule reconstruction de la liste)"""
+        ids = {position['id'] for position in positions}
+        self._open_positions = [p for p in self._open_positions if p['id'] not in ids]
+        for position in positions:
+            remaining = [p for p in self.positions_by_symbol.get(position['symbol'], []) if p['id'] not in ids]
+            if remaining:
+                self.positions_by_symbol[position['symbol']] = remaining
+            else:
+                self.positions_by_symbol.pop(position['symbol'], None)
+
     def load_state(self):
+        """Charge l'état du paper trading depuis la base SQLite ou le fichier JSON"""
+        if self.storage is None:
+            self.load_json_state()
+            # Trades déjà archivés (arrêt entre l'archivage et l'instantané)
+            if self.archive.index['archived_through'] is not None:
+                self.closed_positions = [p for p in self.closed_positions if not self.archive.is_archived(p)]
+        else:
+            self.load_sqlite_state()
+        self.rebuild_aggregates()
+
+    def rebuild_aggregates(self):
+        """Recalcule les statistiques des trades fermés (un seul parcours, au chargement)"""
+        if self.storage is not None:
+            self.aggregates = TradeAggregates(self.initial_balance)
+            results = self.storage.trade_results()
+        else:
+            # Les trades archivés sont résumés par les agrégats stockés dans l'index de l'archive
+            self.aggregates = self.archive.aggregates(self.initial_balance)
+            results = ((p['pnl_usdt'], p.get('duration_hours', 0)) for p in self.closed_positions)
+        for pnl_usdt, duration_hours in results:
+            self.aggregates.add(pnl_usdt, duration_hours)
+
+    def load_sqlite_state(self):
+        """Charge l'état du paper trading depuis la base SQLite"""
+        try:
+            if self.storage.is_empty() and os.path.exists(self.track_file):
+                # Migration unique de l'historique JSON existant
+                self.load_json_state()
+                closed_positions = list(chain(self.archive.iter_trades(), self.closed_positions))
+                self.storage.save_state(self.balance, self.initial_balance, self.open_positions, closed_positions)
+                print(f"✓ Historique migré vers {self.storage.path}: {len(closed_positions)} trades fermés")
+
+            self.balance = self.storage.get_meta('balance', self.initial_balance)
+            self.initial_balance = self.storage.get_meta('initial_balance', self.initial_balance)
+            self.open_positions = self.storage.load_open_positions()
+            self.closed_positions = ClosedTradesView(self.storage)
+        except Exception as e:
+            print(f"✗ Erreur lors du chargement du paper trading depuis {self.storage.path}: {e}")
+
+    def load_json_state(self):
         """Charge l'état du paper trading depuis le fichier"""
         try:
             # Vérifier si un fichier de test existe pour le développement
@@ -36,7 +226,7 @@ class PaperTradingManager:
                     self.balance = data.get('balance', self.initial_balance)
                     self.initial_balance = data.get('initial_balance', self.initial_balance)
                     self.open_positions = data.get('open_positions', [])
-                    self.closed_positions = data.get('closed_positions', [])
+                    self.closed_positions = [TradeRecord(p) for p in data.get('closed_positions', [])]
                     print(f"✓ Chargé depuis le fichier de test: {test_file}")
                     print(f"  - {len(self.closed_positions)} trades fermés disponibles pour les tests")
                     return
@@ -48,28 +238,134 @@ class PaperTradingManager:
                     self.balance = data.get('balance', self.initial_balance)
                     self.initial_balance = data.get('initial_balance', self.initial_balance)
                     self.open_positions = data.get('open_positions', [])
-                    self.closed_positions = data.get('closed_positions', [])
+                    self.closed_positions = [TradeRecord(p) for p in data.get('closed_positions', [])]
+                    self.journal_seq = data.get('journal_seq', 0)
                     print(f"✓ Chargé depuis {self.track_file}")
             else:
                 print(f"⚠️ Aucun fichier de paper trading trouvé ({self.track_file})")
+
+            self.replay_journal()
         except Exception as e:
             print(f"✗ Erreur lors du chargement du paper trading: {e}")
 
+    def replay_journal(self):
+        """Rejoue les événements journalisés après le dernier instantané"""
+        records = self.journal.read(after_seq=self.journal_seq)
+        for record in records:
+            if record['op'] == 'open':
+                self._add_open_position(record['position'])
+            elif record['op'] == 'update':
+                for position in self.positions_by_symbol.get(record['position']['symbol'], []):
+                    if position['id'] == record['position']['id']:
+                        position.update(record['position'])
+                        break
+            elif record['op'] == 'close':
+                self._remove_open_positions([record['position']])
+                self.closed_positions.append(TradeRecord(record['position']))
+            if 'balance' in record:
+                self.balance = record['balance']
+            self.journal_seq = record['seq']
+
+        self.events_since_snapshot = len(records)
+        if records:
+            print(f"  - {len(records)} événements rejoués depuis le journal")
+
+    def record(self, op, position, balance=None):
+        """Journalise un événement (open, update, close)"""
+        self.record_batch([(op, position, balance)])
+
+    def record_batch(self, events):
+        """Persiste des événements (op, position, balance) en une seule écriture
+
+        Instantané complet tous les PAPER_TRADING_SNAPSHOT_EVERY événements.
+        """
+        if not events:
+            return
+
+        if self.storage is not None:
+            try:
+                self.storage.record_batch(events)
+            except Exception as e:
+                print(f"Erreur lors de l'enregistrement du paper trading dans {self.storage.path}: {e}")
+            return
+
+        entries = []
+        for op, position, balance in events:
+            self.journal_seq += 1
+            entry = {'seq': self.journal_seq, 'op': op, 'position': position}
+            if balance is not None:
+                entry['balance'] = balance
+            entries.append(entry)
+        try:
+            self.journal.append_many(entries)
+        except Exception as e:
+            print(f"Erreur lors de l'écriture du journal de paper trading: {e}")
+            self.save_state()
+            return
+
+        self.events_since_snapshot += len(entries)
+        if self.events_since_snapshot >= self.snapshot_every:
+            self.save_state()
+
     def save_state(self):
-        """Sauvegarde l'état du paper trading"""
+        """Sauvegarde l'instantané complet du paper trading et vide le journal"""
+        if self.storage is not None:
+            # Les trades fermés sont déjà en base au fil des événements
+            self.storage.save_state(self.balance, self.initial_balance, self.open_positions)
+            return
+
         try:
+            self.archive_old_trades()
             data = {
                 'balance': self.balance,
                 'initial_balance': self.initial_balance,
                 'open_positions': self.open_positions,
-                'closed_positions': self.closed_positions,
+                'closed_positions': [dict(p) for p in self.closed_positions],
+                'journal_seq': self.journal_seq,
                 'last_update': self.now().isoformat()
             }
-            with open(self.track_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            atomic_write_json(self.track_file, data, indent=2)
+            # L'instantané contient tous les événements: ceux du journal (seq <= journal_seq) seraient ignorés
+            self.journal.truncate()
+            self.events_since_snapshot = 0
         except Exception as e:
             print(f"Erreur lors de la sauvegarde du paper trading: {e}")
 
+    def archive_old_trades(self):
+        """Déplace les trades fermés depuis plus de PAPER_TRADING_ARCHIVE_AFTER_DAYS jours vers l'archive"""
+        if not self.archive_after_days:
+            return
+
+        cutoff = self.now() - timedelta(days=self.archive_after_days)
+        count = 0
+        for position in self.closed_positions:
+            if datetime.fromisoformat(position['closed_at']) >= cutoff:
+                break
+            count += 1
+
+        if count:
+            self.archive.archive(self.closed_positions[:count], self.initial_balance)
+            self.closed_positions = self.closed_positions[count:]
+            print(f"🗄️  {count} trades archivés ({self.archive.count} au total dans {self.archive.directory})")
+
+    def iter_closed_positions(self, since=None, until=None):
+        """Tous les trades fermés (archive comprise) en flux, dans l'ordre de fermeture"""
+        if self.storage is not None:
+            return self.storage.trades(since=since, until=until)
+
+        hot = (dict(p) for p in self.closed_positions)
+        if since is not None:
+            hot = (p for p in hot if datetime.fromisoformat(p['closed_at']) >= since)
+        if until is not None:
+            hot = (p for p in hot if datetime.fromisoformat(p['closed_at']) <= until)
+        return chain(self.archive.iter_trades(since, until), hot)
+
+    def trade_source(self):
+        """Trades fermés lus à la demande (index de l'historique de l'interface web)"""
+        if self.storage is not None:
+            return SQLiteTradeSource(self.storage.path)
+        return JsonTradeSource(self.archive, self.closed_positions)
+
     def can_open_position(self):
         """Vérifie si on peut ouvrir une nouvelle position"""
         max_positions = getattr(config, 'PAPER_TRADING_MAX_POSITIONS', 3)
@@ -81,6 +377,13 @@ class PaperTradingManager:
 
         return True, "OK"
 
+    def available_slots(self):
+        """Nombre de positions pouvant encore être ouvertes"""
+        if self.balance <= 0:
+            return 0
+        max_positions = getattr(config, 'PAPER_TRADING_MAX_POSITIONS', 3)
+        return max(0, max_positions - len(self.open_positions))
+
     def open_position(self, signal, analysis):
         """Ouvre une position virtuelle"""
         can_open, reason = self.can_open_position()
@@ -137,138 +440,209 @@ class PaperTradingManager:
         # Retirer la marge (capital réel) de la balance, pas la position totale
         self.balance -= margin_usdt
 
-        self.open_positions.append(position)
-        self.save_state()
+        self._add_open_position(position)
+        self.record('open', position, balance=self.balance)
 
         return position, "Position ouverte avec succès"
 
-    def update_positions(self, symbol, current_price):
-        """Met à jour les positions ouvertes et vérifie les TP/SL/Liquidation"""
-        updated_positions = []
-        closed_count = 0
-
-        for position in self.open_positions:
-            if position['symbol'] != symbol:
-                updated_positions.append(position)
-                continue
-
-            # Mettre à jour le prix courant
-            position['current_price'] = current_price
-
-            # Calculer le P&L (déjà amplifié par le levier via size_crypto)
-            if position['type'] == 'LONG':
-                pnl_usdt = (current_price - position['entry_price']) * position['size_crypto']
-                pnl_percent = ((current_price - position['entry_price']) / position['entry_price']) * 100
-
-                # Calculer le P&L en % de la marge investie (avec effet de levier)
-                margin = position.get('margin_usdt', position.get('size_usdt', 0))
-                if margin > 0:
-                    pnl_percent_on_margin = (pnl_usdt / margin) * 100
+    def position_settings(self):
+        """Paramètres de gestion des positions, lus une seule fois par mise à jour"""
+        settings = {'trailing_stop_percent': None, 'fixed_tp_percent': None}
+        if getattr(config, 'PAPER_TRADING_TRAILING_STOP', False):
+            settings['trailing_stop_percent'] = getattr(config, 'PAPER_TRADING_TRAILING_STOP_PERCENT', 1.5) / 100
+        if getattr(config, 'PAPER_TRADING_FIXED_TP', True):
+            settings['fixed_tp_percent'] = getattr(config, 'PAPER_TRADING_FIXED_TP_PERCENT', 3.0) / 100
+        return settings
+
+    def update_all(self, prices=None, candles=None):
+        """Met à jour toutes les positions ouvertes en une passe et retourne les positions fermées
+
+        prices: {symbole: prix courant}; candles: {symbole: bougies OHLC} (prioritaires sur le
+        prix pour détecter les mèches entre deux scans). Les positions des autres symboles ne
+        sont pas modifiées. L'état est persisté une seule fois pour tout le lot.
+        """
+        prices = prices or {}
+        candles = candles or {}
+        settings = self.position_settings()
+
+        closed = []
+        events = []
+
+        # Seuls les symboles fournis sont parcourus, via l'index
+        symbols = [symbol for symbol in {**prices, **candles} if symbol in self.positions_by_symbol]
+        for symbol in symbols:
+            for position in self.positions_by_symbol[symbol]:
+                if candles.get(symbol):
+                    exit_price, reason = self._check_candles(position, candles[symbol], settings, prices.get(symbol))
                 else:
-                    pnl_percent_on_margin = 0
-
-                # Vérifier LIQUIDATION en premier
-                liquidation_price = position.get('liquidation_price')
-                if liquidation_price and current_price <= liquidation_price:
-                    self.close_position(position, liquidation_price, 'LIQUIDATED')
-                    closed_count += 1
-                    continue
-
-                # TRAILING STOP pour LONG
-                trailing_stop_enabled = getattr(config, 'PAPER_TRADING_TRAILING_STOP', False)
-                if trailing_stop_enabled:
-                    trailing_stop_percent = getattr(config, 'PAPER_TRADING_TRAILING_STOP_PERCENT', 1.5) / 100
-                    # Ne remonter le SL que si un nouveau plus haut est atteint
-                    highest_price = position.get('highest_price', position['entry_price'])
-                    if current_price > highest_price:
-                        highest_price = current_price
-                        position['highest_price'] = highest_price
-                        new_sl = highest_price * (1 - trailing_stop_percent)
-                        # Le SL ne peut que monter (jamais descendre)
-                        if new_sl > position['sl']:
-                            position['sl'] = new_sl
-
-                # TAKE PROFIT FIXE pour LONG (remplace le trailing TP)
-                fixed_tp_enabled = getattr(config, 'PAPER_TRADING_FIXED_TP', True)
-                if fixed_tp_enabled:
-                    # Calculer le TP fixe basé sur le prix d'entrée
-                    fixed_tp_percent = getattr(config, 'PAPER_TRADING_FIXED_TP_PERCENT', 3.0) / 100
-                    fixed_tp_price = position['entry_price'] * (1 + fixed_tp_percent)
-                    # Mettre à jour le TP si nécessaire (au cas où il aurait été modifié)
-                    position['tp'] = fixed_tp_price
-
-                # Vérifier TP/SL
-                if current_price >= position['tp']:
-                    self.close_position(position, current_price, 'TP_HIT')
-                    closed_count += 1
-                    continue
-                elif current_price <= position['sl']:
-                    self.close_position(position, current_price, 'SL_HIT')
-                    closed_count += 1
-                    continue
-            else:  # SHORT
-                pnl_usdt = (position['entry_price'] - current_price) * position['size_crypto']
-                pnl_percent = ((position['entry_price'] - current_price) / position['entry_price']) * 100
+                    exit_price, reason = self._check_price(position, prices[symbol], settings)
 
-                # Calculer le P&L en % de la marge investie (avec effet de levier)
-                margin = position.get('margin_usdt', position.get('size_usdt', 0))
-                if margin > 0:
-                    pnl_percent_on_margin = (pnl_usdt / margin) * 100
+                if reason is None:
+                    events.append(('update', position, None))
                 else:
-                    pnl_percent_on_margin = 0
-
-                # Vérifier LIQUIDATION en premier
-                liquidation_price = position.get('liquidation_price')
-                if liquidation_price and current_price >= liquidation_price:
-                    self.close_position(position, liquidation_price, 'LIQUIDATED')
-                    closed_count += 1
-                    continue
-
-                # TRAILING STOP pour SHORT
-                trailing_stop_enabled = getattr(config, 'PAPER_TRADING_TRAILING_STOP', False)
-                if trailing_stop_enabled:
-                    trailing_stop_percent = getattr(config, 'PAPER_TRADING_TRAILING_STOP_PERCENT', 1.5) / 100
-                    # Ne baisser le SL que si un nouveau plus bas est atteint
-                    lowest_price = position.get('lowest_price', position['entry_price'])
-                    if current_price < lowest_price:
-                        lowest_price = current_price
-                        position['lowest_price'] = lowest_price
-                        new_sl = lowest_price * (1 + trailing_stop_percent)
-                        # Le SL ne peut que descendre (jamais monter)
-                        if new_sl < position['sl']:
-                            position['sl'] = new_sl
-
-                # TAKE PROFIT FIXE pour SHORT (remplace le trailing TP)
-                fixed_tp_enabled = getattr(config, 'PAPER_TRADING_FIXED_TP', True)
-                if fixed_tp_enabled:
-                    # Calculer le TP fixe basé sur le prix d'entrée
-                    fixed_tp_percent = getattr(config, 'PAPER_TRADING_FIXED_TP_PERCENT', 3.0) / 100
-                    fixed_tp_price = position['entry_price'] * (1 - fixed_tp_percent)
-                    # Mettre à jour le TP si nécessaire (au cas où il aurait été modifié)
-                    position['tp'] = fixed_tp_price
-
-                # Vérifier TP/SL
-                if current_price <= position['tp']:
-                    self.close_position(position, current_price, 'TP_HIT')
-                    closed_count += 1
-                    continue
-                elif current_price >= position['sl']:
-                    self.close_position(position, current_price, 'SL_HIT')
-                    closed_count += 1
-                    continue
-
-            position['pnl_usdt'] = pnl_usdt
-            position['pnl_percent'] = pnl_percent
-            position['pnl_percent_on_margin'] = pnl_percent_on_margin
-            updated_positions.append(position)
-
-        self.open_positions = updated_positions
-        self.save_state()
-
-        return closed_count
+                    self._settle(position, exit_price, reason)
+                    closed.append(position)
+                    events.append(('close', position, self.balance))
+
+        if closed:
+            self._remove_open_positions(closed)
+        self.record_batch(events)
+
+        return closed
+
+    def update_positions(self, symbol, current_price):
+        """Met à jour les positions ouvertes et vérifie les TP/SL/Liquidation"""
+        return len(self.update_all(prices={symbol: current_price}))
+
+    def update_positions_ohlc(self, symbol, candles):
+        """Met à jour les positions d'un symbole à partir des bougies OHLC depuis la dernière mise à jour
+
+        Contrairement à update_positions (prix de clôture uniquement), les mèches qui
+        touchent le SL, le TP ou la liquidation entre deux scans sont prises en compte.
+        """
+        return len(self.update_all(candles={symbol: candles}))
+
+    def _check_price(self, position, current_price, settings):
+        """Applique le prix courant à une position; retourne (prix de sortie, raison) ou (None, None)"""
+        # Mettre à jour le prix courant
+        position['current_price'] = current_price
+
+        # Calculer le P&L (déjà amplifié par le levier via size_crypto)
+        if position['type'] == 'LONG':
+            pnl_usdt = (current_price - position['entry_price']) * position['size_crypto']
+            pnl_percent = ((current_price - position['entry_price']) / position['entry_price']) * 100
+        else:  # SHORT
+            pnl_usdt = (position['entry_price'] - current_price) * position['size_crypto']
+            pnl_percent = ((position['entry_price'] - current_price) / position['entry_price']) * 100
+
+        # Calculer le P&L en % de la marge investie (avec effet de levier)
+        margin = position.get('margin_usdt', position.get('size_usdt', 0))
+        if margin > 0:
+            pnl_percent_on_margin = (pnl_usdt / margin) * 100
+        else:
+            pnl_percent_on_margin = 0
+
+        liquidation_price = position.get('liquidation_price')
+        trailing_stop_percent = settings['trailing_stop_percent']
+        fixed_tp_percent = settings['fixed_tp_percent']
+
+        if position['type'] == 'LONG':
+            # Vérifier LIQUIDATION en premier
+            if liquidation_price and current_price <= liquidation_price:
+                return liquidation_price, 'LIQUIDATED'
+
+            # TRAILING STOP pour LONG
+            if trailing_stop_percent is not None:
+                # Ne remonter le SL que si un nouveau plus haut est atteint
+                highest_price = position.get('highest_price', position['entry_price'])
+                if current_price > highest_price:
+                    highest_price = current_price
+                    position['highest_price'] = highest_price
+                    new_sl = highest_price * (1 - trailing_stop_percent)
+                    # Le SL ne peut que monter (jamais descendre)
+                    if new_sl > position['sl']:
+                        position['sl'] = new_sl
+
+            # TAKE PROFIT FIXE pour LONG (remplace le trailing TP)
+            if fixed_tp_percent is not None:
+                position['tp'] = position['entry_price'] * (1 + fixed_tp_percent)
+
+            # Vérifier TP/SL
+            if current_price >= position['tp']:
+                return current_price, 'TP_HIT'
+            elif current_price <= position['sl']:
+                return current_price, 'SL_HIT'
+        else:  # SHORT
+            # Vérifier LIQUIDATION en premier
+            if liquidation_price and current_price >= liquidation_price:
+                return liquidation_price, 'LIQUIDATED'
+
+            # TRAILING STOP pour SHORT
+            if trailing_stop_percent is not None:
+                # Ne baisser le SL que si un nouveau plus bas est atteint
+                lowest_price = position.get('lowest_price', position['entry_price'])
+                if current_price < lowest_price:
+                    lowest_price = current_price
+                    position['lowest_price'] = lowest_price
+                    new_sl = lowest_price * (1 + trailing_stop_percent)
+                    # Le SL ne peut que descendre (jamais monter)
+                    if new_sl < position['sl']:
+                        position['sl'] = new_sl
+
+            # TAKE PROFIT FIXE pour SHORT (remplace le trailing TP)
+            if fixed_tp_percent is not None:
+                position['tp'] = position['entry_price'] * (1 - fixed_tp_percent)
+
+            # Vérifier TP/SL
+            if current_price <= position['tp']:
+                return current_price, 'TP_HIT'
+            elif current_price >= position['sl']:
+                return current_price, 'SL_HIT'
+
+        position['pnl_usdt'] = pnl_usdt
+        position['pnl_percent'] = pnl_percent
+        position['pnl_percent_on_margin'] = pnl_percent_on_margin
+        return None, None
+
+    def _check_candles(self, position, candles, settings, current_price=None):
+        """Applique les bougies OHLC à une position; retourne (prix de sortie, raison) ou (None, None)
+
+        Sans bougie depuis la dernière mise à jour (bougies en retard sur la position),
+        le prix courant est appliqué comme par _check_price, s'il est connu.
+        """
+        trailing_stop_percent = settings['trailing_stop_percent']
+
+        # Bougies depuis la dernière mise à jour (la dernière, encore ouverte, est revue au scan suivant)
+        since = position.get('last_candle_ts')
+        if since is None:
+            since = datetime.fromisoformat(position['opened_at']).timestamp() * 1000
+        window = [candle for candle in candles if candle[0] >= since]
+        if not window:
+            if current_price is None:
+                return None, None
+            return self._check_price(position, current_price, settings)
+
+        if settings['fixed_tp_percent'] is not None:
+            direction = 1 if position['type'] == 'LONG' else -1
+            position['tp'] = position['entry_price'] * (1 + direction * settings['fixed_tp_percent'])
+
+        index, exit_price, reason, extreme = find_intrabar_exit(position, window, trailing_stop_percent)
+
+        if position['type'] == 'LONG':
+            position['highest_price'] = float(extreme)
+            if trailing_stop_percent is not None and extreme > position['entry_price']:
+                position['sl'] = max(position['sl'], float(extreme) * (1 - trailing_stop_percent))
+        else:
+            position['lowest_price'] = float(extreme)
+            if trailing_stop_percent is not None and extreme < position['entry_price']:
+                position['sl'] = min(position['sl'], float(extreme) * (1 + trailing_stop_percent))
+
+        if reason is not None:
+            return float(exit_price), reason
+
+        position['last_candle_ts'] = window[-1][0]
+        self._mark_to_market(position, window[-1][4])
+        return None, None
+
+    def _mark_to_market(self, position, current_price):
+        """Met à jour le prix courant et le P&L non réalisé d'une position"""
+        direction = 1 if position['type'] == 'LONG' else -1
+        pnl_usdt = direction * (current_price - position['entry_price']) * position['size_crypto']
+        margin = position.get('margin_usdt', position.get('size_usdt', 0))
+
+        position['current_price'] = current_price
+        position['pnl_usdt'] = pnl_usdt
+        position['pnl_percent'] = direction * ((current_price - position['entry_price']) / position['entry_price']) * 100
+        position['pnl_percent_on_margin'] = (pnl_usdt / margin) * 100 if margin > 0 else 0
 
     def close_position(self, position, exit_price, reason):
         """Ferme une position"""
+        self._settle(position, exit_price, reason)
+        self.record('close', position, balance=self.balance)
+        return position
+
+    def _settle(self, position, exit_price, reason):
+        """Calcule le P&L final, crédite la balance et passe la position en fermée (sans persister)"""
         # Récupérer la marge (capital réellement investi)
         margin = position.get('margin_usdt', position.get('size_usdt', 0))
 
@@ -313,10 +687,9 @@ class PaperTradingManager:
         duration = (closed - opened).total_seconds() / 3600  # en heures
         position['duration_hours'] = duration
 
-        self.closed_positions.append(position)
-        self.save_state()
-
-        return position
+        if self.storage is None:
+            self.closed_positions.append(TradeRecord(position))
+        self.aggregates.add(pnl_usdt, duration)
 
     def get_statistics(self):
         """Calcule les statistiques de performance"""
@@ -326,7 +699,8 @@ class PaperTradingManager:
         open_pnl = sum(p.get('pnl_usdt', 0) for p in self.open_positions)
         total_portfolio_value = self.balance + open_capital + open_pnl
 
-        if not self.closed_positions:
+        closed = self.closed_trade_statistics()
+        if closed['total_trades'] == 0:
             return {
                 'total_trades': 0,
                 'win_rate': 0,
@@ -342,26 +716,26 @@ class PaperTradingManager:
                 'open_positions_value': open_capital,
                 'unrealized_pnl': open_pnl,
                 'initial_balance': self.initial_balance,
-                'roi': ((total_portfolio_value - self.initial_balance) / self.initial_balance) * 100
+                'roi': ((total_portfolio_value - self.initial_balance) / self.initial_balance) * 100,
+                'profit_factor': None,
+                'expectancy': 0,
+                'max_drawdown': 0,
+                'max_drawdown_percent': 0
             }
 
-        wins = [p for p in self.closed_positions if p['pnl_usdt'] > 0]
-        losses = [p for p in self.closed_positions if p['pnl_usdt'] <= 0]
-
-        total_pnl = sum(p['pnl_usdt'] for p in self.closed_positions)
         roi = ((total_portfolio_value - self.initial_balance) / self.initial_balance) * 100
 
         stats = {
-            'total_trades': len(self.closed_positions),
-            'wins': len(wins),
-            'losses': len(losses),
-            'win_rate': (len(wins) / len(self.closed_positions)) * 100 if self.closed_positions else 0,
-            'total_pnl': total_pnl,
-            'total_pnl_percent': (total_pnl / self.initial_balance) * 100,
-            'avg_win': sum(p['pnl_usdt'] for p in wins) / len(wins) if wins else 0,
-            'avg_loss': sum(p['pnl_usdt'] for p in losses) / len(losses) if losses else 0,
-            'best_trade': max(p['pnl_usdt'] for p in self.closed_positions) if self.closed_positions else 0,
-            'worst_trade': min(p['pnl_usdt'] for p in self.closed_positions) if self.closed_positions else 0,
+            'total_trades': closed['total_trades'],
+            'wins': closed['wins'],
+            'losses': closed['losses'],
+            'win_rate': (closed['wins'] / closed['total_trades']) * 100,
+            'total_pnl': closed['total_pnl'],
+            'total_pnl_percent': (closed['total_pnl'] / self.initial_balance) * 100,
+            'avg_win': closed['avg_win'],
+            'avg_loss': closed['avg_loss'],
+            'best_trade': closed['best_trade'],
+            'worst_trade': closed['worst_trade'],
             'open_positions': len(self.open_positions),
             'current_balance': self.balance,
             'total_portfolio_value': total_portfolio_value,
@@ -369,11 +743,41 @@ class PaperTradingManager:
             'unrealized_pnl': open_pnl,
             'initial_balance': self.initial_balance,
             'roi': roi,
-            'avg_trade_duration': sum(p.get('duration_hours', 0) for p in self.closed_positions) / len(self.closed_positions) if self.closed_positions else 0
+            'avg_trade_duration': closed['avg_trade_duration'],
+            'profit_factor': closed['profit_factor'],
+            'expectancy': closed['expectancy'],
+            'max_drawdown': closed['max_drawdown'],
+            'max_drawdown_percent': closed['max_drawdown_percent']
         }
 
         return stats
 
+    def closed_trade_statistics(self):
+        """Agrégats des trades fermés (tenus à jour à chaque fermeture)"""
+        return self.aggregates.to_dict()
+
+    def symbol_statistics(self):
+        """{symbole: {'trades', 'wins', 'pnl'}} des trades fermés"""
+        if self.storage is not None:
+            return self.storage.symbol_statistics()
+
+        symbols_stats = self.archive.symbol_statistics()
+        for pos in self.closed_positions:
+            symbol = pos['symbol']
+            if symbol not in symbols_stats:
+                symbols_stats[symbol] = {'trades': 0, 'wins': 0, 'pnl': 0}
+            symbols_stats[symbol]['trades'] += 1
+            if pos['pnl_usdt'] > 0:
+                symbols_stats[symbol]['wins'] += 1
+            symbols_stats[symbol]['pnl'] += pos['pnl_usdt']
+        return symbols_stats
+
+    def recent_closed_positions(self, limit):
+        """Les `limit` derniers trades fermés (du plus ancien au plus récent)"""
+        if self.storage is not None:
+            return self.storage.recent_trades(limit)
+        return [dict(p) for p in self.closed_positions[-limit:]] if limit > 0 else []
+
     def format_position_message(self, position, action="OPENED"):
         """Formate un message de position pour Pushover"""
         if action == "OPENED":
@@ -453,8 +857,8 @@ P&L: ${position['pnl_usdt']:.2f}"""
             message += f"""
 Portefeuille: ${portfolio_value:.2f} (ROI: {stats['roi']:.2f}%)
 
-Total trades: {len(self.closed_positions)}
-Win rate: {(len([p for p in self.closed_positions if p['pnl_usdt'] > 0]) / len(self.closed_positions) * 100):.1f}%
+Total trades: {stats['total_trades']}
+Win rate: {stats['win_rate']:.1f}%
 
 🔗 Lien Bitget: {bitget_url}
 """
@@ -462,14 +866,12 @@ Win rate: {(len([p for p in self.closed_positions if p['pnl_usdt'] > 0]) / len(s
 
     def has_open_position(self, symbol):
         """Vérifie si une position est déjà ouverte sur ce symbole"""
-        return any(position['symbol'] == symbol for position in self.open_positions)
+        return symbol in self.positions_by_symbol
 
     def get_open_position_by_symbol(self, symbol):
         """Récupère une position ouverte par symbole"""
-        for position in self.open_positions:
-            if position['symbol'] == symbol:
-                return position
-        return None
+        positions = self.positions_by_symbol.get(symbol)
+        return positions[0] if positions else None
 
     def reset(self):
         """Réinitialise le paper trading"""
@@ -477,6 +879,12 @@ Win rate: {(len([p for p in self.closed_positions if p['pnl_usdt'] > 0]) / len(s
         self.balance = initial_balance
         self.initial_balance = initial_balance
         self.open_positions = []
-        self.closed_positions = []
-        self.save_state()
+        if self.storage is not None:
+            self.storage.save_state(self.balance, self.initial_balance, [], [])
+            self.closed_positions = ClosedTradesView(self.storage)
+        else:
+            self.closed_positions = []
+            self.archive.clear()
+            self.save_state()
+        self.aggregates = TradeAggregates(self.initial_balance)
         print("Paper trading réinitialisé")
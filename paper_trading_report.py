@@ -40,6 +40,10 @@ def print_report():
         print(f"│ Meilleur trade:   ${stats['best_trade']:.2f}")
         print(f"│ Pire trade:       ${stats['worst_trade']:.2f}")
         print(f"│ Durée moyenne:    {stats['avg_trade_duration']:.1f}h")
+        profit_factor = f"{stats['profit_factor']:.2f}" if stats['profit_factor'] is not None else "N/A (aucune perte)"
+        print(f"│ Profit factor:    {profit_factor}")
+        print(f"│ Espérance/trade:  ${stats['expectancy']:+.2f}")
+        print(f"│ Drawdown max:     ${stats['max_drawdown']:.2f} ({stats['max_drawdown_percent']:.1f}%)")
         print("└" + "─"*79)
 
         # Positions ouvertes
@@ -57,9 +61,9 @@ def print_report():
             print("└" + "─"*79)
 
         # Derniers trades fermés
-        if pt.closed_positions:
+        last_trades = pt.recent_closed_positions(10)  # 10 derniers
+        if last_trades:
             print("\n┌─ DERNIERS TRADES FERMÉS " + "─"*53)
-            last_trades = pt.closed_positions[-10:]  # 10 derniers
             for pos in reversed(last_trades):
                 # Emoji spécial pour liquidation
                 if pos.get('close_reason') == 'LIQUIDATED':
@@ -77,15 +81,7 @@ def print_report():
 
         # Analyse par symbole
         print("\n┌─ ANALYSE PAR SYMBOLE " + "─"*56)
-        symbols_stats = {}
-        for pos in pt.closed_positions:
-            symbol = pos['symbol']
-            if symbol not in symbols_stats:
-                symbols_stats[symbol] = {'trades': 0, 'wins': 0, 'pnl': 0}
-            symbols_stats[symbol]['trades'] += 1
-            if pos['pnl_usdt'] > 0:
-                symbols_stats[symbol]['wins'] += 1
-            symbols_stats[symbol]['pnl'] += pos['pnl_usdt']
+        symbols_stats = pt.symbol_statistics()
 
         for symbol, data in sorted(symbols_stats.items(), key=lambda x: x[1]['pnl'], reverse=True):
             win_rate = (data['wins'] / data['trades'] * 100) if data['trades'] > 0 else 0
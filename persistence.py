@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Persistance sur disque: écritures atomiques et journal en ajout seul
+
+Un état volumineux est sauvegardé périodiquement sous forme d'instantané
+(atomic_write_json) et chaque événement intermédiaire est ajouté au journal
+(une ligne JSON compacte). Au chargement, le journal est rejoué par-dessus
+l'instantané: le coût d'un événement ne dépend pas de la taille de l'état.
+"""
+
+import json
+import os
+
+
+def atomic_write_json(path, data, indent=None):
+    """Écrit un fichier JSON dans un fichier temporaire puis le renomme (jamais de fichier à moitié écrit)"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class Journal:
+    """Journal en ajout seul: un enregistrement JSON par ligne, numéroté par `seq`"""
+
+    def __init__(self, path):
+        self.path = path
+        self.checked_tail = False
+
+    def append(self, record):
+        """Ajoute un enregistrement (coût constant)"""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Ajoute plusieurs enregistrements en une seule écriture"""
+        with open(self.path, 'a+') as f:
+            if not self.checked_tail:
+                # Terminer une ligne laissée incomplète par un arrêt brutal pour ne pas y coller la suivante
+                if f.tell() > 0:
+                    f.seek(f.tell() - 1)
+                    if f.read(1) != '\n':
+                        f.write('\n')
+                self.checked_tail = True
+            f.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records))
+
+    def read(self, after_seq=0):
+        """Enregistrements de numéro > after_seq
+
+        Une ligne incomplète (arrêt pendant l'écriture) est ignorée.
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️  Journal {self.path}: enregistrement incomplet ignoré")
+                    continue
+                if record.get('seq', 0) > after_seq:
+                    records.append(record)
+        return records
+
+    def truncate(self):
+        """Vide le journal (après un instantané qui contient tous ses enregistrements)"""
+        with open(self.path, 'w'):
+            pass
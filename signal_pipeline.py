@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Pipeline de décision: suite ordonnée de filtres (gates) appliqués aux signaux candidats
+
+Chaque gate compte les candidats évalués, les rejets et le temps passé, pour
+savoir où les signaux sont éliminés et combien d'appels LLM ont été évités.
+
+Les gates locales sont appliquées pendant la boucle des symboles (run_local);
+à partir de la première gate LLM, les candidats restants sont traités ensemble
+en fin de scan (run_deferred), ce qui permet de valider en parallèle.
+"""
+
+import time
+
+
+class Gate:
+    """Filtre d'un signal candidat: check(candidate) retourne True si le candidat continue"""
+
+    def __init__(self, name, check, cost='local', prefetch=None):
+        self.name = name
+        self.check = check
+        self.cost = cost  # 'local' (vérification en mémoire) ou 'llm' (appel API)
+        # prefetch(candidates): prépare en une fois les données de tous les candidats d'une étape différée
+        self.prefetch = prefetch
+        self.evaluated = 0
+        self.rejected = 0
+        self.total_time = 0.0
+
+    def __call__(self, candidate):
+        start = time.perf_counter()
+        passed = bool(self.check(candidate))
+        self.total_time += time.perf_counter() - start
+        self.evaluated += 1
+        if not passed:
+            self.rejected += 1
+        return passed
+
+    def prepare(self, candidates):
+        """Exécute le prefetch (compté dans le temps de la gate)"""
+        if self.prefetch is None:
+            return
+        start = time.perf_counter()
+        self.prefetch(candidates)
+        self.total_time += time.perf_counter() - start
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'cost': self.cost,
+            'evaluated': self.evaluated,
+            'rejected': self.rejected,
+            'total_time': self.total_time,
+            'avg_time_ms': (self.total_time / self.evaluated) * 1000 if self.evaluated else 0
+        }
+
+
+class SignalPipeline:
+    """Applique les gates dans l'ordre et s'arrête au premier rejet"""
+
+    def __init__(self, gates):
+        self.gates = gates
+        self.deferred_from = next((i for i, gate in enumerate(gates) if gate.cost == 'llm'), len(gates))
+
+    def run_local(self, candidate):
+        """Applique les gates précédant la première gate LLM (candidate['rejected_by'] en cas de rejet)"""
+        return self._run_gates(candidate, self.gates[:self.deferred_from])
+
+    def run_deferred(self, candidates):
+        """Applique les gates restantes à tous les candidats, retourne ceux qui passent"""
+        remaining = list(candidates)
+        for gate in self.gates[self.deferred_from:]:
+            if not remaining:
+                break
+            gate.prepare(remaining)
+            passed = []
+            for candidate in remaining:
+                if gate(candidate):
+                    passed.append(candidate)
+                else:
+                    candidate['rejected_by'] = gate.name
+            remaining = passed
+        return remaining
+
+    def _run_gates(self, candidate, gates):
+        for gate in gates:
+            if not gate(candidate):
+                candidate['rejected_by'] = gate.name
+                return False
+        return True
+
+    def llm_calls_avoided(self):
+        """Candidats rejetés par une gate locale placée avant la première gate LLM"""
+        avoided = 0
+        for gate in self.gates:
+            if gate.cost == 'llm':
+                return avoided
+            avoided += gate.rejected
+        return 0
+
+    def stats(self):
+        return {
+            'gates': [gate.stats() for gate in self.gates],
+            'llm_calls_avoided': self.llm_calls_avoided()
+        }
+
+    def print_stats(self):
+        """Affiche les compteurs de chaque gate"""
+        print("🚦 Pipeline de décision (depuis le démarrage):")
+        for gate in self.gates:
+            stats = gate.stats()
+            print(f"   {stats['name']:<15} [{stats['cost']:<5}] évalués: {stats['evaluated']:>4} | rejetés: {stats['rejected']:>4} | {stats['avg_time_ms']:.1f} ms/appel")
+        print(f"   Appels LLM évités: {self.llm_calls_avoided()}")
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Stockage SQLite de l'historique du paper trading (optionnel)
+
+Les positions ouvertes et les trades fermés sont dans deux tables indexées.
+Le mode WAL permet à l'interface web et au rapport de lire pendant que
+l'agent écrit. Derniers trades, agrégats par symbole et résultats servant
+aux statistiques sont lus en SQL, sans charger tout l'historique en mémoire.
+
+Au premier démarrage avec une base vide, PaperTradingManager y importe
+l'historique JSON existant (migration unique).
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from collections.abc import Sequence
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS positions (
+    id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    status TEXT NOT NULL,
+    opened_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT,
+    symbol TEXT NOT NULL,
+    type TEXT,
+    pnl_usdt REAL,
+    pnl_percent REAL,
+    close_reason TEXT,
+    opened_at TEXT,
+    closed_at TEXT,
+    duration_hours REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_positions_symbol ON positions(symbol);
+CREATE INDEX IF NOT EXISTS idx_positions_status ON positions(status);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades(symbol);
+CREATE INDEX IF NOT EXISTS idx_trades_closed_at ON trades(closed_at);
+"""
+
+
+class SQLiteStorage:
+    """Positions ouvertes, trades fermés et balance dans une base SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.conn = sqlite3.connect(path, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def is_empty(self):
+        return self.conn.execute("SELECT COUNT(*) FROM meta").fetchone()[0] == 0
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _upsert_position(self, position):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO positions (id, symbol, status, opened_at, data) VALUES (?, ?, ?, ?, ?)",
+            (position['id'], position['symbol'], position.get('status', 'open'), position.get('opened_at'), json.dumps(position))
+        )
+
+    def _insert_trade(self, position):
+        self.conn.execute(
+            """INSERT INTO trades
+               (id, symbol, type, pnl_usdt, pnl_percent, close_reason, opened_at, closed_at, duration_hours, data)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (position.get('id'), position['symbol'], position.get('type'), position.get('pnl_usdt', 0),
+             position.get('pnl_percent', 0), position.get('close_reason'), position.get('opened_at'),
+             position.get('closed_at'), position.get('duration_hours'), json.dumps(dict(position)))
+        )
+
+    def load_open_positions(self):
+        rows = self.conn.execute("SELECT data FROM positions WHERE status = 'open' ORDER BY opened_at").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def record_batch(self, events):
+        """Enregistre des événements (op, position, balance) dans une seule transaction"""
+        with self.conn:
+            for op, position, balance in events:
+                if op == 'close':
+                    self.conn.execute("DELETE FROM positions WHERE id = ?", (position['id'],))
+                    self._insert_trade(position)
+                else:
+                    self._upsert_position(position)
+                if balance is not None:
+                    self._set_meta('balance', balance)
+
+    def save_state(self, balance, initial_balance, open_positions, closed_positions=None):
+        """Remplace l'état complet (positions ouvertes, balance; trades si closed_positions est fourni)"""
+        with self.conn:
+            self._set_meta('balance', balance)
+            self._set_meta('initial_balance', initial_balance)
+            self.conn.execute("DELETE FROM positions")
+            for position in open_positions:
+                self._upsert_position(position)
+            if closed_positions is not None:
+                self.conn.execute("DELETE FROM trades")
+                for position in closed_positions:
+                    self._insert_trade(position)
+
+    def count_trades(self):
+        return self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def trades(self, limit=-1, offset=0, since=None, until=None):
+        """Trades fermés dans l'ordre de fermeture (since/until: datetime sur closed_at)"""
+        conditions, params = [], []
+        # closed_at est en ISO 8601 avec fuseau: pré-filtre par l'index avec une marge, puis comparaison exacte
+        if since is not None:
+            conditions.append("closed_at >= ?")
+            params.append((since - timedelta(days=1)).isoformat())
+        if until is not None:
+            conditions.append("closed_at <= ?")
+            params.append((until + timedelta(days=1)).isoformat())
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        rows = self.conn.execute(f"SELECT data FROM trades{where} ORDER BY seq LIMIT ? OFFSET ?", (*params, limit, offset))
+        for row in rows:
+            trade = json.loads(row[0])
+            if since is not None or until is not None:
+                closed_at = datetime.fromisoformat(trade['closed_at'])
+                if (since is not None and closed_at < since) or (until is not None and closed_at > until):
+                    continue
+            yield trade
+
+    def trade_index_rows(self, offset=0):
+        """(seq, champs indexés) des trades à partir du rang `offset`, sans décoder les données JSON"""
+        rows = self.conn.execute(
+            "SELECT seq, id, symbol, type, close_reason, pnl_usdt, closed_at FROM trades ORDER BY seq LIMIT -1 OFFSET ?",
+            (offset,)
+        )
+        for seq, trade_id, symbol, kind, close_reason, pnl_usdt, closed_at in rows:
+            yield seq, {
+                'id': trade_id, 'symbol': symbol, 'type': kind, 'close_reason': close_reason,
+                'pnl_usdt': pnl_usdt, 'closed_at': closed_at
+            }
+
+    def trades_by_seq(self, seqs):
+        """Trades fermés de numéros `seqs`, dans cet ordre (None si absent)"""
+        by_seq = {}
+        for start in range(0, len(seqs), 500):
+            chunk = seqs[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT seq, data FROM trades WHERE seq IN ({','.join('?' * len(chunk))})", tuple(chunk)
+            )
+            by_seq.update((seq, json.loads(data)) for seq, data in rows)
+        return [by_seq.get(seq) for seq in seqs]
+
+    def recent_trades(self, limit):
+        """Les `limit` derniers trades fermés, du plus ancien au plus récent"""
+        rows = self.conn.execute("SELECT data FROM trades ORDER BY seq DESC LIMIT ?", (limit,)).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def trade_results(self):
+        """(pnl_usdt, duration_hours) des trades fermés dans l'ordre de fermeture"""
+        return self.conn.execute("SELECT pnl_usdt, COALESCE(duration_hours, 0) FROM trades ORDER BY seq")
+
+    def symbol_statistics(self):
+        """{symbole: {'trades', 'wins', 'pnl'}} des trades fermés"""
+        rows = self.conn.execute("""
+            SELECT symbol, COUNT(*), COALESCE(SUM(pnl_usdt > 0), 0), COALESCE(SUM(pnl_usdt), 0)
+            FROM trades GROUP BY symbol
+        """)
+        return {symbol: {'trades': trades, 'wins': wins, 'pnl': pnl} for symbol, trades, wins, pnl in rows}
+
+    def close(self):
+        self.conn.close()
+
+
+class SQLiteTradeSource:
+    """Trades fermés lus à la demande par numéro (seq), pour l'index de l'interface web
+
+    Une connexion est ouverte par lecture: la source survit à la fermeture du
+    PaperTradingManager qui l'a créée et peut servir depuis n'importe quel thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def entries(self, start):
+        """(seq, trade réduit aux champs indexés) à partir du rang `start`"""
+        storage = SQLiteStorage(self.path)
+        try:
+            yield from storage.trade_index_rows(start)
+        finally:
+            storage.close()
+
+    def read(self, locations):
+        storage = SQLiteStorage(self.path)
+        try:
+            return storage.trades_by_seq([int(seq) for seq in locations])
+        finally:
+            storage.close()
+
+
+class ClosedTradesView(Sequence):
+    """Vue en lecture seule des trades fermés: len, index et tranches traduits en requêtes SQL"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def __len__(self):
+        return self.storage.count_trades()
+
+    def __getitem__(self, index):
+        length = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            if step != 1:
+                return list(self)[index]
+            return list(self.storage.trades(limit=max(0, stop - start), offset=start))
+
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("trade index out of range")
+        return next(self.storage.trades(limit=1, offset=index))
+
+    def __iter__(self):
+        return self.storage.trades()
+
+    def __bool__(self):
+        return self.storage.conn.execute("SELECT 1 FROM trades LIMIT 1").fetchone() is not None
@@ -1,6 +1,19 @@
 // Configuration
-const REFRESH_INTERVAL = 5000; // 5 secondes
+const REFRESH_INTERVAL = 5000; // 5 secondes (uniquement sans support des Server-Sent Events)
+const DURATION_REFRESH_INTERVAL = 60000; // Recalcul local des durées des positions ouvertes
+const MAX_CLOSED_POSITIONS = 20;
+const MAX_LOG_LINES = 100;
 let refreshTimer;
+let durationTimer;
+let eventSource;
+
+// État courant, mis à jour par le flux /api/stream
+const state = {
+    openPositions: [],
+    closedPositions: [],
+    logs: [],
+    logPosition: null // {offset, inode} de la dernière lecture de /api/logs
+};
 
 // Éléments du DOM
 const elements = {
@@ -84,152 +97,163 @@ function calculateDuration(startISO) {
     }
 }
 
-// Mise à jour des statistiques
-async function updateStats() {
-    try {
-        const response = await fetch('/api/stats');
-        const stats = await response.json();
-
-        // Portfolio
-        const portfolioValue = stats.total_portfolio_value || stats.current_balance || 0;
-        elements.totalPortfolio.textContent = formatCurrency(portfolioValue);
+// Affichage des statistiques
+function renderStats(stats) {
+    // Portfolio
+    const portfolioValue = stats.total_portfolio_value || stats.current_balance || 0;
+    elements.totalPortfolio.textContent = formatCurrency(portfolioValue);
 
-        // ROI
-        const roi = stats.roi || 0;
-        elements.roi.textContent = formatPercent(roi);
-        elements.roi.className = `stat-value ${roi >= 0 ? 'pnl-positive' : 'pnl-negative'}`;
+    // ROI
+    const roi = stats.roi || 0;
+    elements.roi.textContent = formatPercent(roi);
+    elements.roi.className = `stat-value ${roi >= 0 ? 'pnl-positive' : 'pnl-negative'}`;
 
-        // Portfolio change
-        elements.portfolioChange.textContent = formatPercent(roi);
-        elements.portfolioChange.className = `stat-change ${roi >= 0 ? 'positive' : 'negative'}`;
+    // Portfolio change
+    elements.portfolioChange.textContent = formatPercent(roi);
+    elements.portfolioChange.className = `stat-change ${roi >= 0 ? 'positive' : 'negative'}`;
 
-        // Balance
-        elements.balance.textContent = formatCurrency(stats.current_balance || 0);
+    // Balance
+    elements.balance.textContent = formatCurrency(stats.current_balance || 0);
 
-        // Trades
-        elements.totalTrades.textContent = stats.total_trades || 0;
+    // Trades
+    elements.totalTrades.textContent = stats.total_trades || 0;
 
-        // Win rate
-        elements.winRate.textContent = `${(stats.win_rate || 0).toFixed(1)}%`;
+    // Win rate
+    elements.winRate.textContent = `${(stats.win_rate || 0).toFixed(1)}%`;
 
-        // Total P&L
-        const totalPnl = stats.total_pnl || 0;
-        elements.totalPnl.textContent = formatCurrency(totalPnl);
-        elements.totalPnl.className = `stat-value ${totalPnl >= 0 ? 'pnl-positive' : 'pnl-negative'}`;
+    // Total P&L
+    const totalPnl = stats.total_pnl || 0;
+    elements.totalPnl.textContent = formatCurrency(totalPnl);
+    elements.totalPnl.className = `stat-value ${totalPnl >= 0 ? 'pnl-positive' : 'pnl-negative'}`;
+}
 
+// Mise à jour des statistiques
+async function updateStats() {
+    try {
+        const response = await fetch('/api/stats');
+        renderStats(await response.json());
     } catch (error) {
         console.error('Erreur lors de la mise à jour des stats:', error);
     }
 }
 
+// Affichage des positions ouvertes
+function renderOpenPositions(openPositions) {
+    elements.openCount.textContent = openPositions.length;
+
+    if (openPositions.length === 0) {
+        elements.openPositionsBody.innerHTML = '<tr><td colspan="12" class="no-data">Aucune position ouverte</td></tr>';
+    } else {
+        elements.openPositionsBody.innerHTML = openPositions.map(pos => {
+            const pnl = pos.pnl_usdt || 0;
+            const pnlPercent = pos.pnl_percent_on_margin || pos.pnl_percent || 0;
+            const leverage = pos.leverage || 1;
+            
+            // Générer l'URL Bitget pour cette paire (nettoyer le symbole en enlevant les /)
+            const cleanSymbol = pos.symbol.replace('/', '');
+            const bitgetUrl = `https://www.bitget.site/fr/futures/usdt/${cleanSymbol}`;
+
+            return `
+                <tr>
+                    <td><strong>${pos.symbol}</strong></td>
+                    <td><span class="badge badge-${pos.type.toLowerCase()}">${pos.type}</span></td>
+                    <td>$${formatNumber(pos.entry_price)}</td>
+                    <td>$${formatNumber(pos.current_price)}</td>
+                    <td>$${formatNumber(pos.tp)}</td>
+                    <td>$${formatNumber(pos.sl)}</td>
+                    <td>$${formatNumber(pos.size_usdt, 2)}</td>
+                    <td>${leverage}x</td>
+                    <td class="${pnl >= 0 ? 'pnl-positive' : 'pnl-negative'}">${formatCurrency(pnl)}</td>
+                    <td class="${pnl >= 0 ? 'pnl-positive' : 'pnl-negative'}">${formatPercent(pnlPercent)}</td>
+                    <td>${calculateDuration(pos.opened_at)}</td>
+                    <td>
+                        <a href="${bitgetUrl}" target="_blank" class="btn-action bitget-link" title="Ouvrir sur Bitget">
+                            <i class="fas fa-external-link-alt"></i> Bitget
+                        </a>
+                    </td>
+                </tr>
+            `;
+        }).join('');
+    }
+}
+
+// Affichage de l'historique
+function renderHistory(closedPositions) {
+    if (closedPositions.length === 0) {
+        elements.historyBody.innerHTML = '<tr><td colspan="12" class="no-data">Aucun trade fermé</td></tr>';
+    } else {
+        elements.historyBody.innerHTML = closedPositions.slice().reverse().map(pos => {
+            const pnl = pos.pnl_usdt || 0;
+            const pnlPercent = pos.pnl_percent_on_margin || pos.pnl_percent || 0;
+            const leverage = pos.leverage || 1;
+            const closedDate = new Date(pos.closed_at).toLocaleString('fr-FR');
+
+            let reasonEmoji = '✓';
+            if (pos.close_reason === 'TP_HIT') reasonEmoji = '🎯';
+            else if (pos.close_reason === 'SL_HIT') reasonEmoji = '🛑';
+            else if (pos.close_reason === 'LIQUIDATED') reasonEmoji = '💀';
+
+            // Générer l'URL Bitget pour cette paire (nettoyer le symbole en enlevant les /)
+            const cleanSymbol = pos.symbol.replace('/', '');
+            const bitgetUrl = `https://www.bitget.site/fr/futures/usdt/${cleanSymbol}`;
+
+            return `
+                <tr>
+                    <td>${closedDate}</td>
+                    <td><strong>${pos.symbol}</strong></td>
+                    <td><span class="badge badge-${pos.type.toLowerCase()}">${pos.type}</span></td>
+                    <td>$${formatNumber(pos.entry_price)}</td>
+                    <td>$${formatNumber(pos.exit_price)}</td>
+                    <td>${reasonEmoji} ${pos.close_reason}</td>
+                    <td>$${formatNumber(pos.size_usdt, 2)}</td>
+                    <td>${leverage}x</td>
+                    <td class="${pnl >= 0 ? 'pnl-positive' : 'pnl-negative'}">${formatCurrency(pnl)}</td>
+                    <td class="${pnl >= 0 ? 'pnl-positive' : 'pnl-negative'}">${formatPercent(pnlPercent)}</td>
+                    <td>${pos.duration_hours ? pos.duration_hours.toFixed(1) + 'h' : '-'}</td>
+                    <td>
+                        <a href="${bitgetUrl}" target="_blank" class="btn-action bitget-link" title="Ouvrir sur Bitget">
+                            <i class="fas fa-external-link-alt"></i> Bitget
+                        </a>
+                    </td>
+                </tr>
+            `;
+        }).join('');
+    }
+}
+
 // Mise à jour des positions
 async function updatePositions() {
     try {
         const response = await fetch('/api/positions');
         const data = await response.json();
 
-        // Positions ouvertes
-        const openPositions = data.open || [];
-        elements.openCount.textContent = openPositions.length;
-
-        if (openPositions.length === 0) {
-            elements.openPositionsBody.innerHTML = '<tr><td colspan="12" class="no-data">Aucune position ouverte</td></tr>';
-        } else {
-            elements.openPositionsBody.innerHTML = openPositions.map(pos => {
-                const pnl = pos.pnl_usdt || 0;
-                const pnlPercent = pos.pnl_percent_on_margin || pos.pnl_percent || 0;
-                const leverage = pos.leverage || 1;
-                
-                // Générer l'URL Bitget pour cette paire (nettoyer le symbole en enlevant les /)
-                const cleanSymbol = pos.symbol.replace('/', '');
-                const bitgetUrl = `https://www.bitget.site/fr/futures/usdt/${cleanSymbol}`;
-
-                return `
-                    <tr>
-                        <td><strong>${pos.symbol}</strong></td>
-                        <td><span class="badge badge-${pos.type.toLowerCase()}">${pos.type}</span></td>
-                        <td>$${formatNumber(pos.entry_price)}</td>
-                        <td>$${formatNumber(pos.current_price)}</td>
-                        <td>$${formatNumber(pos.tp)}</td>
-                        <td>$${formatNumber(pos.sl)}</td>
-                        <td>$${formatNumber(pos.size_usdt, 2)}</td>
-                        <td>${leverage}x</td>
-                        <td class="${pnl >= 0 ? 'pnl-positive' : 'pnl-negative'}">${formatCurrency(pnl)}</td>
-                        <td class="${pnl >= 0 ? 'pnl-positive' : 'pnl-negative'}">${formatPercent(pnlPercent)}</td>
-                        <td>${calculateDuration(pos.opened_at)}</td>
-                        <td>
-                            <a href="${bitgetUrl}" target="_blank" class="btn-action bitget-link" title="Ouvrir sur Bitget">
-                                <i class="fas fa-external-link-alt"></i> Bitget
-                            </a>
-                        </td>
-                    </tr>
-                `;
-            }).join('');
-        }
-
-        // Historique
-        const closedPositions = data.closed || [];
-        if (closedPositions.length === 0) {
-            elements.historyBody.innerHTML = '<tr><td colspan="12" class="no-data">Aucun trade fermé</td></tr>';
-        } else {
-            elements.historyBody.innerHTML = closedPositions.reverse().map(pos => {
-                const pnl = pos.pnl_usdt || 0;
-                const pnlPercent = pos.pnl_percent_on_margin || pos.pnl_percent || 0;
-                const leverage = pos.leverage || 1;
-                const closedDate = new Date(pos.closed_at).toLocaleString('fr-FR');
-
-                let reasonEmoji = '✓';
-                if (pos.close_reason === 'TP_HIT') reasonEmoji = '🎯';
-                else if (pos.close_reason === 'SL_HIT') reasonEmoji = '🛑';
-                else if (pos.close_reason === 'LIQUIDATED') reasonEmoji = '💀';
-
-                // Générer l'URL Bitget pour cette paire (nettoyer le symbole en enlevant les /)
-                const cleanSymbol = pos.symbol.replace('/', '');
-                const bitgetUrl = `https://www.bitget.site/fr/futures/usdt/${cleanSymbol}`;
-
-                return `
-                    <tr>
-                        <td>${closedDate}</td>
-                        <td><strong>${pos.symbol}</strong></td>
-                        <td><span class="badge badge-${pos.type.toLowerCase()}">${pos.type}</span></td>
-                        <td>$${formatNumber(pos.entry_price)}</td>
-                        <td>$${formatNumber(pos.exit_price)}</td>
-                        <td>${reasonEmoji} ${pos.close_reason}</td>
-                        <td>$${formatNumber(pos.size_usdt, 2)}</td>
-                        <td>${leverage}x</td>
-                        <td class="${pnl >= 0 ? 'pnl-positive' : 'pnl-negative'}">${formatCurrency(pnl)}</td>
-                        <td class="${pnl >= 0 ? 'pnl-positive' : 'pnl-negative'}">${formatPercent(pnlPercent)}</td>
-                        <td>${pos.duration_hours ? pos.duration_hours.toFixed(1) + 'h' : '-'}</td>
-                        <td>
-                            <a href="${bitgetUrl}" target="_blank" class="btn-action bitget-link" title="Ouvrir sur Bitget">
-                                <i class="fas fa-external-link-alt"></i> Bitget
-                            </a>
-                        </td>
-                    </tr>
-                `;
-            }).join('');
-        }
+        state.openPositions = data.open || [];
+        state.closedPositions = data.closed || [];
+        renderOpenPositions(state.openPositions);
+        renderHistory(state.closedPositions);
 
     } catch (error) {
         console.error('Erreur lors de la mise à jour des positions:', error);
     }
 }
 
+// Affichage du statut du bot
+function renderBotStatus(status) {
+    const isRunning = status.running;
+
+    // Mise à jour de l'interface
+    elements.botStatus.className = `bot-status ${isRunning ? 'running' : 'stopped'}`;
+    elements.botStatusText.textContent = isRunning ? 'En cours d\'exécution' : 'Arrêté';
+
+    elements.btnStart.disabled = isRunning;
+    elements.btnStop.disabled = !isRunning;
+}
+
 // Mise à jour du statut du bot
 async function updateBotStatus() {
     try {
         const response = await fetch('/api/bot/status');
-        const status = await response.json();
-
-        const isRunning = status.running;
-
-        // Mise à jour de l'interface
-        elements.botStatus.className = `bot-status ${isRunning ? 'running' : 'stopped'}`;
-        elements.botStatusText.textContent = isRunning ? 'En cours d\'exécution' : 'Arrêté';
-
-        elements.btnStart.disabled = isRunning;
-        elements.btnStop.disabled = !isRunning;
-
+        renderBotStatus(await response.json());
     } catch (error) {
         console.error('Erreur lors de la mise à jour du statut:', error);
     }
@@ -273,29 +297,121 @@ async function updateConfig() {
     }
 }
 
+// Affichage des logs
+function renderLogs(logs) {
+    if (logs.length === 0) {
+        elements.logsContainer.innerHTML = '<div class="no-data">Aucun log disponible</div>';
+    } else {
+        elements.logsContainer.innerHTML = logs.map(line =>
+            `<div class="log-line">${line.trim()}</div>`
+        ).join('');
+
+        // Auto-scroll vers le bas
+        elements.logsContainer.scrollTop = elements.logsContainer.scrollHeight;
+    }
+}
+
 // Mise à jour des logs
 async function updateLogs() {
     try {
-        const response = await fetch('/api/logs');
+        // Après la première lecture, seules les nouvelles lignes sont demandées
+        const position = state.logPosition;
+        const url = position && position.offset !== null
+            ? `/api/logs?since=${position.offset}${position.inode !== null ? `&inode=${position.inode}` : ''}`
+            : '/api/logs';
+        const response = await fetch(url);
         const data = await response.json();
-        const logs = data.logs || [];
+        const lines = data.logs || [];
+        state.logPosition = { offset: data.offset, inode: data.inode };
 
-        if (logs.length === 0) {
-            elements.logsContainer.innerHTML = '<div class="no-data">Aucun log disponible</div>';
-        } else {
-            elements.logsContainer.innerHTML = logs.map(line =>
-                `<div class="log-line">${line.trim()}</div>`
-            ).join('');
-
-            // Auto-scroll vers le bas
-            elements.logsContainer.scrollTop = elements.logsContainer.scrollHeight;
+        if (data.reset === false && lines.length === 0) {
+            return;
         }
+        state.logs = (data.reset === false ? state.logs.concat(lines) : lines).slice(-MAX_LOG_LINES);
+        renderLogs(state.logs);
 
     } catch (error) {
         console.error('Erreur lors de la mise à jour des logs:', error);
     }
 }
 
+function markUpdated() {
+    elements.lastUpdate.textContent = new Date().toLocaleTimeString('fr-FR');
+}
+
+// Flux des changements poussés par le serveur (Server-Sent Events)
+function connectStream() {
+    eventSource = new EventSource('/api/stream');
+
+    // État complet, envoyé à chaque (re)connexion
+    eventSource.addEventListener('positions', event => {
+        const data = JSON.parse(event.data);
+        state.openPositions = data.open || [];
+        state.closedPositions = data.closed || [];
+        renderOpenPositions(state.openPositions);
+        renderHistory(state.closedPositions);
+        markUpdated();
+    });
+
+    eventSource.addEventListener('stats', event => {
+        renderStats(JSON.parse(event.data));
+        markUpdated();
+    });
+
+    eventSource.addEventListener('bot-status', event => {
+        renderBotStatus(JSON.parse(event.data));
+        markUpdated();
+    });
+
+    eventSource.addEventListener('logs', event => {
+        // Dernières lignes jusqu'à la position de référence du serveur: la suite arrive en log-line
+        const data = JSON.parse(event.data);
+        state.logs = (data.lines || []).slice(-MAX_LOG_LINES);
+        state.logPosition = { offset: data.offset, inode: data.inode };
+        renderLogs(state.logs);
+    });
+
+    eventSource.addEventListener('position-opened', event => {
+        state.openPositions.push(JSON.parse(event.data));
+        renderOpenPositions(state.openPositions);
+        markUpdated();
+    });
+
+    eventSource.addEventListener('position-updated', event => {
+        const position = JSON.parse(event.data);
+        state.openPositions = state.openPositions.map(p => p.id === position.id ? position : p);
+        renderOpenPositions(state.openPositions);
+        markUpdated();
+    });
+
+    eventSource.addEventListener('position-closed', event => {
+        const position = JSON.parse(event.data);
+        state.openPositions = state.openPositions.filter(p => p.id !== position.id);
+        state.closedPositions = state.closedPositions.concat([position]).slice(-MAX_CLOSED_POSITIONS);
+        renderOpenPositions(state.openPositions);
+        renderHistory(state.closedPositions);
+        markUpdated();
+    });
+
+    eventSource.addEventListener('log-line', event => {
+        state.logs = state.logs.concat([JSON.parse(event.data)]).slice(-MAX_LOG_LINES);
+        renderLogs(state.logs);
+        markUpdated();
+    });
+
+    eventSource.addEventListener('log-reset', event => {
+        // Log remplacé ou tronqué côté serveur: ses dernières lignes remplacent l'affichage
+        state.logs = JSON.parse(event.data).slice(-MAX_LOG_LINES);
+        renderLogs(state.logs);
+        markUpdated();
+    });
+
+    eventSource.onerror = () => {
+        // EventSource se reconnecte automatiquement; le serveur renvoie alors l'état complet
+        console.warn('Flux interrompu, reconnexion...');
+    };
+}
+
 // Contrôles du bot
 async function startBot() {
     try {
@@ -353,7 +469,7 @@ async function refreshAll() {
     ]);
 
     // Mise à jour de l'heure
-    elements.lastUpdate.textContent = new Date().toLocaleTimeString('fr-FR');
+    markUpdated();
 }
 
 // Fonction pour exporter les trades en CSV
@@ -448,14 +564,23 @@ document.addEventListener('DOMContentLoaded', async () => {
         btnExportCSV.addEventListener('click', exportTradesToCSV);
     }
 
-    // Première mise à jour
-    await refreshAll();
     await updateConfig();
 
-    // Auto-refresh
-    refreshTimer = setInterval(refreshAll, REFRESH_INTERVAL);
+    if (window.EventSource) {
+        // Le flux envoie l'état complet (log compris) à chaque (re)connexion, puis les changements
+        connectStream();
 
-    console.log(`✓ Auto-refresh activé (${REFRESH_INTERVAL / 1000}s)`);
+        // Les durées des positions ouvertes avancent sans changement côté serveur
+        durationTimer = setInterval(() => renderOpenPositions(state.openPositions), DURATION_REFRESH_INTERVAL);
+
+        console.log('✓ Mises à jour en direct activées (/api/stream)');
+    } else {
+        // Navigateur sans Server-Sent Events: interrogation périodique
+        await refreshAll();
+        refreshTimer = setInterval(refreshAll, REFRESH_INTERVAL);
+
+        console.log(`✓ Auto-refresh activé (${REFRESH_INTERVAL / 1000}s)`);
+    }
 });
 
 // Cleanup
@@ -463,4 +588,10 @@ window.addEventListener('beforeunload', () => {
     if (refreshTimer) {
         clearInterval(refreshTimer);
     }
+    if (durationTimer) {
+        clearInterval(durationTimer);
+    }
+    if (eventSource) {
+        eventSource.close();
+    }
 });
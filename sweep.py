@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Optimisation des paramètres de la stratégie par balayage parallèle
+
+Les historiques sont préparés une seule fois (indicateurs + score) puis copiés
+dans des blocs de mémoire partagée. Chaque processus du pool s'y attache en
+lecture seule et exécute run_backtest pour une combinaison de paramètres.
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import config
+from backtest import DATA_DIR, default_params, load_prepared, run_backtest
+
+# Grille par défaut: paramètres réglés à la main jusqu'ici
+DEFAULT_GRID = {
+    'min_confidence_score': [55, 65, 75],
+    'min_risk_reward': [1.2, 1.5, 2.0],
+    'fixed_tp': [True, False],
+    'atr_multiplier_tp': [2.0, 2.5, 3.0],
+    'atr_multiplier_sl': [1.0, 1.5, 2.0],
+    'trailing_stop': [False, True],
+    'trailing_stop_percent': [1.0, 1.5, 2.5],
+    'fixed_tp_percent': [1.5, 2.0, 3.0],
+    'leverage': [1, 3, 5],
+}
+
+# Paramètres ignorés par run_backtest selon un interrupteur: {paramètre: (interrupteur, valeur)}
+INERT_WHEN = {
+    'atr_multiplier_tp': ('fixed_tp', True),
+    'fixed_tp_percent': ('fixed_tp', False),
+    'trailing_stop_percent': ('trailing_stop', False),
+}
+
+RESULT_COLUMNS = ['roi', 'win_rate', 'max_drawdown', 'profit_factor', 'total_trades', 'final_balance']
+
+# Historiques partagés, attachés une fois par processus
+_shared_blocks = []
+_prepared = None
+
+
+def share_prepared(prepared):
+    """Copie les historiques préparés en mémoire partagée
+
+    Chaque symbole occupe un bloc float64 (colonnes x bougies).
+    Retourne (blocs, layout) où layout décrit comment reconstruire les vues.
+    """
+    blocks, layout = [], {}
+    for symbol, data in prepared.items():
+        columns = list(data)
+        length = len(data['close'])
+        block = shared_memory.SharedMemory(create=True, size=max(1, len(columns) * length * 8))
+        array = np.ndarray((len(columns), length), dtype=np.float64, buffer=block.buf)
+        for i, column in enumerate(columns):
+            array[i] = data[column]
+        blocks.append(block)
+        layout[symbol] = (block.name, columns, length)
+    return blocks, layout
+
+
+def _attach(layout):
+    """Initialisation d'un processus: vues en lecture seule sur la mémoire partagée"""
+    global _prepared
+    _prepared = {}
+    for symbol, (name, columns, length) in layout.items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared_blocks.append(block)
+        array = np.ndarray((len(columns), length), dtype=np.float64, buffer=block.buf)
+        array.flags.writeable = False
+        _prepared[symbol] = {column: array[i] for i, column in enumerate(columns)}
+
+
+def _evaluate(params):
+    results = run_backtest(_prepared, params)
+    # Les paramètres sans effet sur ce résultat restent vides
+    row = {**params, **{name: None for name in inert_params(params, default_params())}}
+    return {**row, **{column: results[column] for column in RESULT_COLUMNS}}
+
+
+def inert_params(params, defaults):
+    """Paramètres de la combinaison sans effet, leur interrupteur étant dans la mauvaise position"""
+    effective = {**defaults, **params}
+    return {
+        name for name, (switch, value) in INERT_WHEN.items()
+        if name in params and bool(effective[switch]) == value
+    }
+
+
+def unique_combinations(combinations):
+    """Combinaisons distinctes une fois les paramètres sans effet ignorés (la première est gardée)"""
+    defaults = default_params()
+    seen, unique = set(), []
+    for params in combinations:
+        inert = inert_params(params, defaults)
+        key = tuple((name, value) for name, value in sorted(params.items()) if name not in inert)
+        if key not in seen:
+            seen.add(key)
+            unique.append(params)
+    return unique
+
+
+def build_combinations(grid, samples=None, seed=None):
+    """Combinaisons distinctes de la grille, ou d'un tirage aléatoire de `samples` combinaisons"""
+    names = list(grid)
+    if samples is None:
+        return unique_combinations(dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names)))
+
+    rng = random.Random(seed)
+    return unique_combinations({name: rng.choice(grid[name]) for name in names} for _ in range(samples))
+
+
+def run_sweep(prepared, combinations, workers=None):
+    """Évalue toutes les combinaisons sur tous les cœurs"""
+    blocks, layout = share_prepared(prepared)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(layout,)) as pool:
+            return list(pool.map(_evaluate, combinations, chunksize=max(1, len(combinations) // 64)))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def print_table(results, limit):
+    """Affiche les meilleurs résultats triés"""
+    if not results:
+        print("Aucun résultat")
+        return
+
+    params = [k for k in results[0] if k not in RESULT_COLUMNS]
+    columns = params + RESULT_COLUMNS
+    widths = {c: max(len(c), 10) for c in columns}
+
+    print(" ".join(f"{c:>{widths[c]}}" for c in columns))
+    for row in results[:limit]:
+        cells = []
+        for c in columns:
+            value = row[c]
+            text = f"{value:.2f}" if isinstance(value, float) else '-' if value is None else str(value)
+            cells.append(f"{text:>{widths[c]}}")
+        print(" ".join(cells))
+
+
+def save_results(results, path):
+    """Sauvegarde tous les résultats en CSV"""
+    if not results:
+        return
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def parse_grid(overrides):
+    """Applique les surcharges de la ligne de commande (nom=v1,v2,...) à la grille par défaut"""
+    grid = dict(DEFAULT_GRID)
+    for override in overrides or []:
+        name, _, values = override.partition('=')
+        grid[name] = [parse_value(v) for v in values.split(',')]
+    return grid
+
+
+def parse_value(value):
+    """Valeur d'un paramètre: booléen (true/false), flottant ou entier"""
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    return float(value) if '.' in value else int(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Balayage parallèle des paramètres de la stratégie")
+    parser.add_argument('--symbols', nargs='+', default=config.SYMBOLS)
+    parser.add_argument('--timeframe', default=config.TIMEFRAME)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--param', action='append', help="Valeurs d'un paramètre, ex: leverage=1,3,5")
+    parser.add_argument('--random', type=int, help="Nombre de combinaisons tirées au hasard (sinon grille complète)")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--sort', default='roi', choices=RESULT_COLUMNS)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', default=os.path.join(DATA_DIR, 'sweep_results.csv'))
+    args = parser.parse_args()
+
+    prepared = load_prepared(args.symbols, args.timeframe, args.days)
+    combinations = build_combinations(parse_grid(args.param), args.random, args.seed)
+    print(f"🔧 {len(combinations)} combinaisons sur {args.workers} processus...")
+
+    start = time.time()
+    results = run_sweep(prepared, combinations, args.workers)
+    # Le drawdown est meilleur quand il est faible, les autres colonnes quand elles sont élevées
+    results.sort(key=lambda r: r[args.sort], reverse=args.sort != 'max_drawdown')
+    print(f"⏱️  Balayage terminé en {time.time() - start:.1f}s\n")
+
+    print_table(results, args.top)
+    save_results(results, args.output)
+    print(f"\n✓ Résultats complets: {args.output}")
@@ -0,0 +1,45 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Les modules du bot sont à la racine du dépôt
+sys.path.insert(0, ROOT)
+
+# config.py (clés API) n'est pas versionné: le modèle config.example.py en tient lieu
+try:
+    import config
+except ImportError:
+    spec = importlib.util.spec_from_file_location('config', os.path.join(ROOT, 'config.example.py'))
+    sys.modules['config'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['config'])
+    import config
+
+from paper_trading import PaperTradingManager  # noqa: E402
+
+
+@pytest.fixture
+def make_manager(tmp_path, monkeypatch):
+    """PaperTradingManager isolé dans un répertoire temporaire (stockage JSON par défaut)"""
+    monkeypatch.chdir(tmp_path)
+
+    def make(**settings):
+        defaults = {
+            'PAPER_TRADING_STORAGE': 'json',
+            'PAPER_TRADING_TRACK_FILE': str(tmp_path / 'history.json'),
+            'PAPER_TRADING_ARCHIVE_DIR': str(tmp_path / 'archive'),
+            'PAPER_TRADING_DB_FILE': str(tmp_path / 'paper_trading.db'),
+            'PAPER_TRADING_INITIAL_BALANCE': 1000,
+            'PAPER_TRADING_MAX_POSITIONS': 3,
+            'PAPER_TRADING_LEVERAGE': 5,
+            'PAPER_TRADING_TRAILING_STOP': False,
+            'PAPER_TRADING_FIXED_TP': False,
+        }
+        for name, value in {**defaults, **settings}.items():
+            monkeypatch.setattr(config, name, value, raising=False)
+        return PaperTradingManager()
+
+    return make
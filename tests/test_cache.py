@@ -0,0 +1,54 @@
+"""
+Caches LRU et TTL
+"""
+
+import cache
+from cache import LRUCache, TTLCache
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_stats():
+    lru = LRUCache(maxsize=2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == 1
+    lru.put('c', 3)
+    assert 'b' not in lru and 'a' in lru and 'c' in lru
+    assert lru.get('b') is None
+    assert (lru.hits, lru.misses) == (1, 1)
+
+
+def test_ttl_expiry_applies_to_contains(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'time', clock)
+    ttl = TTLCache(maxsize=4, ttl=60)
+    ttl.put('a', 1)
+    assert 'a' in ttl and ttl.get('a') == 1
+
+    clock.now += 61
+    assert 'a' not in ttl
+    assert (ttl.hits, ttl.misses) == (1, 0)
+    assert ttl.get('a') is None
+    assert 'missing' not in ttl
+
+
+def test_ttl_persistence_drops_expired_entries(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'time', clock)
+    path = str(tmp_path / 'cache.json')
+    ttl = TTLCache(ttl=60, path=path)
+    ttl.put('old', 1)
+    clock.now += 30
+    ttl.put('new', 2)
+
+    clock.now += 45
+    reloaded = TTLCache(ttl=60, path=path)
+    assert 'old' not in reloaded and reloaded.get('new') == 2
+    assert len(reloaded) == 1
@@ -0,0 +1,161 @@
+"""
+Équivalence des moteurs d'indicateurs (incrémental et multi-symboles) avec ta
+
+calculate_indicators (ta) sert de référence; chaque colonne est comparée à
+une tolérance près, NaN de préchauffage compris.
+"""
+
+import numpy as np
+import pytest
+
+from indicators import StreamingIndicators, calculate_indicators, calculate_indicators_batch
+from market_data import candles_to_dataframe
+
+COLUMNS = [
+    'MA_9', 'MA_21', 'MA_50', 'EMA_12', 'EMA_50', 'RSI', 'MACD', 'MACD_Signal', 'MACD_Hist',
+    'BB_High', 'BB_Low', 'BB_Mid', 'ATR', 'Volume_MA'
+]
+RTOL = 1e-7
+ATOL = 1e-8
+TIMEFRAME_MS = 15 * 60 * 1000
+
+
+def make_candles(count, seed, start=1_700_000_000_000, price=100.0):
+    """Marche aléatoire OHLCV [timestamp, open, high, low, close, volume]"""
+    rng = np.random.default_rng(seed)
+    candles = []
+    close = price
+    for i in range(count):
+        open_ = close
+        close = max(open_ * (1 + rng.normal(0, 0.01)), 0.01)
+        high = max(open_, close) * (1 + abs(rng.normal(0, 0.003)))
+        low = min(open_, close) * (1 - abs(rng.normal(0, 0.003)))
+        candles.append([start + i * TIMEFRAME_MS, open_, high, low, close, float(rng.uniform(100, 1000))])
+    # Quelques bougies plates: RSI sans baisse et true range nul
+    for i in range(80, min(count, 84)):
+        candles[i][1:5] = [candles[79][4]] * 4
+    return candles
+
+
+def reference(candles):
+    return calculate_indicators(candles_to_dataframe(candles))
+
+
+def assert_row_matches(row, expected, context):
+    for column in COLUMNS:
+        np.testing.assert_allclose(
+            row[column], expected[column], rtol=RTOL, atol=ATOL, equal_nan=True,
+            err_msg=f"{column} ({context})"
+        )
+
+
+def test_streaming_rows_match_ta_when_fed_incrementally():
+    candles = make_candles(260, seed=1)
+    expected = reference(candles)
+    streaming = StreamingIndicators()
+
+    # Une bougie de plus à chaque scan: la dernière est en cours, l'avant-dernière clôturée
+    for end in range(2, len(candles) + 1):
+        last, prev = streaming.rows('BTC/USDT', '15m', candles[:end])
+        assert_row_matches(last, expected.iloc[end - 1], f"bougie en cours {end - 1}")
+        assert_row_matches(prev, expected.iloc[end - 2], f"bougie clôturée {end - 2}")
+
+
+def test_streaming_rows_match_ta_after_several_closed_candles():
+    candles = make_candles(260, seed=2)
+    expected = reference(candles)
+    streaming = StreamingIndicators()
+
+    # Scans espacés: plusieurs bougies clôturées à intégrer d'un coup
+    for end in range(60, len(candles) + 1, 7):
+        last, prev = streaming.rows('ETH/USDT', '15m', candles[:end])
+        assert_row_matches(last, expected.iloc[end - 1], f"bougie en cours {end - 1}")
+        assert_row_matches(prev, expected.iloc[end - 2], f"bougie clôturée {end - 2}")
+
+
+def test_streaming_rebuilds_after_gap():
+    candles = make_candles(300, seed=3)
+    streaming = StreamingIndicators()
+    streaming.rows('SOL/USDT', '15m', candles[:150])
+    engine = streaming.engines[('SOL/USDT', '15m')]
+
+    # Historique rechargé sans la dernière bougie intégrée: le moteur repart de cet historique
+    window = candles[170:300]
+    last, prev = streaming.rows('SOL/USDT', '15m', window)
+
+    assert streaming.engines[('SOL/USDT', '15m')] is not engine
+    expected = reference(window)
+    assert_row_matches(last, expected.iloc[-1], "bougie en cours après trou")
+    assert_row_matches(prev, expected.iloc[-2], "bougie clôturée après trou")
+
+    # Puis reprise incrémentale normale
+    last, prev = streaming.rows('SOL/USDT', '15m', candles[170:])
+    expected = reference(candles[170:])
+    assert_row_matches(last, expected.iloc[-1], "bougie en cours après reprise")
+
+
+def test_streaming_rows_match_ta_with_symbols_and_timeframes_separate():
+    btc = make_candles(120, seed=4)
+    eth = make_candles(120, seed=5, price=2000.0)
+    streaming = StreamingIndicators()
+
+    for end in (60, 90, 120):
+        for symbol, candles in (('BTC/USDT', btc), ('ETH/USDT', eth)):
+            last, prev = streaming.rows(symbol, '15m', candles[:end])
+            expected = reference(candles[:end])
+            assert_row_matches(last, expected.iloc[-1], f"{symbol} {end}")
+            assert_row_matches(prev, expected.iloc[-2], f"{symbol} {end}")
+
+
+def test_streaming_requires_a_closed_candle():
+    with pytest.raises(ValueError):
+        StreamingIndicators().rows('BTC/USDT', '15m', make_candles(1, seed=6))
+
+
+def test_batch_matches_ta_for_every_column_and_candle():
+    candles_by_symbol = {
+        'BTC/USDT': make_candles(200, seed=7),
+        'ETH/USDT': make_candles(200, seed=8, price=2000.0),
+        # Historique plus court: complété à gauche par des NaN
+        'NEW/USDT': make_candles(90, seed=9, price=0.5),
+    }
+    batch = calculate_indicators_batch(candles_by_symbol)
+
+    for symbol, candles in candles_by_symbol.items():
+        expected = reference(candles)
+        i = batch.index[symbol]
+        for column in COLUMNS:
+            values = batch.columns[column][i, -len(candles):]
+            np.testing.assert_allclose(
+                values, expected[column].to_numpy(dtype=float), rtol=RTOL, atol=ATOL, equal_nan=True,
+                err_msg=f"{symbol} {column}"
+            )
+
+        last, prev = batch.rows(symbol)
+        assert_row_matches(last, expected.iloc[-1], f"{symbol} dernière bougie")
+        assert_row_matches(prev, expected.iloc[-2], f"{symbol} avant-dernière bougie")
+
+
+# Écart toléré avec ta sur le même buffer glissant (voir StreamingIndicators.rows), en fraction
+# du prix de clôture (en points pour le RSI); les autres colonnes sont comparées à RTOL près
+SLIDING_TOLERANCES = {
+    'EMA_50': 1e-4, 'MACD': 1e-6, 'MACD_Signal': 1e-6, 'MACD_Hist': 1e-6, 'ATR': 1e-6, 'RSI': 1e-3
+}
+
+
+def test_streaming_rows_on_sliding_buffer_stay_close_to_ta_on_same_window():
+    candles = make_candles(700, seed=5)
+    limit = 200
+    streaming = StreamingIndicators()
+
+    # Ring buffer de `limit` bougies qui glisse d'une bougie par scan, bien au-delà de `limit`
+    for end in range(limit, len(candles) + 1, 7):
+        window = candles[end - limit:end]
+        last, _ = streaming.rows('BTC/USDT', '15m', window)
+        expected = reference(window).iloc[-1]
+        for column in COLUMNS:
+            if column in SLIDING_TOLERANCES:
+                scale = 1 if column == 'RSI' else expected['close']
+                assert abs(last[column] - expected[column]) <= SLIDING_TOLERANCES[column] * scale, f"{column} ({end})"
+            else:
+                np.testing.assert_allclose(last[column], expected[column], rtol=RTOL, atol=ATOL, err_msg=f"{column} ({end})")
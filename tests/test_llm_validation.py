@@ -0,0 +1,183 @@
+"""
+Validation LLM contre un serveur Mistral local (stub HTTP)
+
+Le client est créé par create_client, comme dans l'agent, avec MISTRAL_SERVER_URL
+pointant vers le stub.
+Le stub répond selon le symbole présent dans le prompt: réponse lente, JSON
+invalide ou verdict normal.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("mistralai")
+
+import llm_validation
+
+SLOW_SYMBOL = "SLOW/USDT"
+MALFORMED_SYMBOL = "BAD/USDT"
+
+
+class StubMistral(BaseHTTPRequestHandler):
+    """Répond à /v1/chat/completions comme l'API Mistral"""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['messages'][0]['content']
+        symbols = re.findall(r"CRYPTOMONNAIE: (\S+)", prompt)
+
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            if SLOW_SYMBOL in symbols:
+                time.sleep(server.slow_delay)
+            content = server.batch_content if len(symbols) > 1 else self.single_content(symbols[0])
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+        payload = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "model": body['model'],
+            "created": 0,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client parti après son échéance
+            pass
+
+    @staticmethod
+    def single_content(symbol):
+        if symbol == MALFORMED_SYMBOL:
+            return "Signal intéressant {valid: oui, confiance élevée"
+        return f'Voici mon avis: {{"valid": true, "confidence_adjusted": 80, "analysis": "ok {symbol}", "recommendation": "BUY"}}'
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubMistral)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.delay = 0
+    server.slow_delay = 3
+    server.batch_content = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub_server):
+    host, port = stub_server.server_address
+    config = SimpleNamespace(MISTRAL_API_KEY="test", MISTRAL_SERVER_URL=f"http://{host}:{port}")
+    return llm_validation.create_client(config)
+
+
+def make_item(symbol):
+    analysis = {
+        'symbol': symbol, 'price': 100.0, 'trend': 'HAUSSIER', 'rsi': 55.0,
+        'macd': 0.5, 'macd_signal': 0.4, 'ma_21': 99.0, 'ma_50': 98.0,
+        'ema_12': 99.5, 'ema_50': 98.5, 'bb_low': 95.0, 'bb_high': 105.0,
+        'volume': 1000.0, 'volume_ma': 900.0, 'signals': ['RSI neutre']
+    }
+    signal = {'type': 'LONG', 'entry': 100.0, 'tp': 104.0, 'sl': 98.0, 'risk_reward': 2.0, 'confidence': 75}
+    return analysis, signal
+
+
+def test_validate_all_async_results_in_order(client):
+    items = [make_item(symbol) for symbol in ("BTC/USDT", "ETH/USDT", "SOL/USDT")]
+    results = asyncio.run(llm_validation.validate_all_async(client, items, timeout=10))
+
+    assert [r['analysis'] for r in results] == ["ok BTC/USDT", "ok ETH/USDT", "ok SOL/USDT"]
+    assert all(r['valid'] and 'error' not in r for r in results)
+
+
+def test_validate_all_async_bounds_concurrency(client, stub_server):
+    stub_server.delay = 0.2
+    items = [make_item(f"C{i}/USDT") for i in range(8)]
+    results = asyncio.run(llm_validation.validate_all_async(client, items, timeout=10, concurrency=2))
+
+    assert len(results) == 8
+    assert stub_server.requests == 8
+    assert stub_server.max_in_flight == 2
+
+
+def test_validate_all_async_timeout_rejects_only_slow_call(client):
+    items = [make_item("BTC/USDT"), make_item(SLOW_SYMBOL)]
+    started = time.monotonic()
+    fast, slow = asyncio.run(llm_validation.validate_all_async(client, items, timeout=0.5))
+
+    assert time.monotonic() - started < 2
+    assert fast['valid'] is True
+    assert slow['valid'] is False and slow['error'] is True
+    assert "Délai" in slow['analysis']
+
+
+def test_validate_all_async_malformed_json(client):
+    good, bad = asyncio.run(llm_validation.validate_all_async(
+        client, [make_item("BTC/USDT"), make_item(MALFORMED_SYMBOL)], timeout=10
+    ))
+
+    assert good['valid'] is True
+    assert bad == llm_validation.error_result("Erreur de parsing de la réponse LLM")
+
+
+def test_validate_batch_async_maps_verdicts_by_symbol(client, stub_server):
+    stub_server.batch_content = """```json
+{"verdicts": [
+  {"symbol": "ETH/USDT", "valid": false, "confidence_adjusted": 40, "analysis": "faible", "recommendation": "HOLD"},
+  {"symbol": "BTC/USDT", "valid": true, "confidence_adjusted": 85, "analysis": "solide", "recommendation": "BUY"}
+]}
+```"""
+    items = [make_item(symbol) for symbol in ("BTC/USDT", "ETH/USDT", "SOL/USDT")]
+    btc, eth, sol = asyncio.run(llm_validation.validate_batch_async(client, items, timeout=10))
+
+    assert stub_server.requests == 1
+    assert btc == {"valid": True, "confidence_adjusted": 85, "analysis": "solide", "recommendation": "BUY"}
+    assert eth['valid'] is False and 'error' not in eth
+    # Symbole absent de la réponse: rejet non mis en cache
+    assert sol['valid'] is False and sol['error'] is True
+
+
+def test_validate_batch_async_malformed_json(client, stub_server):
+    stub_server.batch_content = '{"verdicts": [{"symbol": "BTC/USDT", "valid": tru'
+    items = [make_item("BTC/USDT"), make_item("ETH/USDT")]
+    results = asyncio.run(llm_validation.validate_batch_async(client, items, timeout=10))
+
+    assert all(r['valid'] is False and r['error'] is True for r in results)
+
+
+def test_validate_batch_async_timeout(client, stub_server):
+    stub_server.batch_content = '{"verdicts": []}'
+    items = [make_item("BTC/USDT"), make_item(SLOW_SYMBOL)]
+    results = asyncio.run(llm_validation.validate_batch_async(client, items, timeout=0.5))
+
+    assert [r['error'] for r in results] == [True, True]
+    assert all("Délai" in r['analysis'] for r in results)
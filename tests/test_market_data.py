@@ -0,0 +1,76 @@
+"""
+Cache incrémental des bougies (CandleCache) contre un exchange simulé
+"""
+
+import asyncio
+
+from market_data import CandleCache
+
+STEP = 60_000  # Bougies 1m
+
+
+class FakeExchange:
+    """Exchange ccxt.async_support simulé: une bougie par minute jusqu'à `now` (en minutes)"""
+
+    def __init__(self, now, page_size=None):
+        self.now = now
+        self.page_size = page_size  # Taille maximale d'une page côté exchange
+        self.calls = []
+
+    def parse_timeframe(self, timeframe):
+        return STEP // 1000
+
+    def milliseconds(self):
+        # Au milieu de la bougie en cours
+        return self.now * STEP + STEP // 2
+
+    async def fetch_ohlcv(self, symbol, timeframe=None, since=None, limit=None):
+        self.calls.append(since)
+        size = min(limit, self.page_size or limit)
+        first = since // STEP if since is not None else self.now - size + 1
+        last = min(self.now, first + size - 1)
+        return [[minute * STEP, minute, minute + 1, minute - 1, minute + 0.5, 10] for minute in range(first, last + 1)]
+
+
+def fetch(cache, exchange):
+    result = asyncio.run(cache.get_all_candles_async(exchange, ['BTC/USDT'], '1m'))
+    return result['BTC/USDT']
+
+
+def test_incremental_fetch_appends_new_candles():
+    exchange = FakeExchange(now=1000)
+    cache = CandleCache(exchange, limit=200)
+    candles = fetch(cache, exchange)
+    assert [c[0] // STEP for c in (candles[0], candles[-1])] == [801, 1000]
+
+    exchange.now = 1003
+    candles = fetch(cache, exchange)
+    assert exchange.calls[-1] == 1000 * STEP
+    assert len(exchange.calls) == 2
+    assert len(candles) == 200
+    assert [c[0] // STEP for c in (candles[0], candles[-1])] == [804, 1003]
+
+
+def test_full_page_after_long_break_refetches():
+    exchange = FakeExchange(now=1000)
+    cache = CandleCache(exchange, limit=200)
+    fetch(cache, exchange)
+
+    # 500 minutes sans mise à jour: la page incrémentale (1000..1199) s'arrête avant le présent
+    exchange.now = 1500
+    candles = fetch(cache, exchange)
+    assert exchange.calls[-2:] == [1000 * STEP, None]
+    assert candles[-1][0] == 1500 * STEP
+    assert len(candles) == 200
+    assert all(b[0] - a[0] == STEP for a, b in zip(candles, candles[1:]))
+
+
+def test_short_page_behind_present_refetches():
+    # Exchange aux pages plus courtes que `limit`: page incomplète mais en retard
+    exchange = FakeExchange(now=1000, page_size=100)
+    cache = CandleCache(exchange, limit=200)
+    fetch(cache, exchange)
+    exchange.now = 1150
+    candles = fetch(cache, exchange)
+    assert exchange.calls[-1] is None
+    assert candles[-1][0] == 1150 * STEP
@@ -0,0 +1,162 @@
+"""
+Paper trading: sorties intra-bougie (TP/SL/trailing), mise à jour des positions et journal
+"""
+
+import json
+import time
+
+import pytest
+
+from paper_trading import find_intrabar_exit
+
+MINUTE = 60_000
+
+
+def position(kind='LONG', entry=100.0, sl=95.0, tp=110.0, **fields):
+    return {'type': kind, 'entry_price': entry, 'sl': sl, 'tp': tp, **fields}
+
+
+def candle(minute, open_, high, low, close):
+    return [minute * MINUTE, open_, high, low, close, 1.0]
+
+
+def open_long(manager, symbol='BTC/USDT', entry=100.0, sl=95.0, tp=110.0):
+    signal = {'type': 'LONG', 'entry': entry, 'tp': tp, 'sl': sl, 'confidence': 80, 'risk_reward': 2.0}
+    opened, _ = manager.open_position(signal, {'symbol': symbol})
+    return opened
+
+
+def test_sl_hit_inside_candle():
+    candles = [candle(0, 100, 102, 99, 101), candle(1, 101, 103, 94, 100), candle(2, 100, 101, 90, 91)]
+    index, exit_price, reason, _ = find_intrabar_exit(position(), candles)
+    assert (index, exit_price, reason) == (1, 95.0, 'SL_HIT')
+
+    # Ouverture sous le stop: exécution au prix d'ouverture
+    index, exit_price, reason, _ = find_intrabar_exit(position(), [candle(0, 93, 96, 92, 95)])
+    assert (index, exit_price, reason) == (0, 93.0, 'SL_HIT')
+
+    # Stop au-delà du prix de liquidation: liquidation
+    index, exit_price, reason, _ = find_intrabar_exit(position(liquidation_price=84.0), [candle(0, 80, 81, 79, 80)])
+    assert (index, exit_price, reason) == (0, 84.0, 'LIQUIDATED')
+
+
+def test_tp_and_sl_in_same_candle():
+    # Ordre inconnu dans la bougie: le SL est retenu
+    index, exit_price, reason, _ = find_intrabar_exit(position(), [candle(0, 100, 111, 94, 105)])
+    assert (index, exit_price, reason) == (0, 95.0, 'SL_HIT')
+
+    # Bougie ouverte au-delà du TP: TP au prix d'ouverture
+    index, exit_price, reason, _ = find_intrabar_exit(position(), [candle(0, 112, 113, 94, 100)])
+    assert (index, exit_price, reason) == (0, 112.0, 'TP_HIT')
+
+    # SHORT: TP touché seul
+    index, exit_price, reason, _ = find_intrabar_exit(position('SHORT', sl=105.0, tp=90.0), [candle(0, 99, 100, 89, 95)])
+    assert (index, exit_price, reason) == (0, 90.0, 'TP_HIT')
+
+
+def test_trailing_stop_uses_previous_extremes():
+    candles = [candle(0, 100, 105, 103, 104), candle(1, 104, 104.5, 102.5, 103)]
+    index, exit_price, reason, extreme = find_intrabar_exit(position(), candles, trailing_stop_percent=0.02)
+    # Le stop de la 2e bougie suit le plus haut de la 1re (105 x 0.98)
+    assert (index, reason, extreme) == (1, 'SL_HIT', 105.0)
+    assert exit_price == pytest.approx(102.9)
+
+    # Le plus haut de la bougie qui touche le stop ne le remonte pas dans cette bougie
+    index, _, reason, _ = find_intrabar_exit(position(), [candle(0, 100, 110, 99, 100)], trailing_stop_percent=0.02)
+    assert (index, reason) == (0, 'TP_HIT')
+
+
+def test_update_all_moves_trailing_stop_and_marks_to_market(make_manager):
+    manager = make_manager(PAPER_TRADING_TRAILING_STOP=True, PAPER_TRADING_TRAILING_STOP_PERCENT=2.0)
+    opened = open_long(manager)
+    start = int(time.time() * 1000) // MINUTE + 1
+
+    closed = manager.update_all(candles={'BTC/USDT': [candle(start, 100, 105, 100, 104), candle(start + 1, 104, 104.5, 103.5, 104)]})
+    assert closed == []
+    assert opened['highest_price'] == 105
+    assert opened['sl'] == pytest.approx(102.9)
+    assert opened['last_candle_ts'] == (start + 1) * MINUTE
+    assert opened['current_price'] == 104
+    assert opened['pnl_usdt'] == pytest.approx(4 * opened['size_crypto'])
+
+    closed = manager.update_all(candles={'BTC/USDT': [candle(start + 1, 104, 104.5, 102, 102.5)]})
+    assert closed == [opened]
+    assert opened['close_reason'] == 'SL_HIT'
+    assert opened['exit_price'] == pytest.approx(102.9)
+
+
+def test_update_all_falls_back_to_price_without_recent_candles(make_manager):
+    manager = make_manager()
+    opened = open_long(manager)
+    # Bougies toutes antérieures à l'ouverture (buffer en retard)
+    stale = [candle(int(time.time() * 1000) // MINUTE - 60 + i, 100, 101, 99, 100) for i in range(3)]
+
+    assert manager.update_all(prices={'BTC/USDT': 103.0}, candles={'BTC/USDT': stale}) == []
+    assert opened['current_price'] == 103.0
+    assert opened['pnl_usdt'] == pytest.approx(3 * opened['size_crypto'])
+
+    closed = manager.update_all(prices={'BTC/USDT': 94.0}, candles={'BTC/USDT': stale})
+    assert closed == [opened]
+    assert (opened['close_reason'], opened['exit_price']) == ('SL_HIT', 94.0)
+
+
+def state(manager):
+    return manager.balance, manager.open_positions, [dict(p) for p in manager.closed_positions], manager.journal_seq
+
+
+def test_journal_replayed_on_top_of_snapshot(make_manager):
+    manager = make_manager(PAPER_TRADING_SNAPSHOT_EVERY=100)
+    btc = open_long(manager)
+    manager.save_state()
+    eth = open_long(manager, 'ETH/USDT', entry=10.0, sl=9.0, tp=12.0)
+    manager.update_all(prices={'BTC/USDT': 104.0, 'ETH/USDT': 10.5})
+    assert manager.update_all(prices={'ETH/USDT': 12.5}) == [eth]
+    assert [r['op'] for r in manager.journal.read()] == ['open', 'update', 'update', 'close']
+
+    reloaded = make_manager(PAPER_TRADING_SNAPSHOT_EVERY=100)
+    assert state(reloaded) == state(manager)
+    assert reloaded.open_positions[0]['current_price'] == 104.0
+    assert reloaded.aggregates.total_trades == 1
+    assert reloaded.has_open_position('BTC/USDT') and not reloaded.has_open_position('ETH/USDT')
+    assert btc['id'] == reloaded.open_positions[0]['id']
+
+
+def test_truncated_journal_line_is_ignored(make_manager):
+    manager = make_manager(PAPER_TRADING_SNAPSHOT_EVERY=100)
+    open_long(manager)
+    manager.update_all(prices={'BTC/USDT': 103.0})
+    # Arrêt brutal pendant l'écriture de l'enregistrement suivant
+    with open(manager.journal.path, 'a') as f:
+        f.write('{"seq":3,"op":"close","position":{"symb')
+
+    reloaded = make_manager(PAPER_TRADING_SNAPSHOT_EVERY=100)
+    assert state(reloaded) == state(manager)
+
+    # L'enregistrement suivant ne se colle pas à la ligne incomplète
+    sol = open_long(reloaded, 'SOL/USDT', entry=20.0, sl=19.0, tp=22.0)
+    again = make_manager(PAPER_TRADING_SNAPSHOT_EVERY=100)
+    assert state(again) == state(reloaded)
+    assert again.get_open_position_by_symbol('SOL/USDT')['id'] == sol['id']
+
+
+def test_snapshot_compacts_journal(make_manager):
+    manager = make_manager(PAPER_TRADING_SNAPSHOT_EVERY=3)
+    eth = open_long(manager, 'ETH/USDT', entry=10.0, sl=9.0, tp=12.0)
+    open_long(manager)
+    with open(manager.journal.path) as f:
+        stale = f.read()
+    assert manager.update_all(prices={'ETH/USDT': 12.5}) == [eth]
+
+    # 3e événement: instantané complet et journal vidé
+    assert manager.journal.read() == []
+    assert manager.events_since_snapshot == 0
+    with open(manager.track_file) as f:
+        assert json.load(f)['journal_seq'] == 3
+    assert state(make_manager(PAPER_TRADING_SNAPSHOT_EVERY=3)) == state(manager)
+
+    # Arrêt entre l'instantané et la remise à zéro du journal: ses enregistrements sont déjà inclus
+    with open(manager.journal.path, 'w') as f:
+        f.write(stale)
+    reloaded = make_manager(PAPER_TRADING_SNAPSHOT_EVERY=3)
+    assert state(reloaded) == state(manager)
+    assert reloaded.events_since_snapshot == 0
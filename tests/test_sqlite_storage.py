@@ -0,0 +1,91 @@
+"""
+Stockage SQLite: migration de l'historique JSON, vue des trades fermés et derniers trades
+"""
+
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from sqlite_storage import ClosedTradesView, SQLiteStorage
+
+PARIS = ZoneInfo("Europe/Paris")
+
+
+def make_trades(count, first_closed_at):
+    return [{
+        'id': f"T{i}",
+        'symbol': ['BTC/USDT', 'ETH/USDT'][i % 2],
+        'type': 'LONG',
+        'opened_at': (first_closed_at + timedelta(hours=i - 1)).isoformat(),
+        'closed_at': (first_closed_at + timedelta(hours=i)).isoformat(),
+        'pnl_usdt': float(i % 5 - 2),
+        'duration_hours': 1.0,
+        'close_reason': 'TP_HIT',
+        'status': 'closed'
+    } for i in range(count)]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / 'trades.db'))
+    storage.save_state(1000, 1000, [], make_trades(10, datetime(2026, 1, 1, tzinfo=PARIS)))
+    yield storage
+    storage.close()
+
+
+def test_migration_imports_archive_and_snapshot(make_manager, tmp_path):
+    # 30 trades dont les 20 premiers, vieux de plus de 30 jours, partent dans l'archive
+    trades = make_trades(30, datetime.now(PARIS) - timedelta(days=40))
+    for trade in trades[20:]:
+        trade['closed_at'] = (datetime.fromisoformat(trade['closed_at']) + timedelta(days=30)).isoformat()
+    with open(tmp_path / 'history.json', 'w') as f:
+        json.dump({'balance': 1234.5, 'initial_balance': 1000, 'open_positions': [], 'closed_positions': trades}, f)
+
+    manager = make_manager(PAPER_TRADING_ARCHIVE_AFTER_DAYS=30)
+    manager.save_state()
+    assert (manager.archive.count, len(manager.closed_positions)) == (20, 10)
+    # Position ouverte après l'instantané: seulement dans le journal
+    opened, _ = manager.open_position(
+        {'type': 'LONG', 'entry': 100.0, 'tp': 110.0, 'sl': 95.0, 'confidence': 80, 'risk_reward': 2.0},
+        {'symbol': 'SOL/USDT'}
+    )
+
+    migrated = make_manager(PAPER_TRADING_STORAGE='sqlite')
+    assert [t['id'] for t in migrated.closed_positions] == [t['id'] for t in trades]
+    assert migrated.balance == manager.balance
+    assert migrated.open_positions == [opened]
+    assert migrated.aggregates.total_trades == 30
+    assert migrated.get_statistics()['total_pnl'] == pytest.approx(sum(t['pnl_usdt'] for t in trades))
+    migrated.storage.close()
+
+    # Base non vide: pas de nouvelle migration
+    again = make_manager(PAPER_TRADING_STORAGE='sqlite')
+    assert again.storage.count_trades() == 30
+    assert again.open_positions == [opened]
+    again.storage.close()
+
+
+def test_closed_trades_view(storage):
+    view = ClosedTradesView(storage)
+    ids = [f"T{i}" for i in range(10)]
+
+    assert len(view) == 10 and view
+    assert [t['id'] for t in view] == ids
+    assert view[0]['id'] == 'T0' and view[-1]['id'] == 'T9'
+    with pytest.raises(IndexError):
+        view[10]
+    with pytest.raises(IndexError):
+        view[-11]
+    for index in (slice(2, 5), slice(-3, None), slice(None, -8), slice(8, 2), slice(1, 9, 3), slice(None, None, -4)):
+        assert [t['id'] for t in view[index]] == ids[index]
+
+    storage.save_state(1000, 1000, [], [])
+    assert len(view) == 0 and not view and view[:5] == []
+
+
+def test_recent_trades(storage):
+    assert [t['id'] for t in storage.recent_trades(3)] == ['T7', 'T8', 'T9']
+    assert [t['id'] for t in storage.recent_trades(50)] == [f"T{i}" for i in range(10)]
+    assert storage.recent_trades(0) == []
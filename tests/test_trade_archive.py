@@ -0,0 +1,95 @@
+"""
+Archivage des trades anciens: rotation des segments et reprise après un arrêt brutal
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+PARIS = ZoneInfo("Europe/Paris")
+NOW = datetime(2026, 6, 15, 12, tzinfo=PARIS)
+
+
+def make_trades(closed_at):
+    return [{
+        'id': f"T{i}",
+        'symbol': ['BTC/USDT', 'ETH/USDT', 'SOL/USDT'][i % 3],
+        'type': 'LONG',
+        'opened_at': (closed - timedelta(hours=2)).isoformat(),
+        'closed_at': closed.isoformat(),
+        'pnl_usdt': float(i % 4 - 1),
+        'duration_hours': 2.0,
+        'close_reason': 'TP_HIT',
+        'status': 'closed'
+    } for i, closed in enumerate(closed_at)]
+
+
+@pytest.fixture
+def history(make_manager, tmp_path, monkeypatch):
+    """Historique JSON d'un trade par jour sur 120 jours, lu à la date NOW"""
+    trades = make_trades([NOW - timedelta(days=120 - i) for i in range(120)])
+    with open(tmp_path / 'history.json', 'w') as f:
+        json.dump({'balance': 1000, 'initial_balance': 1000, 'open_positions': [], 'closed_positions': trades}, f)
+
+    def load(now=NOW):
+        manager = make_manager(PAPER_TRADING_ARCHIVE_AFTER_DAYS=30)
+        monkeypatch.setattr(manager, 'now', lambda: now)
+        return manager
+
+    return trades, load
+
+
+def ids(trades):
+    return [t['id'] for t in trades]
+
+
+def test_archive_rotation(history):
+    trades, load = history
+    manager = load()
+    statistics = manager.get_statistics()
+    manager.save_state()
+
+    archive = manager.archive
+    cutoff = NOW - timedelta(days=30)
+    archived = [t for t in trades if datetime.fromisoformat(t['closed_at']) < cutoff]
+    assert ids(archive.iter_trades()) == ids(archived)
+    assert ids(manager.closed_positions) == ids(trades[len(archived):])
+    assert sorted(archive.index['segments']) == sorted({t['closed_at'][:7] for t in archived})
+    assert archive.index['archived_through'] == archived[-1]['closed_at']
+    # Statistiques inchangées: les trades archivés sont résumés par l'index
+    assert manager.get_statistics() == statistics
+    assert manager.symbol_statistics() == load().symbol_statistics()
+
+    # Dix jours plus tard: le segment du mois en cours est réécrit dans une nouvelle génération
+    later = load(NOW + timedelta(days=10))
+    previous = dict(later.archive.index['segments'])
+    later.save_state()
+    segments = later.archive.index['segments']
+    assert later.archive.index['generation'] == 2
+    assert ids(later.archive.iter_trades()) == ids(trades[:len(archived) + 10])
+    assert ids(later.closed_positions) == ids(trades[len(archived) + 10:])
+    rewritten = [month for month in previous if segments[month] != previous[month]]
+    assert rewritten == [archived[-1]['closed_at'][:7]]
+    assert not os.path.exists(os.path.join(later.archive.directory, previous[rewritten[0]]['file']))
+    assert sorted(os.listdir(later.archive.directory)) == sorted(['index.json', *(s['file'] for s in segments.values())])
+    assert later.get_statistics() == statistics
+    assert ids(later.iter_closed_positions()) == ids(trades)
+
+
+def test_load_skips_trades_archived_before_crash(history):
+    trades, load = history
+    manager = load()
+    statistics = manager.get_statistics()
+    # Arrêt brutal entre l'écriture de l'archive et celle de l'instantané
+    manager.archive_old_trades()
+    with open(manager.track_file) as f:
+        assert len(json.load(f)['closed_positions']) == len(trades)
+
+    reloaded = load()
+    assert ids(reloaded.closed_positions) == ids(manager.closed_positions)
+    assert reloaded.aggregates.total_trades == len(trades)
+    assert reloaded.get_statistics() == statistics
+    assert ids(reloaded.iter_closed_positions()) == ids(trades)
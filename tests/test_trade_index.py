@@ -0,0 +1,161 @@
+"""
+Pagination de l'historique (TradeIndex) comparée à un tri/filtrage complet
+"""
+
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from paper_trading import JsonTradeSource
+from trade_archive import TradeArchive
+from trade_index import TradeIndex
+
+PARIS = ZoneInfo("Europe/Paris")
+START = datetime(2026, 1, 1, tzinfo=PARIS)
+
+
+def make_trades(count, seed=1, first=0):
+    rng = random.Random(seed)
+    return [{
+        'id': f"T{i}",
+        'symbol': rng.choice(['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT']),
+        'type': rng.choice(['LONG', 'SHORT']),
+        'close_reason': rng.choice(['TP_HIT', 'SL_HIT', 'LIQUIDATED']),
+        'opened_at': (START + timedelta(hours=5 * i - 1)).isoformat(),
+        'closed_at': (START + timedelta(hours=5 * i)).isoformat(),
+        # Beaucoup d'égalités de P&L pour vérifier le départage par rang
+        'pnl_usdt': rng.choice([-5.0, -1.5, 0.0, 2.0, 7.25]) if i % 3 else round(rng.uniform(-10, 10), 2),
+        'status': 'closed'
+    } for i in range(first, first + count)]
+
+
+def expected(trades, filters, since, until, sort):
+    matching = [
+        (rank, t) for rank, t in enumerate(trades)
+        if all(t[name] == value for name, value in filters.items())
+        and (since is None or datetime.fromisoformat(t['closed_at']) >= since)
+        and (until is None or datetime.fromisoformat(t['closed_at']) <= until)
+    ]
+    if sort.lstrip('-') == 'pnl_usdt':
+        matching.sort(key=lambda item: (item[1]['pnl_usdt'], item[0]))
+    if sort.startswith('-'):
+        matching.reverse()
+    return [t['id'] for _, t in matching]
+
+
+class History:
+    """Historique minimal (interface utilisée par TradeIndex.sync): trades récents, archive éventuelle"""
+
+    def __init__(self, hot, archive=None):
+        self.archive = archive if archive is not None else SimpleNamespace(count=0)
+        self.closed_positions = hot
+        self.aggregates = SimpleNamespace(total_trades=self.archive.count + len(hot))
+
+    def trade_source(self):
+        return JsonTradeSource(self.archive, self.closed_positions)
+
+
+def indexed(trades):
+    index = TradeIndex()
+    index.sync(History(trades))
+    return index
+
+
+def all_pages(index, limit, **query):
+    ids, cursor = [], None
+    while True:
+        trades, cursor = index.query(cursor=cursor, limit=limit, **query)
+        assert len(trades) <= limit
+        ids += [t['id'] for t in trades]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("sort", ['closed_at', '-closed_at', 'pnl_usdt', '-pnl_usdt'])
+@pytest.mark.parametrize("filters", [
+    {},
+    {'symbol': 'ETH/USDT'},
+    {'type': 'SHORT', 'close_reason': 'LIQUIDATED'},
+    {'symbol': 'BTC/USDT', 'type': 'LONG', 'close_reason': 'TP_HIT'},
+    {'symbol': 'DOGE/USDT'},
+])
+@pytest.mark.parametrize("dates", [(None, None), (10, None), (None, 200), (50, 120)])
+def test_pages_match_full_sort(sort, filters, dates):
+    trades = make_trades(400)
+    index = indexed(trades)
+    since, until = (None if d is None else START + timedelta(hours=5 * d) for d in dates)
+
+    assert all_pages(index, 7, filters=filters, since=since, until=until, sort=sort) == \
+        expected(trades, filters, since, until, sort)
+
+
+def test_extend_keeps_pnl_order_up_to_date():
+    trades = make_trades(100)
+    index = indexed(trades[:60])
+    first_page, _ = index.query(sort='-pnl_usdt', limit=5)
+    index.sync(History(trades))
+
+    assert all_pages(index, 9, sort='pnl_usdt') == expected(trades, {}, None, None, 'pnl_usdt')
+    assert len(first_page) == 5
+
+
+def test_query_errors():
+    index = indexed(make_trades(50))
+    with pytest.raises(ValueError):
+        index.query(sort='size_usdt')
+    with pytest.raises(ValueError):
+        index.query(filters={'leverage': 5})
+
+
+def test_sync_skips_archived_segments(tmp_path, monkeypatch):
+    trades = make_trades(500)
+    archive = TradeArchive(str(tmp_path))
+    archive.archive(trades[:450], 1000)
+    months = sorted(archive.index['segments'])
+    assert len(months) >= 3
+    for start in (0, 1, 200, 449, 450):
+        assert [t['id'] for t in archive.iter_trades_from(start)] == [t['id'] for t in trades[start:450]]
+
+    read = []
+    original = archive._read_lines
+    monkeypatch.setattr(archive, '_read_lines', lambda name: read.append(name) or original(name))
+
+    index = TradeIndex()
+    index.sync(History(trades[450:480], archive))
+    assert [t['id'] for t in index.iter_trades()] == [t['id'] for t in trades[:480]]
+
+    # Rechargement sans nouveau trade: l'archive n'est pas relue
+    read.clear()
+    index.sync(History(trades[450:480], archive))
+    assert read == []
+
+    # Nouveaux trades: seuls le segment du dernier trade indexé et les suivants sont relus
+    index = TradeIndex()
+    index.extend((rank, trade) for rank, trade in enumerate(trades[:300]))
+    index.sync(History(trades[450:], archive))
+    assert len(index) == 500
+    last_month = trades[299]['closed_at'][:7]
+    assert last_month > months[0]
+    assert set(read) <= {archive.index['segments'][month]['file'] for month in months if month >= last_month}
+
+    # Les pages sont relues à la demande dans les segments et les trades récents
+    page, _ = index.query(sort='closed_at', cursor='440', limit=20)
+    assert [t['id'] for t in page] == [t['id'] for t in trades[441:461]]
+    # Historique réécrit (ex: réinitialisation puis nouveaux trades): reconstruction complète
+    rewritten = [{**t, 'id': f"R{i}"} for i, t in enumerate(make_trades(510, seed=2))]
+    index.sync(History(rewritten))
+    assert [t['id'] for t in index.iter_trades()] == [t['id'] for t in rewritten]
+
+
+def test_iter_trades_by_date():
+    trades = make_trades(200)
+    index = indexed(trades)
+    assert [t['id'] for t in index.iter_trades()] == [t['id'] for t in trades]
+    since, until = START + timedelta(hours=5 * 40), START + timedelta(hours=5 * 90 + 1)
+    exported = index.iter_trades(since, until)
+    # Le parcours porte sur l'état au moment de l'appel
+    index.clear()
+    assert [t['id'] for t in exported] == [t['id'] for t in trades[40:91]]
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Archive froide des trades fermés anciens
+
+Les trades plus vieux que PAPER_TRADING_ARCHIVE_AFTER_DAYS quittent l'historique
+chargé au démarrage pour des segments mensuels compressés (JSON lines + gzip).
+Un petit index conserve la liste des segments et les agrégats des trades
+archivés: les statistiques couvrent tout l'historique sans relire les segments,
+qui ne sont parcourus qu'à la demande (export CSV, requêtes historiques). Les
+quelques derniers segments lus par rang (pages de l'historique web) restent en
+mémoire, décompressés mais non décodés.
+
+Chaque archivage écrit une nouvelle génération des segments modifiés puis
+remplace l'index de façon atomique: un arrêt brutal laisse au pire des
+fichiers orphelins, ignorés et réécrits à l'archivage suivant.
+"""
+
+import gzip
+import json
+import os
+import threading
+from bisect import bisect_right
+from datetime import datetime
+from itertools import islice
+from cache import LRUCache
+from persistence import atomic_write_json
+from trade_records import TradeAggregates
+
+# Segments décompressés gardés en mémoire pour la lecture par rang (les noms changent à chaque génération)
+SEGMENT_CACHE_SIZE = 4
+_segment_cache = LRUCache(SEGMENT_CACHE_SIZE)
+_segment_cache_lock = threading.Lock()
+
+
+def empty_index():
+    return {
+        'generation': 0,
+        'segments': {},  # {mois: {'file', 'count', 'first_closed_at', 'last_closed_at'}}
+        'archived_through': None,  # closed_at du dernier trade archivé
+        'aggregates': None,
+        'symbols': {}  # {symbole: {'trades', 'wins', 'pnl'}}
+    }
+
+
+class TradeArchive:
+    """Segments compressés par mois et index des trades archivés"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.index = self.load_index()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return empty_index()
+
+    @property
+    def count(self):
+        return sum(segment['count'] for segment in self.index['segments'].values())
+
+    def is_archived(self, trade):
+        """Vrai si le trade est déjà dans l'archive (fermé avant ou avec le dernier trade archivé)"""
+        archived_through = self.index['archived_through']
+        if archived_through is None:
+            return False
+        return datetime.fromisoformat(trade['closed_at']) <= datetime.fromisoformat(archived_through)
+
+    def aggregates(self, initial_balance):
+        """Agrégats des trades archivés (point de départ des statistiques)"""
+        if self.index['aggregates'] is None:
+            return TradeAggregates(initial_balance)
+        return TradeAggregates.from_state(self.index['aggregates'])
+
+    def symbol_statistics(self):
+        return {symbol: dict(stats) for symbol, stats in self.index['symbols'].items()}
+
+    def archive(self, trades, initial_balance):
+        """Ajoute des trades (dans l'ordre de fermeture) à l'archive"""
+        if not trades:
+            return
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        aggregates = self.aggregates(initial_balance)
+        symbols = self.symbol_statistics()
+        by_month = {}
+        for trade in trades:
+            trade = dict(trade)
+            by_month.setdefault(trade['closed_at'][:7], []).append(trade)
+            aggregates.add(trade['pnl_usdt'], trade.get('duration_hours', 0))
+            stats = symbols.setdefault(trade['symbol'], {'trades': 0, 'wins': 0, 'pnl': 0})
+            stats['trades'] += 1
+            if trade['pnl_usdt'] > 0:
+                stats['wins'] += 1
+            stats['pnl'] += trade['pnl_usdt']
+
+        generation = self.index['generation'] + 1
+        segments = dict(self.index['segments'])
+        obsolete = []
+        for month, new_trades in sorted(by_month.items()):
+            previous = segments.get(month)
+            name = f"trades_{month}.g{generation}.jsonl.gz"
+            with gzip.open(os.path.join(self.directory, name), 'wt') as f:
+                if previous:
+                    for line in self._read_lines(previous['file']):
+                        f.write(line)
+                for trade in new_trades:
+                    f.write(json.dumps(trade, separators=(',', ':')) + '\n')
+
+            segments[month] = {
+                'file': name,
+                'count': (previous['count'] if previous else 0) + len(new_trades),
+                'first_closed_at': previous['first_closed_at'] if previous else new_trades[0]['closed_at'],
+                'last_closed_at': new_trades[-1]['closed_at']
+            }
+            if previous:
+                obsolete.append(previous['file'])
+
+        self.index = {
+            'generation': generation,
+            'segments': segments,
+            'archived_through': trades[-1]['closed_at'],
+            'aggregates': aggregates.state(),
+            'symbols': symbols
+        }
+        atomic_write_json(self.index_path, self.index, indent=2)
+
+        for name in obsolete:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _read_lines(self, name):
+        with gzip.open(os.path.join(self.directory, name), 'rt') as f:
+            yield from f
+
+    def iter_trades(self, since=None, until=None):
+        """Trades archivés dans l'ordre chronologique, lus segment par segment
+
+        since/until (datetime) limitent la lecture aux segments et trades concernés.
+        """
+        for month in sorted(self.index['segments']):
+            segment = self.index['segments'][month]
+            if since is not None and datetime.fromisoformat(segment['last_closed_at']) < since:
+                continue
+            if until is not None and datetime.fromisoformat(segment['first_closed_at']) > until:
+                break
+            for line in self._read_lines(segment['file']):
+                trade = json.loads(line)
+                closed_at = datetime.fromisoformat(trade['closed_at'])
+                if since is not None and closed_at < since:
+                    continue
+                if until is not None and closed_at > until:
+                    break
+                yield trade
+
+    def iter_trades_from(self, start):
+        """Trades archivés à partir du rang `start`; les segments précédents ne sont pas décompressés"""
+        for month in sorted(self.index['segments']):
+            segment = self.index['segments'][month]
+            if start >= segment['count']:
+                start -= segment['count']
+                continue
+            for line in islice(self._read_lines(segment['file']), start, None):
+                yield json.loads(line)
+            start = 0
+
+    def read_ranks(self, ranks):
+        """Trades archivés aux rangs donnés (dans cet ordre); chaque segment concerné est lu une fois"""
+        months = sorted(self.index['segments'])
+        starts, start = [], 0
+        for month in months:
+            starts.append(start)
+            start += self.index['segments'][month]['count']
+
+        wanted = {}  # {segment: [(ligne, position dans le résultat)]}
+        for position, rank in enumerate(ranks):
+            segment = bisect_right(starts, rank) - 1
+            wanted.setdefault(segment, []).append((rank - starts[segment], position))
+
+        trades = [None] * len(ranks)
+        for segment, lines in wanted.items():
+            segment_lines = self._segment_lines(self.index['segments'][months[segment]]['file'])
+            for line, position in lines:
+                trades[position] = json.loads(segment_lines[line])
+        return trades
+
+    def _segment_lines(self, name):
+        path = os.path.join(self.directory, name)
+        with _segment_cache_lock:
+            lines = _segment_cache.get(path)
+        if lines is None:
+            lines = list(self._read_lines(name))
+            with _segment_cache_lock:
+                _segment_cache.put(path, lines)
+        return lines
+
+    def clear(self):
+        """Supprime tous les segments et l'index"""
+        for segment in self.index['segments'].values():
+            try:
+                os.remove(os.path.join(self.directory, segment['file']))
+            except OSError:
+                pass
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        self.index = empty_index()
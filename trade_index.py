@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Index en mémoire des trades fermés pour l'historique paginé de l'interface web
+
+Les trades sont rangés par rang de fermeture (0 = plus ancien, archive comprise).
+L'index ne garde par rang que la date de fermeture, le P&L et l'emplacement du
+trade dans sa source (rang dans l'archive puis les trades récents en JSON, seq
+en SQLite), dans des tableaux compacts: les trades d'une page sont relus à la
+demande (segments d'archive, trades récents ou base SQLite).
+
+Les rangs sont répartis en groupes, un par combinaison (symbole, type, raison de
+fermeture). Chaque groupe garde ses rangs dans l'ordre de fermeture et dans
+l'ordre (pnl, rang), tenus à jour par insertion quand l'historique s'allonge.
+
+Une page fusionne les groupes correspondant aux filtres à partir du curseur
+(positions trouvées par dichotomie): son coût dépend de la taille de la page et
+du nombre de groupes, pas de celle de l'historique. Seule exception: un tri par
+P&L combiné à une plage de dates parcourt aussi les trades des groupes filtrés
+situés hors de la plage.
+"""
+
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+SORTS = ('closed_at', '-closed_at', 'pnl_usdt', '-pnl_usdt')
+FILTERS = ('symbol', 'type', 'close_reason')
+
+# Trades relus par appel à la source lors d'un parcours complet (export)
+READ_CHUNK = 500
+
+
+class TradeIndex:
+    """Rangs des trades fermés indexés par date, P&L et combinaison symbole/type/raison de fermeture"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.source = None  # Source des trades (PaperTradingManager.trade_source())
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.locations = array('q')  # Emplacement de chaque rang dans la source
+            self.closed_at = array('d')  # Timestamps de fermeture (croissants)
+            self.pnl = array('d')
+            # {(symbol, type, close_reason): (rangs croissants, rangs triés par (pnl, rang))}
+            self.groups = {}
+            self.last = None  # trade_key du dernier trade indexé
+
+    def __len__(self):
+        return len(self.locations)
+
+    def extend(self, entries):
+        """Ajoute des trades (emplacement, trade), dans l'ordre de fermeture, à la fin de l'index"""
+        with self.lock:
+            for location, trade in entries:
+                rank = len(self.locations)
+                self.locations.append(location)
+                self.closed_at.append(datetime.fromisoformat(trade['closed_at']).timestamp())
+                self.pnl.append(float(trade['pnl_usdt']))
+                ranks, by_pnl = self.groups.setdefault(
+                    tuple(trade.get(name) for name in FILTERS), (array('q'), array('q'))
+                )
+                ranks.append(rank)
+                insort(by_pnl, rank, key=self._pnl_key)
+                self.last = trade_key(trade)
+
+    def sync(self, pt):
+        """Met l'index à jour depuis un PaperTradingManager (ajout des seuls nouveaux trades)"""
+        source = pt.trade_source()
+        total = pt.aggregates.total_trades
+        with self.lock:
+            indexed = len(self)
+            if indexed:
+                # Historique inchangé jusqu'au dernier trade indexé: simple ajout
+                last = source.read([self.locations[-1]])[0] if total >= indexed else None
+                if last is None or trade_key(last) != self.last:
+                    # Historique réinitialisé ou réécrit
+                    self.clear()
+            self.source = source
+            if total > len(self):
+                self.extend(source.entries(len(self)))
+
+    def query(self, filters=None, since=None, until=None, sort='-closed_at', cursor=None, limit=50):
+        """Une page de trades; retourne (trades, curseur de la page suivante ou None)
+
+        filters: {symbol/type/close_reason: valeur}; since/until: datetime sur closed_at;
+        cursor: valeur next_cursor d'une page précédente (même tri et mêmes filtres).
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Tri inconnu: {sort}")
+        filters = {name: value for name, value in (filters or {}).items() if value is not None}
+        for name in filters:
+            if name not in FILTERS:
+                raise ValueError(f"Filtre inconnu: {name}")
+        descending = sort.startswith('-')
+
+        with self.lock:
+            groups = [
+                group for key, group in self.groups.items()
+                if all(key[FILTERS.index(name)] == value for name, value in filters.items())
+            ]
+            low, high = self._rank_range(since, until)
+
+            if sort.lstrip('-') == 'closed_at':
+                if cursor is not None:
+                    if descending:
+                        high = min(high, int(cursor))
+                    else:
+                        low = max(low, int(cursor) + 1)
+                streams = [walk(ranks, bisect_left(ranks, low), bisect_left(ranks, high), descending) for ranks, _ in groups]
+                ranks = heapq.merge(*streams, reverse=descending)
+            else:
+                if cursor is None:
+                    bounds = [(0, len(by_pnl)) for _, by_pnl in groups]
+                else:
+                    pnl, rank = cursor.split(':')
+                    key = (float(pnl), int(rank))
+                    if descending:
+                        bounds = [(0, bisect_left(by_pnl, key, key=self._pnl_key)) for _, by_pnl in groups]
+                    else:
+                        bounds = [(bisect_right(by_pnl, key, key=self._pnl_key), len(by_pnl)) for _, by_pnl in groups]
+                streams = [walk(by_pnl, start, stop, descending) for (_, by_pnl), (start, stop) in zip(groups, bounds)]
+                merged = heapq.merge(*streams, key=self._pnl_key, reverse=descending)
+                ranks = (rank for rank in merged if low <= rank < high)
+
+            page, next_cursor = [], None
+            for rank in ranks:
+                if len(page) == limit:
+                    next_cursor = self._cursor(sort, page[-1])
+                    break
+                page.append(rank)
+            source, locations = self.source, [self.locations[rank] for rank in page]
+
+        # Lecture des trades de la page hors verrou (décompression éventuelle d'un segment)
+        trades = source.read(locations) if locations else []
+        return trades, next_cursor
+
+    def iter_trades(self, since=None, until=None):
+        """Trades (dict) fermés entre since et until, dans l'ordre de fermeture
+
+        L'index ne fait que s'allonger et clear() remplace ses tableaux: le parcours
+        porte sur l'état au moment de l'appel, sans copie ni verrou pendant la lecture.
+        """
+        with self.lock:
+            source, locations = self.source, self.locations
+            low, high = self._rank_range(since, until)
+        return read_range(source, locations, low, high)
+
+    def _pnl_key(self, rank):
+        return self.pnl[rank], rank
+
+    def _rank_range(self, since, until):
+        """Plage de rangs [low, high) couverte par les dates (closed_at croît avec le rang)"""
+        low = bisect_left(self.closed_at, since.timestamp()) if since is not None else 0
+        high = bisect_right(self.closed_at, until.timestamp()) if until is not None else len(self)
+        return low, high
+
+    def _cursor(self, sort, rank):
+        if sort.lstrip('-') == 'closed_at':
+            return str(rank)
+        return f"{self.pnl[rank]!r}:{rank}"
+
+
+def walk(values, start, stop, descending):
+    """Parcourt values[start:stop] (à l'envers si descending) sans copier le tableau"""
+    positions = range(stop - 1, start - 1, -1) if descending else range(start, stop)
+    for position in positions:
+        yield values[position]
+
+
+def read_range(source, locations, low, high):
+    """Trades des rangs [low, high), relus par paquets de READ_CHUNK"""
+    for start in range(low, high, READ_CHUNK):
+        yield from source.read(locations[start:min(high, start + READ_CHUNK)])
+
+
+def trade_key(trade):
+    return trade.get('id'), trade.get('closed_at')
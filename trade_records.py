@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Représentation compacte des trades fermés et agrégats de performance
+
+Un trade fermé est conservé dans un objet à __slots__ plutôt que dans un
+dict d'une vingtaine de clés, avec les chaînes répétées (symbole, type,
+raison de fermeture) internées. TradeRecord se comporte comme un dict en
+lecture (record['pnl_usdt'], record.get(...), dict(record)) pour les
+appelants existants.
+"""
+
+import sys
+from collections.abc import Mapping
+
+TRADE_FIELDS = (
+    'id', 'symbol', 'type', 'entry_price', 'current_price', 'exit_price', 'tp', 'sl',
+    'size_usdt', 'margin_usdt', 'size_crypto', 'leverage', 'liquidation_price',
+    'opened_at', 'closed_at', 'duration_hours', 'highest_price', 'lowest_price',
+    'confidence', 'risk_reward', 'pnl_usdt', 'pnl_percent', 'pnl_percent_on_margin',
+    'close_reason', 'status', 'last_candle_ts'
+)
+
+# Valeurs partagées par de nombreux trades
+INTERNED_FIELDS = ('symbol', 'type', 'close_reason', 'status')
+
+
+class TradeRecord(Mapping):
+    """Trade fermé en lecture seule; les clés hors TRADE_FIELDS vont dans `extra`"""
+
+    __slots__ = TRADE_FIELDS + ('extra',)
+
+    def __init__(self, position):
+        extra = None
+        for key, value in position.items():
+            if key in INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            if key in TRADE_FIELDS:
+                object.__setattr__(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        object.__setattr__(self, 'extra', extra)
+
+    def __getitem__(self, key):
+        if key in TRADE_FIELDS:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in TRADE_FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("TradeRecord est en lecture seule")
+
+    def __repr__(self):
+        return f"TradeRecord({dict(self)!r})"
+
+
+class TradeAggregates:
+    """Statistiques des trades fermés tenues à jour trade par trade (sans reparcourir l'historique)"""
+
+    def __init__(self, initial_balance):
+        self.initial_balance = initial_balance
+        self.total_trades = 0
+        self.wins = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0  # Somme des P&L <= 0 (négative)
+        self.best_trade = None
+        self.worst_trade = None
+        self.total_duration = 0.0
+        # Courbe des gains réalisés pour le drawdown
+        self.equity = initial_balance
+        self.peak = initial_balance
+        self.max_drawdown = 0.0
+        self.max_drawdown_percent = 0.0
+
+    def add(self, pnl_usdt, duration_hours=0):
+        self.total_trades += 1
+        if pnl_usdt > 0:
+            self.wins += 1
+            self.gross_profit += pnl_usdt
+        else:
+            self.gross_loss += pnl_usdt
+        self.best_trade = pnl_usdt if self.best_trade is None else max(self.best_trade, pnl_usdt)
+        self.worst_trade = pnl_usdt if self.worst_trade is None else min(self.worst_trade, pnl_usdt)
+        self.total_duration += duration_hours or 0
+
+        self.equity += pnl_usdt
+        self.peak = max(self.peak, self.equity)
+        drawdown = self.peak - self.equity
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+            self.max_drawdown_percent = (drawdown / self.peak) * 100 if self.peak > 0 else 0
+
+    def to_dict(self):
+        losses = self.total_trades - self.wins
+        total_pnl = self.gross_profit + self.gross_loss
+        return {
+            'total_trades': self.total_trades,
+            'wins': self.wins,
+            'losses': losses,
+            'total_pnl': total_pnl,
+            'avg_win': self.gross_profit / self.wins if self.wins else 0,
+            'avg_loss': self.gross_loss / losses if losses else 0,
+            'best_trade': self.best_trade or 0,
+            'worst_trade': self.worst_trade or 0,
+            'avg_trade_duration': self.total_duration / self.total_trades if self.total_trades else 0,
+            'gross_profit': self.gross_profit,
+            'gross_loss': self.gross_loss,
+            # Pas de perte: profit factor non défini
+            'profit_factor': self.gross_profit / -self.gross_loss if self.gross_loss < 0 else None,
+            'expectancy': total_pnl / self.total_trades if self.total_trades else 0,
+            'max_drawdown': self.max_drawdown,
+            'max_drawdown_percent': self.max_drawdown_percent
+        }
+
+    def state(self):
+        """État sérialisable (JSON) des agrégats"""
+        return dict(vars(self))
+
+    @classmethod
+    def from_state(cls, state):
+        aggregates = cls(state['initial_balance'])
+        for key, value in state.items():
+            setattr(aggregates, key, value)
+        return aggregates
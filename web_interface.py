@@ -4,19 +4,24 @@ Interface Web pour le bot de trading
 Accessible depuis n'importe quel navigateur sur le réseau
 """
 
-from flask import Flask, render_template, jsonify, request, Response, send_file
+from flask import Flask, render_template, jsonify, request, Response, send_file, stream_with_context
 import json
 import os
 import signal
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from paper_trading import PaperTradingManager
+from paper_trading import PaperTradingManager, state_files
+from trade_index import TradeIndex
+from log_tail import tail_lines, read_since
 import config
 import subprocess
 import threading
+import queue
 import time
 import csv
 import io
+import tempfile
+from itertools import chain
 
 app = Flask(__name__)
 
@@ -28,23 +33,76 @@ NOTIFICATIONS_FILE = "data/notifications.json"
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
-# Stockage des positions précédentes pour détecter les changements
-previous_positions = {
-    'open': [],
-    'closed': []
-}
+BOT_LOG_FILE = "data/bot.log"
 
-def get_paper_trading_data():
-    """Récupère les données du paper trading"""
-    try:
-        pt = PaperTradingManager()
-        stats = pt.get_statistics()
+# Intervalle de vérification des changements (un stat() par fichier, seulement avec des clients connectés)
+STREAM_POLL_INTERVAL = 1
+# Commentaire SSE envoyé sans événement pendant ce délai (garde la connexion ouverte)
+STREAM_HEARTBEAT_INTERVAL = 15
 
-        return {
-            'stats': stats,
-            'open_positions': pt.open_positions,
-            'closed_positions': pt.closed_positions[-20:]  # 20 derniers trades
+class StateSnapshot:
+    """Instantané en lecture seule du paper trading, partagé par toutes les requêtes
+
+    L'état n'est rechargé que lorsque la date de modification ou la taille d'un
+    des fichiers sous-jacents change; les statistiques sont calculées une fois
+    par rechargement.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.signature = None
+        self.data = {
+            'stats': {},
+            'open_positions': [],
+            'closed_positions': []
         }
+        self.reloads = 0
+        # Historique complet indexé pour /api/trades (complété à chaque rechargement)
+        self.trade_index = TradeIndex()
+
+    def current_signature(self):
+        signature = []
+        for path in state_files():
+            try:
+                st = os.stat(path)
+                signature.append((path, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def get(self):
+        signature = self.current_signature()
+        if signature == self.signature:
+            return self.data
+
+        with self.lock:
+            # Un autre thread a pu recharger pendant l'attente du verrou
+            if signature != self.signature:
+                self.data = self.load()
+                self.signature = signature
+                self.reloads += 1
+        return self.data
+
+    def load(self):
+        pt = PaperTradingManager()
+        try:
+            self.trade_index.sync(pt)
+            return {
+                'stats': pt.get_statistics(),
+                'open_positions': pt.open_positions,
+                'closed_positions': pt.recent_closed_positions(20)  # 20 derniers trades
+            }
+        finally:
+            if pt.storage is not None:
+                pt.storage.close()
+
+
+state_snapshot = StateSnapshot()
+
+def get_paper_trading_data():
+    """Récupère les données du paper trading (instantané partagé)"""
+    try:
+        return state_snapshot.get()
     except Exception as e:
         print(f"Erreur lors de la récupération des données: {e}")
         return {
@@ -83,24 +141,143 @@ def get_bot_status():
 
 
 
-def monitor_positions():
-    """Surveille les changements de positions"""
-    global previous_positions
+class EventBroker:
+    """Diffuse les événements du tableau de bord aux clients SSE connectés"""
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.has_subscribers = threading.Event()
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.maxsize)
+        with self.lock:
+            self.subscribers.append(subscriber)
+            self.has_subscribers.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+            if not self.subscribers:
+                self.has_subscribers.clear()
+
+    def publish(self, event, data):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data))
+            except queue.Full:
+                # Client trop lent: déconnecté, il se reconnecte et repart d'un état complet
+                self.unsubscribe(subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait((None, None))
+
+
+event_broker = EventBroker()
+
+def diff_positions(previous, current):
+    """Événements (ouvertures, mises à jour, fermetures) entre deux instantanés"""
+    events = []
+    previous_open = {p['id']: p for p in previous['open_positions']}
+    current_open = {p['id']: p for p in current['open_positions']}
+    closed = {p['id']: p for p in current['closed_positions']}
+
+    for position_id, position in current_open.items():
+        if position_id not in previous_open:
+            events.append(('position-opened', position))
+        elif position != previous_open[position_id]:
+            events.append(('position-updated', position))
+    for position_id, position in previous_open.items():
+        if position_id not in current_open:
+            events.append(('position-closed', closed.get(position_id, position)))
+
+    if current['stats'] != previous['stats']:
+        events.append(('stats', current['stats']))
+    return events
+
+class ChangeMonitor:
+    """Publie les changements de positions, statistiques, statut du bot et log
+
+    Seules les dates de modification des fichiers sont vérifiées; l'instantané
+    n'est relu que s'ils changent, et rien n'est fait sans client connecté.
+    L'état de référence des comparaisons est aussi l'état complet envoyé à un
+    nouveau client: rien n'est perdu ni envoyé en double entre les deux.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.data = None
+        self.bot_running = None
+        self.log_position = None  # {'offset', 'inode'} dans le log du bot
+
+    def poll(self):
+        """Publie les changements depuis l'état de référence (simplement relevé s'il est vide)"""
+        with self.lock:
+            current = get_paper_trading_data()
+            if self.data is not None and current is not self.data:
+                for event, payload in diff_positions(self.data, current):
+                    self.broker.publish(event, payload)
+            self.data = current
+
+            running = is_bot_running()
+            if running != self.bot_running:
+                if self.bot_running is not None:
+                    self.broker.publish('bot-status', get_bot_status())
+                self.bot_running = running
+
+            if self.log_position is None:
+                self.log_position = tail_lines(BOT_LOG_FILE, 0)
+            else:
+                self.log_position = read_since(BOT_LOG_FILE, self.log_position['offset'], self.log_position['inode'])
+                if self.log_position['reset']:
+                    # Log remplacé, tronqué ou trop en retard: les lignes remplacent l'affichage
+                    self.broker.publish('log-reset', self.log_position['lines'])
+                else:
+                    for line in self.log_position['lines']:
+                        self.broker.publish('log-line', line)
+
+    def connect(self):
+        """Abonne un client; retourne sa file et les événements de l'état complet initial"""
+        with self.lock:
+            if not self.broker.has_subscribers.is_set():
+                # Référence périmée pendant l'absence de clients: repartir de l'état actuel
+                self.reset()
+            self.poll()
+            subscriber = self.broker.subscribe()
+            # Dernières lignes du log jusqu'à la position de référence: la suite arrive par le flux
+            logs = tail_lines(BOT_LOG_FILE, 100, self.log_position['offset'], self.log_position['inode'])
+            initial = [
+                ('positions', {'open': self.data['open_positions'], 'closed': self.data['closed_positions']}),
+                ('stats', self.data['stats']),
+                ('bot-status', get_bot_status()),
+                ('logs', logs)
+            ]
+        return subscriber, initial
 
-    while True:
-        try:
-            data = get_paper_trading_data()
-            current_open = data['open_positions']
-            current_closed = data['closed_positions']
+    def run(self):
+        while True:
+            self.broker.has_subscribers.wait()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Erreur monitoring: {e}")
 
-            # Mettre à jour les positions précédentes
-            previous_positions['open'] = current_open
-            previous_positions['closed'] = current_closed
+            time.sleep(STREAM_POLL_INTERVAL)
 
-        except Exception as e:
-            print(f"Erreur monitoring: {e}")
 
-        time.sleep(3)  # Vérifier toutes les 3 secondes
+change_monitor = ChangeMonitor(event_broker)
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @app.route('/')
 def index():
@@ -122,6 +299,70 @@ def api_positions():
         'closed': data['closed_positions']
     })
 
+@app.route('/api/stream')
+def api_stream():
+    """API: Flux Server-Sent Events des changements (état complet à la connexion)"""
+    subscriber, initial = change_monitor.connect()
+
+    def stream():
+        try:
+            for event, payload in initial:
+                yield format_sse(event, payload)
+
+            while True:
+                try:
+                    event, payload = subscriber.get(timeout=STREAM_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                yield format_sse(event, payload)
+        finally:
+            event_broker.unsubscribe(subscriber)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def parse_datetime_arg(name):
+    """Date ISO d'un paramètre de requête (fuseau de Paris si non précisé)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=ZoneInfo("Europe/Paris"))
+    return parsed
+
+@app.route('/api/trades')
+def api_trades():
+    """API: Historique des trades paginé (curseur), filtrable et triable
+
+    Paramètres: symbol, type, close_reason, since, until (ISO 8601),
+    sort (closed_at, -closed_at, pnl_usdt, -pnl_usdt), limit, cursor.
+    """
+    try:
+        state_snapshot.get()
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        trades, next_cursor = state_snapshot.trade_index.query(
+            filters={name: request.args.get(name) for name in ('symbol', 'type', 'close_reason')},
+            since=parse_datetime_arg('since'),
+            until=parse_datetime_arg('until'),
+            sort=request.args.get('sort', '-closed_at'),
+            cursor=request.args.get('cursor'),
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Paramètre invalide: {str(e)}'}), 400
+
+    return jsonify({
+        'trades': trades,
+        'next_cursor': next_cursor,
+        'total_trades': len(state_snapshot.trade_index)
+    })
+
 @app.route('/api/bot/status')
 def api_bot_status():
     """API: Statut du bot"""
@@ -137,7 +378,7 @@ def api_bot_start():
         # Démarrer le bot en arrière-plan
         process = subprocess.Popen(
             ['python3', 'agent.py'],
-            stdout=open('data/bot.log', 'a'),
+            stdout=open(BOT_LOG_FILE, 'a'),
             stderr=subprocess.STDOUT,
             preexec_fn=os.setpgrp
         )
@@ -198,85 +439,180 @@ def api_config():
         }
     })
 
+CSV_EXPORT_HEADER = [
+    'ID', 'Symbole', 'Type', 'Prix Entrée', 'Prix Sortie', 'Taille (Crypto)',
+    'Taille (USDT)', 'Levier', 'P&L USDT', 'P&L %', 'Raison Fermeture',
+    'Date Ouverture', 'Date Fermeture', 'Durée (heures)', 'TP Atteint',
+    'SL Atteint', 'Liquidation'
+]
+
+# Lignes écrites par morceau de la réponse CSV
+CSV_EXPORT_CHUNK_ROWS = 500
+# Lignes par groupe (row group) du fichier Parquet
+PARQUET_EXPORT_BATCH_ROWS = 5000
+
+PARQUET_EXPORT_COLUMNS = [
+    ('id', 'string'), ('symbol', 'string'), ('type', 'string'),
+    ('entry_price', 'float'), ('exit_price', 'float'), ('size_crypto', 'float'),
+    ('size_usdt', 'float'), ('margin_usdt', 'float'), ('leverage', 'float'),
+    ('pnl_usdt', 'float'), ('pnl_percent', 'float'), ('pnl_percent_on_margin', 'float'),
+    ('close_reason', 'string'), ('opened_at', 'timestamp'), ('closed_at', 'timestamp'),
+    ('duration_hours', 'float'), ('confidence', 'float'), ('risk_reward', 'float')
+]
+
+def exported_trades():
+    """Trades fermés (archive comprise) de l'index partagé, filtrés par les paramètres since, until et symbol
+
+    Lève ValueError si une date est invalide.
+    """
+    since, until = parse_datetime_arg('since'), parse_datetime_arg('until')
+    state_snapshot.get()
+    trades = state_snapshot.trade_index.iter_trades(since, until)
+    symbols = request.args.get('symbol')
+    if symbols:
+        wanted = set(symbols.split(','))
+        trades = (p for p in trades if p.get('symbol') in wanted)
+    return trades
+
+def export_filename(extension):
+    paris_tz = ZoneInfo("Europe/Paris")
+    return f"trades_export_{datetime.now(paris_tz).strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+def csv_export_row(position):
+    close_reason = position.get('close_reason', '')
+    return [
+        position.get('id', ''),
+        position.get('symbol', ''),
+        position.get('type', ''),
+        position.get('entry_price', ''),
+        position.get('exit_price', ''),
+        position.get('size_crypto', ''),
+        position.get('size_usdt', ''),
+        position.get('leverage', 1),
+        position.get('pnl_usdt', ''),
+        position.get('pnl_percent', ''),
+        close_reason,
+        position.get('opened_at', ''),
+        position.get('closed_at', ''),
+        position.get('duration_hours', ''),
+        'OUI' if close_reason == 'TP_HIT' else 'NON',
+        'OUI' if close_reason == 'SL_HIT' else 'NON',
+        'OUI' if close_reason == 'LIQUIDATED' else 'NON'
+    ]
+
 @app.route('/api/export/trades/csv')
 def export_trades_csv():
-    """API: Export des trades en format CSV"""
+    """API: Export des trades en format CSV (envoyé en flux, filtres since, until et symbol)"""
     try:
-        # Récupérer les données de paper trading
-        pt = PaperTradingManager()
-        closed_positions = pt.closed_positions
+        trades = exported_trades()
+        first = next(trades, None)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Paramètre invalide: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erreur lors de l\'export: {str(e)}'}), 500
 
-        if not closed_positions:
-            return jsonify({'success': False, 'message': 'Aucun trade fermé disponible'}), 404
+    if first is None:
+        return jsonify({'success': False, 'message': 'Aucun trade fermé disponible'}), 404
 
-        # Créer un fichier CSV en mémoire
+    def generate():
         output = io.StringIO()
         writer = csv.writer(output, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(CSV_EXPORT_HEADER)
+        rows = 0
+        for position in chain([first], trades):
+            writer.writerow(csv_export_row(position))
+            rows += 1
+            if rows % CSV_EXPORT_CHUNK_ROWS == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+        yield output.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename={export_filename("csv")}'
+    })
 
-        # Écrire l'en-tête
-        header = [
-            'ID', 'Symbole', 'Type', 'Prix Entrée', 'Prix Sortie', 'Taille (Crypto)',
-            'Taille (USDT)', 'Levier', 'P&L USDT', 'P&L %', 'Raison Fermeture',
-            'Date Ouverture', 'Date Fermeture', 'Durée (heures)', 'TP Atteint',
-            'SL Atteint', 'Liquidation'
-        ]
-        writer.writerow(header)
-
-        # Écrire les données
-        for position in closed_positions:
-            row = [
-                position.get('id', ''),
-                position.get('symbol', ''),
-                position.get('type', ''),
-                position.get('entry_price', ''),
-                position.get('exit_price', ''),
-                position.get('size_crypto', ''),
-                position.get('size_usdt', ''),
-                position.get('leverage', 1),
-                position.get('pnl_usdt', ''),
-                position.get('pnl_percent', ''),
-                position.get('close_reason', ''),
-                position.get('open_time', ''),
-                position.get('close_time', ''),
-                position.get('duration_hours', ''),
-                'OUI' if position.get('tp_hit') else 'NON',
-                'OUI' if position.get('sl_hit') else 'NON',
-                'OUI' if position.get('close_reason') == 'LIQUIDATED' else 'NON'
-            ]
-            writer.writerow(row)
-
-        # Préparer la réponse
-        output.seek(0)
-        mem = io.BytesIO()
-        mem.write(output.getvalue().encode('utf-8'))
-        mem.seek(0)
-
-        # Générer un nom de fichier avec la date
-        paris_tz = ZoneInfo("Europe/Paris")
-        filename = f"trades_export_{datetime.now(paris_tz).strftime('%Y%m%d_%H%M%S')}.csv"
-
-        return send_file(
-            mem,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
-        )
+@app.route('/api/export/trades/parquet')
+def export_trades_parquet():
+    """API: Export des trades en format Parquet (pyarrow requis, mêmes filtres que le CSV)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return jsonify({'success': False, 'message': 'Export Parquet indisponible: installez pyarrow'}), 501
+
+    types = {'string': pa.string(), 'float': pa.float64(), 'timestamp': pa.timestamp('us', tz='UTC')}
+    schema = pa.schema([(name, types[kind]) for name, kind in PARQUET_EXPORT_COLUMNS])
+
+    def column_value(position, name, kind):
+        value = position.get(name)
+        if value is None:
+            return None
+        if kind == 'timestamp':
+            return datetime.fromisoformat(value)
+        return float(value) if kind == 'float' else str(value)
 
+    try:
+        trades = exported_trades()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Paramètre invalide: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erreur lors de l\'export: {str(e)}'}), 500
 
+    # Écriture par groupes de lignes dans un fichier temporaire (supprimé à la fermeture)
+    output = tempfile.TemporaryFile()
+    rows = 0
+    try:
+        with pq.ParquetWriter(output, schema) as writer:
+            batch = []
+            for position in chain(trades, [None]):
+                if position is not None:
+                    batch.append(position)
+                    rows += 1
+                if batch and (position is None or len(batch) == PARQUET_EXPORT_BATCH_ROWS):
+                    writer.write_table(pa.table({
+                        name: pa.array([column_value(p, name, kind) for p in batch], type=types[kind])
+                        for name, kind in PARQUET_EXPORT_COLUMNS
+                    }, schema=schema))
+                    batch = []
+    except Exception as e:
+        output.close()
+        return jsonify({'success': False, 'message': f'Erreur lors de l\'export: {str(e)}'}), 500
+
+    if rows == 0:
+        output.close()
+        return jsonify({'success': False, 'message': 'Aucun trade fermé disponible'}), 404
+
+    output.seek(0)
+    return send_file(
+        output,
+        mimetype='application/vnd.apache.parquet',
+        as_attachment=True,
+        download_name=export_filename('parquet')
+    )
+
 @app.route('/api/logs')
 def api_logs():
-    """API: Dernières lignes du log"""
+    """API: Dernières lignes du log, ou seulement les nouvelles avec ?since=<offset>&inode=<inode>
+
+    offset et inode de la réponse servent à la requête suivante; reset indique que
+    le log a été remplacé ou tronqué (les lignes remplacent alors l'affichage).
+    """
     try:
-        if os.path.exists('data/bot.log'):
-            with open('data/bot.log', 'r') as f:
-                lines = f.readlines()
-                return jsonify({'logs': lines[-100:]})  # 100 dernières lignes
+        since = request.args.get('since', type=int)
+        if since is None:
+            result = tail_lines(BOT_LOG_FILE, 100)  # 100 dernières lignes
+            result['reset'] = True
         else:
-            return jsonify({'logs': []})
+            result = read_since(BOT_LOG_FILE, since, request.args.get('inode', type=int))
+        return jsonify({
+            'logs': result['lines'],
+            'offset': result['offset'],
+            'inode': result['inode'],
+            'reset': result['reset']
+        })
     except Exception as e:
-        return jsonify({'logs': [f'Erreur de lecture du log: {str(e)}']})
+        return jsonify({'logs': [f'Erreur de lecture du log: {str(e)}'], 'offset': None, 'inode': None, 'reset': True})
 
 
 
@@ -291,8 +627,8 @@ if __name__ == '__main__':
     print("\nPour trouver l'IP du Raspberry: hostname -I")
     print("="*70 + "\n")
 
-    # Démarrer le thread de monitoring des positions
-    monitor_thread = threading.Thread(target=monitor_positions, daemon=True)
+    # Démarrer le thread de détection des changements (flux /api/stream)
+    monitor_thread = threading.Thread(target=change_monitor.run, daemon=True)
     monitor_thread.start()
     print("✓ Monitoring des positions démarré\n")
 